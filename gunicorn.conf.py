@@ -0,0 +1,31 @@
+"""
+Gunicorn settings for serving the ASGI application with uvicorn workers:
+
+    gunicorn -c gunicorn.conf.py quotation_system.asgi:application
+
+Each worker process runs an event loop, so async views (the editor API)
+serve many concurrent requests without a thread apiece; sync views still
+run in the worker's thread pool. Values can be overridden through the
+environment variables below.
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+worker_class = 'uvicorn_worker.UvicornWorker'
+# Event-loop workers need far fewer processes than sync workers
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() + 1))
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+# Recycle workers periodically to bound memory growth; jitter avoids
+# restarting them all at once
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 5000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 500))
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+forwarded_allow_ips = os.environ.get('FORWARDED_ALLOW_IPS', '127.0.0.1')
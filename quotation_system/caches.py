@@ -0,0 +1,39 @@
+"""
+``CACHES`` built from environment variables (read with python-decouple).
+
+``CACHE_BACKEND`` picks the default cache:
+
+    locmem      per-process memory (the default; not shared between workers)
+    file        files under CACHE_LOCATION (default ``<BASE_DIR>/cache``),
+                shared by the workers of one host
+    redis       Django's Redis backend (needs ``redis``) at CACHE_LOCATION,
+                e.g. ``redis://127.0.0.1:6379/1``; any Redis-compatible
+                server (Valkey, KeyDB, Dragonfly) works
+    <module>    any cache backend path, with CACHE_LOCATION
+
+``CACHE_KEY_PREFIX`` separates deployments that share one server.
+"""
+from decouple import config
+
+BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'redis': 'django.core.cache.backends.redis.RedisCache',
+}
+
+
+def cache_settings(base_dir):
+    backend = config('CACHE_BACKEND', default='locmem')
+    default_location = {
+        'file': str(base_dir / 'cache'),
+        'redis': 'redis://127.0.0.1:6379/1',
+    }.get(backend, '')
+    values = {
+        'BACKEND': BACKENDS.get(backend, backend),
+        'LOCATION': config('CACHE_LOCATION', default=default_location),
+        'KEY_PREFIX': config('CACHE_KEY_PREFIX', default=''),
+    }
+    if backend == 'file':
+        # Entries are versioned, not expired; cap the directory instead
+        values['OPTIONS'] = {'MAX_ENTRIES': config('CACHE_MAX_ENTRIES', default=10000, cast=int)}
+    return {'default': values}
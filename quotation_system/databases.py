@@ -0,0 +1,119 @@
+"""
+``DATABASES`` built from environment variables (read with python-decouple,
+so a ``.env`` file works too).
+
+``DB_ENGINE`` is ``sqlite`` (the default, ``DB_NAME`` is the file),
+``postgresql`` or any backend module path.
+
+``DB_SQLITE_TUNING=True`` switches SQLite to the production backend in
+``sqlite_tuned`` (WAL, ``synchronous=NORMAL``, mmap, a larger page cache,
+``BEGIN IMMEDIATE`` write transactions). Sizes: DB_SQLITE_BUSY_TIMEOUT (ms,
+default 5000), DB_SQLITE_MMAP_SIZE (bytes, default 256 MiB),
+DB_SQLITE_CACHE_KB (default 64 MiB).
+
+PostgreSQL settings:
+
+    DB_NAME, DB_USER, DB_PASSWORD, DB_HOST, DB_PORT, DB_SSLMODE
+    DB_CONN_MAX_AGE         seconds to keep a connection open (default 60)
+    DB_CONN_HEALTH_CHECKS   ping reused connections before a request (default on)
+    DB_CONNECT_TIMEOUT      seconds (default 5)
+
+``DB_POOL`` picks the connection pooling strategy:
+
+    (empty)       persistent per-worker connections (CONN_MAX_AGE)
+    pgbouncer     an external transaction-mode pooler at DB_HOST; server-side
+                  cursors are disabled because they do not survive it
+    <module>      a pooling backend used as ENGINE, e.g.
+                  ``dj_db_conn_pool.backends.postgresql``, sized by
+                  DB_POOL_SIZE and DB_POOL_MAX_OVERFLOW
+
+A read replica is added as the ``replica`` alias when ``DB_REPLICA_HOST``
+(PostgreSQL) or ``DB_REPLICA_NAME`` (SQLite) is set; every other
+``DB_REPLICA_*`` value defaults to the primary's. ``ReplicaRouter`` sends
+the reads of views marked ``@use_replica`` there.
+"""
+from decouple import config
+
+ENGINES = {
+    'sqlite': 'django.db.backends.sqlite3',
+    'postgresql': 'django.db.backends.postgresql',
+    'postgres': 'django.db.backends.postgresql',
+}
+REPLICA_ALIAS = 'replica'
+SQLITE_TUNED_ENGINE = 'quotation_system.sqlite_tuned'
+
+
+def _database(prefix, engine, defaults):
+    def setting(name, default='', cast=str):
+        return config(f'{prefix}_{name}', default=defaults.get(name, default), cast=cast)
+
+    if engine == ENGINES['sqlite']:
+        values = {'ENGINE': engine, 'NAME': setting('NAME')}
+        if config('DB_SQLITE_TUNING', default=False, cast=bool):
+            busy_timeout = config('DB_SQLITE_BUSY_TIMEOUT', default=5000, cast=int)
+            values['ENGINE'] = SQLITE_TUNED_ENGINE
+            # Keep connections, with their page cache and mmap, across requests
+            values['CONN_MAX_AGE'] = config('DB_CONN_MAX_AGE', default=60, cast=int)
+            values['OPTIONS'] = {
+                # Python's own wait on a locked database, in seconds
+                'timeout': busy_timeout / 1000,
+                'begin_immediate': True,
+                'pragmas': {
+                    'journal_mode': 'WAL',
+                    'synchronous': 'NORMAL',
+                    'busy_timeout': busy_timeout,
+                    'mmap_size': config('DB_SQLITE_MMAP_SIZE', default=256 * 1024 * 1024, cast=int),
+                    # Negative: size in KiB rather than pages
+                    'cache_size': -config('DB_SQLITE_CACHE_KB', default=64 * 1024, cast=int),
+                    'temp_store': 'MEMORY',
+                },
+            }
+        return values
+
+    values = {
+        'NAME': setting('NAME', 'quotations'),
+        'USER': setting('USER'),
+        'PASSWORD': setting('PASSWORD'),
+        'HOST': setting('HOST', 'localhost'),
+        'PORT': setting('PORT', '5432'),
+        'CONN_MAX_AGE': setting('CONN_MAX_AGE', 60, cast=int),
+        'CONN_HEALTH_CHECKS': setting('CONN_HEALTH_CHECKS', True, cast=bool),
+        'OPTIONS': {'connect_timeout': setting('CONNECT_TIMEOUT', 5, cast=int)},
+    }
+    sslmode = setting('SSLMODE')
+    if sslmode:
+        values['OPTIONS']['sslmode'] = sslmode
+
+    pool = config('DB_POOL', default='')
+    if pool == 'pgbouncer':
+        values['DISABLE_SERVER_SIDE_CURSORS'] = True
+    elif pool:
+        engine = pool
+        values['POOL_OPTIONS'] = {
+            'POOL_SIZE': config('DB_POOL_SIZE', default=10, cast=int),
+            'MAX_OVERFLOW': config('DB_POOL_MAX_OVERFLOW', default=10, cast=int),
+            'RECYCLE': config('DB_CONN_MAX_AGE', default=60, cast=int) or -1,
+        }
+        # Connections go back to the pool at the end of each request
+        values['CONN_MAX_AGE'] = 0
+    return {'ENGINE': engine, **values}
+
+
+def database_settings(base_dir):
+    engine = config('DB_ENGINE', default='sqlite')
+    engine = ENGINES.get(engine, engine)
+    defaults = {'NAME': str(base_dir / 'db.sqlite3')} if engine == ENGINES['sqlite'] else {}
+    primary = _database('DB', engine, defaults)
+    databases = {'default': primary}
+
+    replica_key = 'DB_REPLICA_NAME' if engine == ENGINES['sqlite'] else 'DB_REPLICA_HOST'
+    if config(replica_key, default=''):
+        primary_values = {
+            name: config(f'DB_{name}', default=primary.get(name, ''))
+            for name in ('NAME', 'USER', 'PASSWORD', 'HOST', 'PORT')
+        }
+        replica = _database('DB_REPLICA', engine, primary_values)
+        # Tests run against the primary; the replica alias points at it
+        replica['TEST'] = {'MIRROR': 'default'}
+        databases[REPLICA_ALIAS] = replica
+    return databases
@@ -5,6 +5,9 @@ Django settings for quotation_system project.
 from pathlib import Path
 import os
 
+from .caches import cache_settings
+from .databases import database_settings
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -16,6 +19,9 @@ DEBUG = True
 
 ALLOWED_HOSTS = ['localhost', '127.0.0.1']
 
+# Addresses allowed to scrape /metrics without a staff login
+INTERNAL_IPS = ['127.0.0.1']
+
 # Application definition
 INSTALLED_APPS = [
     'django.contrib.admin',
@@ -28,6 +34,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'quotations.middleware.QueryMetricsMiddleware',
+    'quotations.middleware.ReplicaPinMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -57,13 +65,12 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'quotation_system.wsgi.application'
 
-# Database
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
-}
+# Database: configured from DB_* environment variables, SQLite by default
+# (see databases.py). Reads of @use_replica views go to the optional replica.
+DATABASES = database_settings(BASE_DIR)
+DATABASE_ROUTERS = ['quotations.routers.ReplicaRouter']
+# After a write, a client reads from the primary for this many seconds
+DATABASE_REPLICA_PIN_SECONDS = 5
 
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
@@ -98,6 +105,33 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Exchange rates: cross rates are derived through this currency, and each
+# process reloads its rate table at least this often (seconds)
+FX_PIVOT_CURRENCY = 'USD'
+FX_RATE_CACHE_TTL = 300
+
+# Default cache from CACHE_* environment variables (see caches.py)
+CACHES = cache_settings(BASE_DIR)
+
+# Catalog pages and fragments are keyed by a version bumped on every
+# hardware change; entries also expire after this many seconds, which bounds
+# the staleness when the cache is not shared between workers (locmem)
+CATALOG_CACHE_TIMEOUT = 3600
+
+# Quotation and request numbers (``Q-2026-000123``): each process reserves
+# this many sequence values at a time; 1 makes the sequences gapless at the
+# cost of locking the sequence row on every insert (see numbering.py)
+QUOTATION_NUMBER_PREFIX = 'Q'
+REQUEST_NUMBER_PREFIX = 'REQ'
+NUMBER_BLOCK_SIZE = 20
+
+# Rendered quotation PDF/HTML documents, keyed by content hash
+QUOTATION_DOCUMENT_CACHE_DIR = BASE_DIR / 'document_cache'
+
+# Finished background jobs are deleted by the workers after this many days;
+# None keeps them
+JOB_RETENTION_DAYS = 14
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -105,3 +139,18 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 LOGIN_URL = '/admin/login/'
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/'
+
+# Performance instrumentation: a statement repeated this many times in one
+# request is logged as a likely N+1 query
+NPLUSONE_THRESHOLD = 5
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'quotations.performance': {'handlers': ['console'], 'level': 'WARNING'},
+    },
+}
@@ -0,0 +1,35 @@
+"""
+SQLite backend for production use under several worker processes.
+
+Selected by ``DB_SQLITE_TUNING`` (see ``databases.py``). On top of Django's
+backend it:
+
+* applies ``OPTIONS['pragmas']`` to every new connection (WAL journal,
+  ``synchronous=NORMAL``, mmap, page cache, busy timeout);
+* starts transactions with ``BEGIN IMMEDIATE`` when
+  ``OPTIONS['begin_immediate']`` is set. A deferred transaction that reads
+  and then writes, like a line-item save (load the row, update it, adjust
+  the quotation totals), must upgrade its lock mid-way; when another worker
+  is writing, SQLite fails that upgrade at once with "database is locked"
+  instead of waiting. Taking the write lock at BEGIN makes concurrent
+  writers queue on the busy timeout instead, serialising them.
+"""
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        # Not sqlite3.connect() arguments
+        self.pragmas = params.pop('pragmas', {})
+        self.begin_immediate = params.pop('begin_immediate', False)
+        return params
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute('BEGIN IMMEDIATE' if self.begin_immediate else 'BEGIN')
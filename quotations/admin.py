@@ -1,26 +1,54 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.db.models import Count, DecimalField, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from .cloning import clone_quotation
+from .currency import MissingExchangeRate
+from .jobs import enqueue
 from .models import (
-    CustomerQuotationRequest, Hardware, PersonnelCostCategory,
-    Quotation, QuotationHardware, QuotationPersonnelCost
+    CustomerQuotationRequest, ExchangeRate, Hardware, HardwarePriceHistory, Job, PersonnelCostCategory,
+    PersonnelRateHistory, Quotation, QuotationHardware, QuotationPersonnelCost
 )
+from .pricing import recalculate_quotations
+from .workflow import bulk_approve, can_approve
+
+# Larger admin recalculations are queued as a background job
+INLINE_RECALCULATION_LIMIT = 100
+
+
+class ListDeferMixin:
+    """Leaves the ``list_defer`` columns out of the change list query only"""
+    list_defer = ()
+    
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        match = request.resolver_match
+        if self.list_defer and match and match.url_name and match.url_name.endswith('_changelist'):
+            queryset = queryset.defer(*self.list_defer)
+        return queryset
 
 
 @admin.register(CustomerQuotationRequest)
-class CustomerQuotationRequestAdmin(admin.ModelAdmin):
+class CustomerQuotationRequestAdmin(ListDeferMixin, admin.ModelAdmin):
+    list_defer = ['project_description']
     list_display = ['request_number', 'customer_name', 'company_name', 'status', 'created_date']
     list_filter = ['status', 'created_date']
     search_fields = ['customer_name', 'company_name', 'request_number']
-    readonly_fields = ['created_date', 'updated_date']
+    # Numbers come from the sequence; one typed ahead of it would collide later
+    readonly_fields = ['request_number', 'created_date', 'updated_date']
     ordering = ['-created_date']
+    show_full_result_count = False
 
 
 @admin.register(Hardware)
-class HardwareAdmin(admin.ModelAdmin):
+class HardwareAdmin(ListDeferMixin, admin.ModelAdmin):
+    list_defer = ['description', 'connectivity_options']
     list_display = ['name', 'category', 'manufacturer', 'unit_cost', 'currency', 'is_active']
     list_filter = ['category', 'manufacturer', 'is_active', 'currency']
     search_fields = ['name', 'description', 'model_number']
     readonly_fields = ['created_date', 'updated_date']
     ordering = ['category', 'name']
+    show_full_result_count = False
 
 
 @admin.register(PersonnelCostCategory)
@@ -34,35 +62,59 @@ class PersonnelCostCategoryAdmin(admin.ModelAdmin):
 class QuotationHardwareInline(admin.TabularInline):
     model = QuotationHardware
     extra = 1
-    readonly_fields = ['total_cost']
+    readonly_fields = ['currency', 'total_cost', 'converted_total']
+    # A <select> of the whole catalog per inline row is too large to render
+    raw_id_fields = ['hardware']
 
 
 class QuotationPersonnelCostInline(admin.TabularInline):
     model = QuotationPersonnelCost
     extra = 1
-    readonly_fields = ['total_cost']
+    readonly_fields = ['currency', 'total_cost', 'converted_total']
+
+
+def _per_quotation(model, aggregate):
+    """Correlated subquery aggregating ``model`` rows of the outer quotation"""
+    return Subquery(
+        model.objects.filter(quotation=OuterRef('pk'))
+        .order_by()
+        .values('quotation')
+        .annotate(value=aggregate)
+        .values('value')
+    )
 
 
 @admin.register(Quotation)
-class QuotationAdmin(admin.ModelAdmin):
+class QuotationAdmin(ListDeferMixin, admin.ModelAdmin):
+    # The customer_request column prints the request's project description
+    list_defer = ['notes']
     list_display = [
         'quotation_number', 'customer_request', 'created_by',
-        'technical_approval', 'sales_approval', 'final_approval',
-        'total_amount', 'created_date'
-    ]
-    list_filter = [
-        'technical_approval', 'sales_approval', 'final_approval',
-        'created_date'
+        'approval_stage', 'line_count', 'live_line_total', 'total_amount', 'currency', 'created_date'
     ]
+    list_select_related = ['customer_request', 'created_by']
+    show_full_result_count = False
+    list_filter = ['approval_stage', 'created_date']
     search_fields = [
         'quotation_number', 'customer_request__customer_name',
         'customer_request__company_name'
     ]
     readonly_fields = [
+        # Allocated from the sequence (see numbering.py)
+        'quotation_number',
         'created_date', 'updated_date', 'hardware_total', 'personnel_total',
-        'subtotal', 'markup_amount', 'tax_amount', 'total_amount'
+        'subtotal', 'markup_amount', 'tax_amount', 'total_amount',
+        # Approvals go through the workflow (the actions below), in order
+        'approval_stage',
+        'technical_approval', 'technical_approved_by', 'technical_approval_date',
+        'sales_approval', 'sales_approved_by', 'sales_approval_date',
+        'final_approval', 'final_approved_by', 'final_approval_date',
     ]
     inlines = [QuotationHardwareInline, QuotationPersonnelCostInline]
+    actions = [
+        'recalculate_totals', 'clone_quotations', 'clone_quotations_repriced',
+        'approve_technical', 'approve_sales', 'approve_final'
+    ]
     
     fieldsets = (
         ('Basic Information', {
@@ -70,6 +122,7 @@ class QuotationAdmin(admin.ModelAdmin):
         }),
         ('Approval Status', {
             'fields': (
+                'approval_stage',
                 ('technical_approval', 'technical_approved_by', 'technical_approval_date'),
                 ('sales_approval', 'sales_approved_by', 'sales_approval_date'),
                 ('final_approval', 'final_approved_by', 'final_approval_date'),
@@ -77,6 +130,7 @@ class QuotationAdmin(admin.ModelAdmin):
         }),
         ('Pricing', {
             'fields': (
+                'currency',
                 ('hardware_total', 'personnel_total'),
                 ('markup_percentage', 'markup_amount'),
                 ('subtotal', 'tax_percentage', 'tax_amount'),
@@ -89,19 +143,170 @@ class QuotationAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         })
     )
+    
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        money = DecimalField(max_digits=12, decimal_places=2)
+        return queryset.annotate(
+            _line_count=(
+                Coalesce(_per_quotation(QuotationHardware, Count('pk')), 0, output_field=IntegerField()) +
+                Coalesce(_per_quotation(QuotationPersonnelCost, Count('pk')), 0, output_field=IntegerField())
+            ),
+            _live_line_total=(
+                Coalesce(_per_quotation(QuotationHardware, Sum('converted_total')), 0, output_field=money) +
+                Coalesce(_per_quotation(QuotationPersonnelCost, Sum('converted_total')), 0, output_field=money)
+            ),
+        )
+    
+    @admin.display(description='Lines', ordering='_line_count')
+    def line_count(self, obj):
+        return obj._line_count
+    
+    @admin.display(description='Live line total', ordering='_live_line_total')
+    def live_line_total(self, obj):
+        # Sum of line items before markup and tax, computed from the rows
+        return obj._live_line_total
+    
+    @admin.action(description='Recalculate totals from line items')
+    def recalculate_totals(self, request, queryset):
+        quotation_ids = list(queryset.values_list('pk', flat=True))
+        if len(quotation_ids) <= INLINE_RECALCULATION_LIMIT:
+            count = recalculate_quotations(quotation_ids)
+            self.message_user(request, f'Recalculated {count} quotation(s).')
+            return
+        job = enqueue('recalculate_quotations', user=request.user, quotation_ids=quotation_ids)
+        self.message_user(request, f'Queued job {job.pk} to recalculate {len(quotation_ids)} quotation(s).')
+    
+    def _clone(self, request, queryset, reprice):
+        cloned = []
+        for template in queryset.select_related('customer_request'):
+            try:
+                cloned.append(clone_quotation(template, request.user, reprice=reprice).quotation_number)
+            except MissingExchangeRate as exc:
+                self.message_user(request, f'{template.quotation_number} not cloned: {exc}', messages.ERROR)
+        if cloned:
+            self.message_user(request, f'Created {len(cloned)} quotation(s): {", ".join(cloned)}.')
+    
+    @admin.action(description='Clone selected quotations')
+    def clone_quotations(self, request, queryset):
+        self._clone(request, queryset, reprice=False)
+    
+    @admin.action(description='Clone selected quotations at current catalog prices')
+    def clone_quotations_repriced(self, request, queryset):
+        self._clone(request, queryset, reprice=True)
+    
+    def _approve(self, request, queryset, stage):
+        result = bulk_approve(queryset.values_list('pk', flat=True), [stage], request.user)
+        message = f'{stage.title()} approval given to {result.approved[stage]} quotation(s).'
+        if result.skipped:
+            message += f' {len(result.skipped)} skipped: not awaiting {stage} approval.'
+        self.message_user(request, message)
+    
+    def has_approve_technical_permission(self, request):
+        return can_approve(request.user, 'technical')
+    
+    def has_approve_sales_permission(self, request):
+        return can_approve(request.user, 'sales')
+    
+    def has_approve_final_permission(self, request):
+        return can_approve(request.user, 'final')
+    
+    @admin.action(description='Give technical approval', permissions=['approve_technical'])
+    def approve_technical(self, request, queryset):
+        self._approve(request, queryset, 'technical')
+    
+    @admin.action(description='Give sales approval', permissions=['approve_sales'])
+    def approve_sales(self, request, queryset):
+        self._approve(request, queryset, 'sales')
+    
+    @admin.action(description='Give final approval', permissions=['approve_final'])
+    def approve_final(self, request, queryset):
+        self._approve(request, queryset, 'final')
+
+
+@admin.register(ExchangeRate)
+class ExchangeRateAdmin(admin.ModelAdmin):
+    list_display = ['from_currency', 'to_currency', 'rate', 'effective_date', 'source']
+    list_filter = ['from_currency', 'to_currency', 'source']
+    search_fields = ['from_currency', 'to_currency']
+    date_hierarchy = 'effective_date'
+    ordering = ['from_currency', 'to_currency', '-effective_date']
+
+
+class PriceHistoryAdmin(admin.ModelAdmin):
+    """Read-only: price history is append-only"""
+    list_filter = ['currency', 'source']
+    date_hierarchy = 'effective_from'
+    show_full_result_count = False
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(HardwarePriceHistory)
+class HardwarePriceHistoryAdmin(PriceHistoryAdmin):
+    list_display = ['hardware', 'unit_cost', 'currency', 'effective_from', 'source']
+    search_fields = ['hardware__name', 'hardware__model_number']
+    list_select_related = ['hardware']
+
+
+@admin.register(PersonnelRateHistory)
+class PersonnelRateHistoryAdmin(PriceHistoryAdmin):
+    list_display = ['category', 'hourly_rate', 'currency', 'effective_from', 'source']
+    search_fields = ['category__name']
+    list_select_related = ['category']
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = [
+        'id', 'task', 'status', 'attempts', 'progress_current', 'progress_total',
+        'created_by', 'created_date', 'finished_date'
+    ]
+    list_filter = ['status', 'task']
+    search_fields = ['task', 'idempotency_key']
+    list_select_related = ['created_by']
+    readonly_fields = ['created_date', 'updated_date', 'started_date', 'finished_date']
+    ordering = ['-created_date']
+    show_full_result_count = False
+    actions = ['retry_jobs']
+    
+    @admin.action(description='Retry selected failed jobs')
+    def retry_jobs(self, request, queryset):
+        count = queryset.filter(status='failed').update(
+            status='queued', attempts=0, error='', run_after=timezone.now(), finished_date=None
+        )
+        self.message_user(request, f'Requeued {count} job(s).')
 
 
 @admin.register(QuotationHardware)
 class QuotationHardwareAdmin(admin.ModelAdmin):
-    list_display = ['quotation', 'hardware', 'quantity', 'unit_cost', 'total_cost']
+    list_display = ['quotation', 'hardware', 'quantity', 'unit_cost', 'currency', 'total_cost', 'converted_total']
     list_filter = ['quotation__created_date', 'hardware__category']
     search_fields = ['quotation__quotation_number', 'hardware__name']
-    readonly_fields = ['total_cost']
+    readonly_fields = ['currency', 'total_cost', 'converted_total']
+    # Quotation.__str__ reads customer_request, so follow it in the same join
+    list_select_related = ['quotation__customer_request', 'hardware']
+    raw_id_fields = ['quotation', 'hardware']
+    show_full_result_count = False
+    # Newest quotations first, through quotation_created_idx; the default -pk
+    # order walks the whole table to apply the date filter
+    ordering = ['-quotation__created_date', '-quotation_id', '-id']
 
 
 @admin.register(QuotationPersonnelCost)
 class QuotationPersonnelCostAdmin(admin.ModelAdmin):
-    list_display = ['quotation', 'category', 'hours', 'hourly_rate', 'total_cost']
+    list_display = ['quotation', 'category', 'hours', 'hourly_rate', 'currency', 'total_cost', 'converted_total']
     list_filter = ['quotation__created_date', 'category']
     search_fields = ['quotation__quotation_number', 'category__name']
-    readonly_fields = ['total_cost']
+    readonly_fields = ['currency', 'total_cost', 'converted_total']
+    list_select_related = ['quotation__customer_request', 'category']
+    raw_id_fields = ['quotation']
+    show_full_result_count = False
+    ordering = ['-quotation__created_date', '-quotation_id', '-id']
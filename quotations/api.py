@@ -0,0 +1,282 @@
+"""
+Async JSON API for the interactive quote editor.
+
+The views are coroutines using Django's async ORM interface, so under ASGI
+(see ``gunicorn.conf.py``) a slow client or a burst of editor sessions does
+not hold a worker thread per request. Line-item writes go through the model
+forms and ``save()``, whose totals bookkeeping runs in a transaction, so they
+are wrapped in a single ``sync_to_async`` call each.
+"""
+import functools
+import json
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.views import redirect_to_login
+from django.core.exceptions import ValidationError
+from django.db.models import Prefetch
+from django.http import Http404, HttpResponseNotAllowed, JsonResponse
+
+from .forms import QuotationHardwareForm, QuotationPersonnelCostForm
+from .instrumentation import query_budget
+from .models import Hardware, Quotation, QuotationHardware, QuotationPersonnelCost
+from .pagination import QUOTATION_ORDERING, KeysetPaginator
+from .routers import use_replica
+from .search import search
+
+MAX_BATCH_IDS = 100
+
+QUOTATION_FIELDS = [
+    'id', 'quotation_number', 'customer_request_id', 'currency',
+    'technical_approval', 'sales_approval', 'final_approval',
+    'hardware_total', 'personnel_total', 'markup_percentage', 'markup_amount',
+    'subtotal', 'tax_percentage', 'tax_amount', 'total_amount',
+    'notes', 'valid_until', 'created_date', 'updated_date',
+]
+TOTAL_FIELDS = [
+    'hardware_total', 'personnel_total', 'markup_amount', 'subtotal', 'tax_amount', 'total_amount', 'updated_date',
+]
+
+
+def async_view(*methods):
+    """
+    require_http_methods plus login_required for coroutine views; Django 4.2's
+    own decorators wrap views in sync functions.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in methods:
+                return HttpResponseNotAllowed(methods)
+            # request.user loads the session and user lazily, with blocking queries
+            is_authenticated = await sync_to_async(lambda: request.user.is_authenticated)()
+            if not is_authenticated:
+                return redirect_to_login(request.get_full_path())
+            return await view(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _api_limit(request, default=25, maximum=100):
+    try:
+        return max(1, min(int(request.GET.get('limit', default)), maximum))
+    except ValueError:
+        return default
+
+
+def _quotation_dict(quotation, fields=QUOTATION_FIELDS):
+    data = {name: getattr(quotation, name) for name in fields}
+    data['customer_name'] = quotation.customer_request.customer_name
+    return data
+
+
+def _hardware_item_dict(item):
+    return {
+        'id': item.id,
+        'hardware_id': item.hardware_id,
+        'name': item.hardware.name,
+        'model_number': item.hardware.model_number,
+        'quantity': item.quantity,
+        'unit_cost': item.unit_cost,
+        'currency': item.currency,
+        'total_cost': item.total_cost,
+        'converted_total': item.converted_total,
+        'notes': item.notes,
+    }
+
+
+def _personnel_item_dict(item):
+    return {
+        'id': item.id,
+        'category_id': item.category_id,
+        'name': item.category.name,
+        'hours': item.hours,
+        'hourly_rate': item.hourly_rate,
+        'currency': item.currency,
+        'total_cost': item.total_cost,
+        'converted_total': item.converted_total,
+        'description': item.description,
+    }
+
+
+def _with_line_items(quotations):
+    return quotations.select_related('customer_request').prefetch_related(
+        Prefetch('hardware_items', QuotationHardware.objects.select_related('hardware').order_by('id')),
+        Prefetch('personnel_costs', QuotationPersonnelCost.objects.select_related('category').order_by('id')),
+    )
+
+
+def _detail_dict(quotation):
+    data = _quotation_dict(quotation)
+    data['hardware_items'] = [_hardware_item_dict(item) for item in quotation.hardware_items.all()]
+    data['personnel_costs'] = [_personnel_item_dict(item) for item in quotation.personnel_costs.all()]
+    return data
+
+
+@query_budget(3)
+@async_view('GET')
+@use_replica
+async def quotation_list(request):
+    """Keyset-paginated quotations, newest first (``cursor``, ``limit``, ``approval``)"""
+    quotations = Quotation.objects.all()
+    approval_filter = request.GET.get('approval')
+    if approval_filter == 'approved':
+        quotations = quotations.filter(final_approval=True)
+    elif approval_filter == 'pending':
+        quotations = quotations.filter(final_approval=False)
+    rows = quotations.values(
+        'id', 'quotation_number', 'customer_request__customer_name', 'currency',
+        'final_approval', 'total_amount', 'created_date'
+    )
+    page = await KeysetPaginator(rows, _api_limit(request), QUOTATION_ORDERING).aget_page(request.GET.get('cursor'))
+    return JsonResponse({
+        'results': list(page),
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    })
+
+
+@query_budget(5)
+@async_view('GET')
+@use_replica
+async def quotation_detail(request, pk):
+    """One quotation with its line items"""
+    try:
+        quotation = await _with_line_items(Quotation.objects).aget(pk=pk)
+    except Quotation.DoesNotExist:
+        raise Http404
+    return JsonResponse(_detail_dict(quotation))
+
+
+@query_budget(5)
+@async_view('GET')
+@use_replica
+async def quotation_batch(request):
+    """
+    Several quotations with their line items in three queries
+    (``ids=1,2,3``, at most MAX_BATCH_IDS). Unknown ids are listed in ``missing``.
+    """
+    try:
+        ids = [int(value) for value in request.GET.get('ids', '').split(',') if value.strip()]
+    except ValueError:
+        return JsonResponse({'error': 'ids must be a comma-separated list of integers'}, status=400)
+    if len(ids) > MAX_BATCH_IDS:
+        return JsonResponse({'error': f'At most {MAX_BATCH_IDS} ids per request'}, status=400)
+
+    found = {
+        quotation.pk: _detail_dict(quotation)
+        async for quotation in _with_line_items(Quotation.objects.filter(pk__in=ids))
+    }
+    return JsonResponse({
+        'results': [found[pk] for pk in dict.fromkeys(ids) if pk in found],
+        'missing': [pk for pk in dict.fromkeys(ids) if pk not in found],
+    })
+
+
+@query_budget(3)
+@async_view('GET')
+@use_replica
+async def hardware_search(request):
+    """Ranked search over active hardware (``q``, ``category``, ``limit``)"""
+    hardware = Hardware.objects.filter(is_active=True)
+    category = request.GET.get('category')
+    if category:
+        hardware = hardware.filter(category=category)
+    query = request.GET.get('q', '')
+    if query:
+        hardware = search(hardware, query)
+    rows = hardware.values('id', 'name', 'category', 'model_number', 'unit_cost', 'currency')
+    return JsonResponse({'results': [row async for row in rows[:_api_limit(request, default=10, maximum=50)]]})
+
+
+# Line items -----------------------------------------------------------------
+
+LINE_ITEMS = {
+    'hardware': (QuotationHardware, QuotationHardwareForm, 'hardware', _hardware_item_dict),
+    'personnel': (QuotationPersonnelCost, QuotationPersonnelCostForm, 'category', _personnel_item_dict),
+}
+
+
+def _json_body(request):
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def _save_line_item(kind, quotation_id, item_id, data):
+    """Validate and save a line item; returns (status, payload)"""
+    model, form_class, related, serialize = LINE_ITEMS[kind]
+    if item_id is None:
+        try:
+            quotation = Quotation.objects.get(pk=quotation_id)
+        except Quotation.DoesNotExist:
+            raise Http404
+        instance = model(quotation=quotation)
+    else:
+        try:
+            instance = model.objects.select_related('quotation', related).get(pk=item_id, quotation_id=quotation_id)
+        except model.DoesNotExist:
+            raise Http404
+        # PATCH semantics: fields missing from the body keep their value
+        initial = {name: getattr(instance, name) for name in form_class.Meta.fields}
+        initial[related] = getattr(instance, f'{related}_id')
+        data = {**initial, **data}
+
+    form = form_class(data, instance=instance)
+    if form.is_valid():
+        # The form leaves quotation out of its unique_together check
+        try:
+            form.instance.validate_unique()
+        except ValidationError as exc:
+            form.add_error(None, exc)
+    if not form.is_valid():
+        return 400, {'errors': form.errors.get_json_data()}
+    item = form.save()
+    totals = Quotation.objects.filter(pk=quotation_id).values(*TOTAL_FIELDS).get()
+    return (201 if item_id is None else 200), {'item': serialize(item), 'quotation': totals}
+
+
+def _delete_line_item(kind, quotation_id, item_id):
+    model = LINE_ITEMS[kind][0]
+    try:
+        item = model.objects.get(pk=item_id, quotation_id=quotation_id)
+    except model.DoesNotExist:
+        raise Http404
+    item.delete()
+    return Quotation.objects.filter(pk=quotation_id).values(*TOTAL_FIELDS).get()
+
+
+@async_view('POST')
+async def line_item_create(request, pk, kind):
+    """Add a hardware or personnel line to a quotation"""
+    if kind not in LINE_ITEMS:
+        raise Http404
+    data = _json_body(request)
+    if data is None:
+        return JsonResponse({'error': 'Expected a JSON object'}, status=400)
+    status, payload = await sync_to_async(_save_line_item)(kind, pk, None, data)
+    return JsonResponse(payload, status=status)
+
+
+@async_view('GET', 'PATCH', 'DELETE')
+async def line_item_detail(request, pk, kind, item_pk):
+    """Read, partially update or delete one line item"""
+    if kind not in LINE_ITEMS:
+        raise Http404
+    model, _, related, serialize = LINE_ITEMS[kind]
+    if request.method == 'GET':
+        try:
+            item = await model.objects.select_related(related).aget(pk=item_pk, quotation_id=pk)
+        except model.DoesNotExist:
+            raise Http404
+        return JsonResponse(serialize(item))
+    if request.method == 'DELETE':
+        totals = await sync_to_async(_delete_line_item)(kind, pk, item_pk)
+        return JsonResponse({'deleted': item_pk, 'quotation': totals})
+
+    data = _json_body(request)
+    if data is None:
+        return JsonResponse({'error': 'Expected a JSON object'}, status=400)
+    status, payload = await sync_to_async(_save_line_item)(kind, pk, item_pk, data)
+    return JsonResponse(payload, status=status)
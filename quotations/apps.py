@@ -5,3 +5,12 @@ class QuotationsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'quotations'
     verbose_name = 'Quotation Management'
+    
+    def ready(self):
+        from django.db.models.signals import post_migrate
+        from . import signals, tasks  # noqa: F401
+        from .pricehistory import backfill_price_history
+        from .search import install_search_indexes
+        
+        post_migrate.connect(install_search_indexes, sender=self)
+        post_migrate.connect(backfill_price_history, sender=self)
@@ -0,0 +1,16 @@
+"""
+Benchmark suite for the quotation views.
+
+* ``data``: a synthetic data generator for requests, the hardware catalog,
+  personnel categories, quotations and their line items at a chosen scale
+  (``manage.py generate_benchmark_data``).
+* ``micro``: per-endpoint micro-benchmarks through the Django test client,
+  recording latency percentiles, queries and response size.
+* ``load``: a concurrent load driver, in-process or against a running server.
+* ``projections``: bytes fetched and memory held per row by the list
+  views' querysets, with and without their deferred text columns.
+* ``results``: JSON result files and the comparison that flags regressions.
+
+``manage.py run_benchmarks`` ties them together. Run it against a dedicated
+database (``DB_NAME=bench.sqlite3``), never the production one.
+"""
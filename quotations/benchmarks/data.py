@@ -0,0 +1,284 @@
+"""
+Synthetic data at a configurable scale.
+
+Rows are written with ``bulk_create`` in batches, one transaction each, so
+model ``save()`` and the post_save bookkeeping are skipped. The generator
+fills in what they would have: line totals and converted totals, quotation
+totals and approval stages, the initial price history and the dashboard
+counters. The SQLite search index is kept by its triggers. Creation dates
+are spread over ``days`` so the lists, filters and rollups see realistic
+distributions. Everything is seeded, so a scale and seed always produce the
+same data.
+"""
+import random
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from .. import pagecache, typeahead
+from ..models import (
+    CustomerQuotationRequest, Hardware, PersonnelCostCategory,
+    Quotation, QuotationHardware, QuotationPersonnelCost
+)
+from ..pricehistory import backfill_price_history
+from ..pricing import compute_totals, quantize
+from ..stats import reconcile_counters
+
+BENCHMARK_USERNAME = 'benchmark'
+NUMBER_PREFIX = 'BM'
+
+CATEGORIES = [
+    'Sensors', 'Controllers', 'Gateways', 'Displays', 'Power', 'Enclosures',
+    'Cables', 'Antennas', 'Storage', 'Cameras', 'Actuators', 'Networking',
+]
+MANUFACTURERS = ['Acme', 'Globex', 'Initech', 'Umbrella', 'Hooli', 'Vandelay', 'Stark', 'Wayne']
+WORDS = [
+    'temperature', 'humidity', 'pressure', 'motion', 'module', 'board', 'relay',
+    'wireless', 'industrial', 'compact', 'outdoor', 'bluetooth', 'zigbee', 'lora',
+    'ethernet', 'solar', 'battery', 'panel', 'array', 'bridge', 'hub', 'probe',
+]
+ROLES = ['Engineer', 'Technician', 'Designer', 'Installer', 'Consultant', 'Project Manager', 'Tester', 'Analyst']
+STATUSES = ['pending', 'in_progress', 'quoted', 'approved', 'rejected']
+
+
+@dataclass
+class Scale:
+    requests: int
+    hardware: int
+    categories: int
+    quotations: int
+    hardware_lines: int
+    personnel_lines: int
+    days: int = 730
+    # Extra words in the free-text columns (descriptions, connectivity, notes)
+    text_words: int = 0
+
+
+SCALES = {
+    'small': Scale(requests=2_000, hardware=1_000, categories=20, quotations=500,
+                   hardware_lines=20, personnel_lines=3),
+    'medium': Scale(requests=100_000, hardware=20_000, categories=50, quotations=10_000,
+                    hardware_lines=100, personnel_lines=5),
+    'large': Scale(requests=1_000_000, hardware=100_000, categories=100, quotations=20_000,
+                   hardware_lines=500, personnel_lines=10),
+}
+
+
+@contextmanager
+def _explicit_timestamps(*models):
+    """Let bulk_create keep the given created/updated dates instead of now()"""
+    fields = [
+        field for model in models for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def _batches(count, size):
+    for start in range(0, count, size):
+        yield start, min(size, count - start)
+
+
+class Generator:
+    """Writes one scale of data; ``log`` receives progress lines"""
+
+    def __init__(self, scale, seed=0, batch_size=2000, log=None):
+        self.scale = scale
+        self.random = random.Random(seed)
+        self.batch_size = batch_size
+        self.log = log or (lambda message: None)
+        self.now = timezone.now()
+        self.counts = {}
+
+    def _date(self):
+        return self.now - timedelta(seconds=self.random.randrange(self.scale.days * 86400))
+
+    def _words(self, count):
+        return ' '.join(self.random.choice(WORDS) for _ in range(count))
+
+    def _bulk(self, model, count, build, keep):
+        """
+        Create ``count`` rows of ``model`` from ``build(index)`` in batches;
+        returns ``keep(instance)`` for each (only what later steps need)
+        """
+        started = time.perf_counter()
+        created = []
+        for start, size in _batches(count, self.batch_size):
+            with transaction.atomic():
+                batch = model.objects.bulk_create([build(start + offset) for offset in range(size)])
+            created.extend(keep(instance) for instance in batch)
+        self.counts[model._meta.model_name] = count
+        self.log(f'{model.__name__}: {count} rows in {time.perf_counter() - started:.1f}s')
+        return created
+
+    def users(self):
+        user, created = User.objects.get_or_create(
+            username=BENCHMARK_USERNAME, defaults={'is_staff': True, 'is_superuser': True}
+        )
+        if created:
+            user.set_password(BENCHMARK_USERNAME)
+            user.save()
+        staff = [user]
+        for number in range(4):
+            staff.append(User.objects.get_or_create(username=f'{BENCHMARK_USERNAME}-{number}')[0])
+        return staff
+
+    def requests(self):
+        def build(index):
+            created = self._date()
+            return CustomerQuotationRequest(
+                request_number=f'{NUMBER_PREFIX}R-{index:07d}',
+                customer_name=f'{self.random.choice(["Alex", "Sam", "Kim", "Lee", "Jo"])} Customer{index}',
+                customer_email=f'customer{index}@example.com',
+                company_name=f'{self.random.choice(MANUFACTURERS)} {self.random.choice(["Ltd", "Inc", "GmbH"])}',
+                project_description=self._words(12 + self.scale.text_words),
+                quantity=self.random.randint(1, 500),
+                status=self.random.choice(STATUSES),
+                created_date=created, updated_date=created,
+            )
+        return self._bulk(CustomerQuotationRequest, self.scale.requests, build, keep=lambda request: request.pk)
+
+    def hardware(self):
+        def build(index):
+            created = self._date()
+            return Hardware(
+                name=f'{self._words(2).title()} {index}',
+                description=self._words(20 + self.scale.text_words),
+                connectivity_options=self._words(self.scale.text_words // 4),
+                category=self.random.choice(CATEGORIES),
+                manufacturer=self.random.choice(MANUFACTURERS),
+                model_number=f'{NUMBER_PREFIX}-{index:06d}',
+                unit_cost=Decimal(self.random.randrange(100, 500_000)) / 100,
+                supplier=self.random.choice(MANUFACTURERS),
+                lead_time_days=self.random.randint(0, 60),
+                is_active=self.random.random() > 0.05,
+                created_date=created, updated_date=created,
+            )
+        return self._bulk(Hardware, self.scale.hardware, build, keep=lambda item: (item.pk, item.unit_cost))
+
+    def categories(self):
+        def build(index):
+            return PersonnelCostCategory(
+                name=f'{ROLES[index % len(ROLES)]} {index // len(ROLES) + 1}',
+                hourly_rate=Decimal(self.random.randrange(4_000, 25_000)) / 100,
+            )
+        return self._bulk(
+            PersonnelCostCategory, self.scale.categories, build, keep=lambda item: (item.pk, item.hourly_rate)
+        )
+
+    def _lines(self, hardware, categories):
+        hardware_lines = []
+        for hardware_id, unit_cost in self.random.sample(hardware, min(self.scale.hardware_lines, len(hardware))):
+            quantity = self.random.randint(1, 20)
+            total = quantize(unit_cost * quantity)
+            hardware_lines.append(QuotationHardware(
+                hardware_id=hardware_id, quantity=quantity, unit_cost=unit_cost,
+                total_cost=total, currency='USD', converted_total=total,
+            ))
+        personnel_lines = []
+        for category_id, rate in self.random.sample(categories, min(self.scale.personnel_lines, len(categories))):
+            hours = Decimal(self.random.randint(4, 400)) / 2
+            total = quantize(hours * rate)
+            personnel_lines.append(QuotationPersonnelCost(
+                category_id=category_id, hours=hours, hourly_rate=rate,
+                total_cost=total, currency='USD', converted_total=total,
+            ))
+        return hardware_lines, personnel_lines
+
+    def quotations(self, staff, request_ids, hardware, categories):
+        started = time.perf_counter()
+        lines_per_quote = max(1, self.scale.hardware_lines + self.scale.personnel_lines)
+        quotes_per_batch = max(1, self.batch_size // lines_per_quote)
+        line_counts = [0, 0]
+        for start, size in _batches(self.scale.quotations, quotes_per_batch):
+            quotations, lines = [], []
+            for index in range(start, start + size):
+                hardware_lines, personnel_lines = self._lines(hardware, categories)
+                created = self._date()
+                approved = self.random.randint(0, 3)
+                quotation = Quotation(
+                    quotation_number=f'{NUMBER_PREFIX}-{index:07d}',
+                    customer_request_id=self.random.choice(request_ids),
+                    created_by=self.random.choice(staff),
+                    created_date=created, updated_date=created,
+                    technical_approval=approved >= 1,
+                    sales_approval=approved >= 2,
+                    final_approval=approved >= 3,
+                    hardware_total=sum((line.converted_total for line in hardware_lines), Decimal('0')),
+                    personnel_total=sum((line.converted_total for line in personnel_lines), Decimal('0')),
+                    markup_percentage=Decimal(self.random.choice([0, 10, 15, 20, 25])),
+                    tax_percentage=Decimal(self.random.choice([0, 5, 8, 20])),
+                    valid_until=(created + timedelta(days=30)).date(),
+                    notes=self._words(self.scale.text_words),
+                )
+                quotation.approval_stage = quotation.derive_approval_stage()
+                for field, value in compute_totals(
+                    quotation.hardware_total, quotation.personnel_total,
+                    quotation.markup_percentage, quotation.tax_percentage,
+                ).items():
+                    setattr(quotation, field, value)
+                quotations.append(quotation)
+                lines.append((hardware_lines, personnel_lines))
+
+            with transaction.atomic():
+                Quotation.objects.bulk_create(quotations)
+                for quotation, (hardware_lines, personnel_lines) in zip(quotations, lines):
+                    for line in hardware_lines + personnel_lines:
+                        line.quotation_id = quotation.pk
+                QuotationHardware.objects.bulk_create(
+                    [line for hardware_lines, _ in lines for line in hardware_lines], batch_size=self.batch_size
+                )
+                QuotationPersonnelCost.objects.bulk_create(
+                    [line for _, personnel_lines in lines for line in personnel_lines], batch_size=self.batch_size
+                )
+            line_counts[0] += sum(len(hardware_lines) for hardware_lines, _ in lines)
+            line_counts[1] += sum(len(personnel_lines) for _, personnel_lines in lines)
+            if start and not start % (quotes_per_batch * 50):
+                self.log(f'  {start + size} quotations')
+
+        self.counts['quotation'] = self.scale.quotations
+        self.counts['quotationhardware'], self.counts['quotationpersonnelcost'] = line_counts
+        self.log(
+            f'Quotation: {self.scale.quotations} rows, {sum(line_counts)} lines '
+            f'in {time.perf_counter() - started:.1f}s'
+        )
+
+    def run(self):
+        with _explicit_timestamps(CustomerQuotationRequest, Hardware, Quotation):
+            staff = self.users()
+            request_ids = self.requests()
+            hardware = self.hardware()
+            categories = self.categories()
+            self.quotations(staff, request_ids, hardware, categories)
+
+        started = time.perf_counter()
+        backfill_price_history(batch_size=self.batch_size)
+        reconcile_counters()
+        typeahead.invalidate()
+        pagecache.bump_catalog_version()
+        self.log(f'Price history and counters in {time.perf_counter() - started:.1f}s')
+        return self.counts
+
+
+def existing_benchmark_data():
+    return Quotation.objects.filter(quotation_number__startswith=f'{NUMBER_PREFIX}-').exists()
+
+
+def generate(scale, seed=0, batch_size=2000, log=None):
+    """Write ``scale`` (a ``Scale``) worth of data; returns the row counts"""
+    if existing_benchmark_data():
+        raise ValueError('The database already holds benchmark data; use a fresh database')
+    return Generator(scale, seed=seed, batch_size=batch_size, log=log).run()
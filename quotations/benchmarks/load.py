@@ -0,0 +1,119 @@
+"""
+Concurrent load driver.
+
+``concurrency`` workers request a weighted mix of the micro-benchmark cases
+back to back for ``duration`` seconds. In-process (the default) each worker
+is a thread with its own test client and database connection, which
+measures the application and database without a web server. With
+``base_url`` the workers send real HTTP requests to a running server (for
+example gunicorn with the settings in ``gunicorn.conf.py``), authenticated
+by an optional session cookie.
+"""
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from django.db import connections
+
+from .micro import latency_stats, logged_in_client, ok, quiet_request_logs, request_once
+
+# Relative frequency of each case in the mix; unlisted cases get weight 1
+WEIGHTS = {
+    'quotation_list': 5,
+    'customer_request_list': 5,
+    'hardware_list': 5,
+    'api_hardware_typeahead': 10,
+    'api_hardware_search': 5,
+    'api_editor_quotation_detail': 5,
+    'quotation_detail': 3,
+}
+
+
+class HttpClient:
+    """The part of the test client interface the driver uses, over real HTTP"""
+
+    def __init__(self, base_url, cookie=None):
+        self.base_url = base_url.rstrip('/')
+        self.headers = {'Cookie': cookie} if cookie else {}
+
+    def get(self, path):
+        request = urllib.request.Request(self.base_url + path, headers=self.headers)
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                return _HttpResponse(response.status, response.read())
+        except urllib.error.HTTPError as exc:
+            return _HttpResponse(exc.code, exc.read())
+
+
+class _HttpResponse:
+    streaming = False
+
+    def __init__(self, status_code, content):
+        self.status_code = status_code
+        self.content = content
+
+
+def _worker(client, cases, weights, deadline, seed, samples, lock):
+    chooser = random.Random(seed)
+    local = {}
+    try:
+        while time.monotonic() < deadline:
+            case = chooser.choices(cases, weights)[0]
+            status, elapsed, _, _ = request_once(client, case.path())
+            entry = local.setdefault(case.name, {'latencies': [], 'requests': 0, 'errors': 0})
+            entry['requests'] += 1
+            if elapsed is not None:
+                entry['latencies'].append(elapsed)
+            if elapsed is None or not ok(status):
+                entry['errors'] += 1
+    finally:
+        connections.close_all()
+        with lock:
+            for name, entry in local.items():
+                total = samples.setdefault(name, {'latencies': [], 'requests': 0, 'errors': 0})
+                total['latencies'] += entry['latencies']
+                total['requests'] += entry['requests']
+                total['errors'] += entry['errors']
+
+
+def run_load(user, cases, concurrency=8, duration=30.0, base_url=None, cookie=None, seed=0):
+    """
+    Drive ``cases`` from ``concurrency`` workers for ``duration`` seconds;
+    returns overall throughput and latency plus a per-case breakdown
+    """
+    weights = [WEIGHTS.get(case.name, 1) for case in cases]
+    samples = {}
+    lock = threading.Lock()
+    clients = [
+        HttpClient(base_url, cookie) if base_url else logged_in_client(user)
+        for _ in range(concurrency)
+    ]
+    deadline = time.monotonic() + duration
+    started = time.perf_counter()
+    threads = [
+        threading.Thread(target=_worker, args=(client, cases, weights, deadline, seed + number, samples, lock))
+        for number, client in enumerate(clients)
+    ]
+    with quiet_request_logs():
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    elapsed = time.perf_counter() - started
+
+    requests = sum(entry['requests'] for entry in samples.values())
+    return {
+        'target': base_url or 'in-process',
+        'concurrency': concurrency,
+        'duration': elapsed,
+        'requests': requests,
+        'requests_per_second': requests / elapsed if elapsed else 0.0,
+        'errors': sum(entry['errors'] for entry in samples.values()),
+        **latency_stats([latency for entry in samples.values() for latency in entry['latencies']]),
+        'cases': {
+            name: {'requests': entry['requests'], 'errors': entry['errors'], **latency_stats(entry['latencies'])}
+            for name, entry in sorted(samples.items())
+        },
+    }
@@ -0,0 +1,188 @@
+"""
+Per-endpoint micro-benchmarks through the Django test client.
+
+Every case is requested ``warmup`` times untimed, then ``iterations`` times
+timed, as the benchmark superuser. A case records latency percentiles, the
+queries one request issues (the deterministic part, so the most reliable
+regression signal) and the response size. Requests that do not return 2xx
+or 304 count as errors; the case still reports them rather than stopping
+the run. Only read-only endpoints are included, so runs do not change the
+data they measure.
+"""
+import logging
+import statistics
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+from django.test import Client
+from django.urls import reverse
+
+from ..instrumentation import QueryRecorder
+from ..models import CustomerQuotationRequest, Hardware, Quotation
+
+
+@dataclass
+class Case:
+    name: str
+    url_name: str
+    kwargs: dict = field(default_factory=dict)
+    query: str = ''
+
+    def path(self):
+        return reverse(self.url_name, kwargs=self.kwargs) + (f'?{self.query}' if self.query else '')
+
+
+def _middle_pk(queryset):
+    """A row from the middle of the table, so lookups are not the first page's"""
+    count = queryset.count()
+    return queryset.order_by('pk').values_list('pk', flat=True)[count // 2] if count else None
+
+
+def sample_cases():
+    """The cases for the current data; those without sample rows are left out"""
+    request_pk = _middle_pk(CustomerQuotationRequest.objects.all())
+    quotation_pk = _middle_pk(Quotation.objects.all())
+    hardware = Hardware.objects.filter(pk=_middle_pk(Hardware.objects.filter(is_active=True))).first()
+    term = hardware.name.split()[0].lower() if hardware else 'sensor'
+    category = hardware.category if hardware else 'Sensors'
+
+    cases = [
+        Case('home', 'home'),
+        Case('customer_request_list', 'customer_request_list'),
+        Case('customer_request_list ?status', 'customer_request_list', query='status=pending'),
+        Case('customer_request_list ?search', 'customer_request_list', query=f'search={term}'),
+        Case('quotation_list', 'quotation_list'),
+        Case('quotation_list ?approval', 'quotation_list', query='approval=approved'),
+        Case('hardware_list', 'hardware_list'),
+        Case('hardware_list ?category', 'hardware_list', query=f'category={category}'),
+        Case('hardware_list ?search', 'hardware_list', query=f'search={term}'),
+        Case('api_customer_request_list', 'api_customer_request_list'),
+        Case('api_quotation_list', 'api_quotation_list'),
+        Case('api_hardware_list', 'api_hardware_list'),
+        Case('api_hardware_search', 'api_hardware_search', query=f'q={term}'),
+        Case('api_hardware_typeahead', 'api_hardware_typeahead', query=f'q={term[:3]}'),
+        Case('api_personnel_categories', 'api_personnel_categories'),
+        Case('api_approval_queue', 'api_approval_queue', {'stage': 'technical'}),
+        Case('api_editor_quotation_list', 'api_editor_quotation_list'),
+        Case('api_editor_hardware_search', 'api_editor_hardware_search', query=f'q={term}'),
+        Case('api_job_list', 'api_job_list'),
+        Case('api_report quotations', 'api_report', {'name': 'quotations'}),
+        Case('api_report hardware-spend', 'api_report', {'name': 'hardware-spend'}),
+        Case('metrics', 'metrics'),
+    ]
+    if request_pk:
+        cases.append(Case('customer_request_detail', 'customer_request_detail', {'pk': request_pk}))
+    if hardware:
+        cases.append(Case('hardware_detail', 'hardware_detail', {'pk': hardware.pk}))
+    if quotation_pk:
+        cases += [
+            Case('quotation_detail', 'quotation_detail', {'pk': quotation_pk}),
+            Case('quotation_document (html)', 'quotation_document', {'pk': quotation_pk, 'fmt': 'html'}),
+            Case('api_editor_quotation_detail', 'api_editor_quotation_detail', {'pk': quotation_pk}),
+            Case('api_editor_quotation_batch', 'api_editor_quotation_batch', query=f'ids={quotation_pk}'),
+        ]
+    if hardware and quotation_pk:
+        cases.append(Case('api_reprice ?hardware', 'api_reprice', query=f'hardware={hardware.pk}'))
+    return cases
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def latency_stats(latencies):
+    """Summary of a list of latencies in milliseconds"""
+    return {
+        'count': len(latencies),
+        'mean_ms': statistics.fmean(latencies) if latencies else 0.0,
+        'min_ms': min(latencies, default=0.0),
+        'p50_ms': statistics.median(latencies) if latencies else 0.0,
+        'p95_ms': percentile(latencies, 0.95),
+        'p99_ms': percentile(latencies, 0.99),
+        'max_ms': max(latencies, default=0.0),
+    }
+
+
+@contextmanager
+def quiet_request_logs():
+    """
+    Silence the per-request error and slow-request logs while benchmarking;
+    writing them would be measured too
+    """
+    loggers = [logging.getLogger(name) for name in ('django.request', 'quotations.performance')]
+    levels = [logger.level for logger in loggers]
+    for logger in loggers:
+        logger.setLevel(logging.CRITICAL)
+    try:
+        yield
+    finally:
+        for logger, level in zip(loggers, levels):
+            logger.setLevel(level)
+
+
+def logged_in_client(user):
+    client = Client(SERVER_NAME='localhost')
+    client.force_login(user)
+    return client
+
+
+def ok(status_code):
+    return 200 <= status_code < 300 or status_code == 304
+
+
+def _size(response):
+    if response.streaming:
+        return sum(len(chunk) for chunk in response.streaming_content)
+    return len(response.content)
+
+
+def request_once(client, path):
+    """(status, milliseconds, queries, bytes) of one GET; status is the exception name on a crash"""
+    with QueryRecorder() as recorder:
+        started = time.perf_counter()
+        try:
+            response = client.get(path)
+        except Exception as exc:
+            return exc.__class__.__name__, None, recorder.count, 0
+        elapsed = (time.perf_counter() - started) * 1000
+    return response.status_code, elapsed, recorder.count, _size(response)
+
+
+def run_case(client, case, iterations=50, warmup=5):
+    path = case.path()
+    for _ in range(warmup):
+        request_once(client, path)
+
+    latencies = []
+    errors = queries = size = 0
+    status = None
+    for _ in range(iterations):
+        status, elapsed, queries, size = request_once(client, path)
+        if elapsed is None or not ok(status):
+            errors += 1
+        if elapsed is not None:
+            latencies.append(elapsed)
+    return {
+        'path': path,
+        'status': status,
+        'errors': errors,
+        'queries': queries,
+        'bytes': size,
+        **latency_stats(latencies),
+    }
+
+
+def run_microbenchmarks(user, cases=None, iterations=50, warmup=5, log=None):
+    """Run ``cases`` (all sample cases by default); returns {name: result}"""
+    client = logged_in_client(user)
+    results = {}
+    with quiet_request_logs():
+        for case in cases if cases is not None else sample_cases():
+            results[case.name] = result = run_case(client, case, iterations, warmup)
+            if log:
+                log(case.name, result)
+    return results
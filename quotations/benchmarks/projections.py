@@ -0,0 +1,101 @@
+"""
+List projection benchmark: what leaving the heavy text columns out saves.
+
+For the request, quotation and hardware lists it reads the same rows twice,
+once with every column and once with the list view's ``defer()``
+projection, and records per row:
+
+* ``bytes_per_row``: size of the values the database returned, read from the raw
+  cursor (text as UTF-8, other values at their text size), i.e. what
+  crossed the connection before Django built anything;
+* ``memory_per_row``: Python memory held by the model instances built from them
+  (tracemalloc, so this part runs several times slower than usual).
+"""
+import tracemalloc
+from datetime import date, datetime
+
+from django.db import connections
+
+from ..models import CustomerQuotationRequest, Hardware, Quotation
+from ..pagination import HARDWARE_ORDERING, QUOTATION_ORDERING, REQUEST_ORDERING
+from ..views import HARDWARE_LIST_DEFER, QUOTATION_LIST_DEFER, REQUEST_LIST_DEFER
+
+
+def list_querysets():
+    """name -> (the list view's queryset with every column, its deferred columns)"""
+    return {
+        'request list': (CustomerQuotationRequest.objects.order_by(*REQUEST_ORDERING), REQUEST_LIST_DEFER),
+        'quotation list': (
+            Quotation.objects.select_related('customer_request', 'created_by').order_by(*QUOTATION_ORDERING),
+            QUOTATION_LIST_DEFER,
+        ),
+        'hardware list': (Hardware.objects.filter(is_active=True).order_by(*HARDWARE_ORDERING), HARDWARE_LIST_DEFER),
+    }
+
+
+def _size(value):
+    if value is None:
+        return 0
+    if isinstance(value, str):
+        return len(value.encode())
+    if isinstance(value, (bytes, memoryview)):
+        return len(value)
+    if isinstance(value, (date, datetime)):
+        return len(value.isoformat())
+    # Numbers, decimals, booleans
+    return len(str(value))
+
+
+def fetched_bytes(queryset):
+    """Total size of the raw values ``queryset``'s SQL returns, and the column count"""
+    sql, params = queryset.query.sql_with_params()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(sql, params)
+        columns = len(cursor.description)
+        total = sum(_size(value) for row in cursor.fetchall() for value in row)
+    return total, columns
+
+
+def instance_memory(queryset):
+    """Bytes allocated and still held by the model instances of ``queryset``"""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        instances = list(queryset)
+        held = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    return held, len(instances)
+
+
+def _measure(queryset):
+    total, columns = fetched_bytes(queryset)
+    memory, count = instance_memory(queryset)
+    count = max(count, 1)
+    return {
+        'rows': count,
+        'columns': columns,
+        'bytes_per_row': round(total / count, 1),
+        'memory_per_row': round(memory / count, 1),
+    }
+
+
+def _saving(full, deferred):
+    return round(100 * (1 - deferred / full), 1) if full else 0.0
+
+
+def run_projection_benchmark(rows=500, log=None):
+    """``{list: {'full': ..., 'deferred': ..., 'bytes_saved_pct', 'memory_saved_pct'}}`` over ``rows`` rows"""
+    results = {}
+    for name, (queryset, deferred_fields) in list_querysets().items():
+        full = _measure(queryset[:rows])
+        deferred = _measure(queryset.defer(*deferred_fields)[:rows])
+        results[name] = {
+            'full': full,
+            'deferred': deferred,
+            'bytes_saved_pct': _saving(full['bytes_per_row'], deferred['bytes_per_row']),
+            'memory_saved_pct': _saving(full['memory_per_row'], deferred['memory_per_row']),
+        }
+        if log:
+            log(name, results[name])
+    return results
@@ -0,0 +1,108 @@
+"""
+Benchmark result files and regression checks.
+
+A result file is JSON: ``meta`` (when, which commit, which database, row
+counts), ``micro`` ({case: result}) and optionally ``load`` and
+``projections`` ({list: full and deferred row sizes}). ``compare`` matches
+a run against a baseline file case by case and flags:
+
+* a query-count increase (always; query counts do not vary between runs);
+* a p50 latency more than ``threshold`` (a fraction) above the baseline's,
+  ignoring differences under ``min_ms``, which are noise;
+* new errors;
+* a load-test throughput drop of more than ``threshold``;
+* a list projection that fetches more columns, or more than ``threshold``
+  more bytes per row, than the baseline's.
+"""
+import json
+import platform
+import subprocess
+from dataclasses import dataclass
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from ..models import CustomerQuotationRequest, Hardware, Quotation, QuotationHardware
+
+
+@dataclass
+class Regression:
+    case: str
+    metric: str
+    baseline: float
+    current: float
+
+    def __str__(self):
+        return f'{self.case}: {self.metric} {self.baseline:g} -> {self.current:g}'
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+def run_metadata():
+    return {
+        'created': timezone.now().isoformat(),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'database': connection.vendor,
+        'rows': {
+            model._meta.model_name: model.objects.count()
+            for model in (CustomerQuotationRequest, Hardware, Quotation, QuotationHardware)
+        },
+    }
+
+
+def save_results(path, results):
+    Path(path).write_text(json.dumps(results, indent=2, default=str))
+
+
+def load_results(path):
+    return json.loads(Path(path).read_text())
+
+
+def compare(baseline, current, threshold=0.2, min_ms=1.0):
+    """Regressions of ``current`` against ``baseline`` (both result dicts)"""
+    regressions = []
+    for name, result in current.get('micro', {}).items():
+        before = baseline.get('micro', {}).get(name)
+        if before is None:
+            continue
+        if result['queries'] > before['queries']:
+            regressions.append(Regression(name, 'queries', before['queries'], result['queries']))
+        if result['errors'] > before['errors']:
+            regressions.append(Regression(name, 'errors', before['errors'], result['errors']))
+        if (
+            result['p50_ms'] > before['p50_ms'] * (1 + threshold)
+            and result['p50_ms'] - before['p50_ms'] >= min_ms
+        ):
+            regressions.append(Regression(name, 'p50_ms', round(before['p50_ms'], 2), round(result['p50_ms'], 2)))
+
+    load, load_before = current.get('load'), baseline.get('load')
+    if load and load_before and load['concurrency'] == load_before['concurrency']:
+        if load['requests_per_second'] < load_before['requests_per_second'] * (1 - threshold):
+            regressions.append(Regression(
+                'load', 'requests_per_second',
+                round(load_before['requests_per_second'], 1), round(load['requests_per_second'], 1),
+            ))
+
+    for name, result in current.get('projections', {}).items():
+        before = baseline.get('projections', {}).get(name)
+        if before is None:
+            continue
+        result, before = result['deferred'], before['deferred']
+        if result['columns'] > before['columns']:
+            regressions.append(Regression(f'{name} projection', 'columns', before['columns'], result['columns']))
+        if result['bytes_per_row'] > before['bytes_per_row'] * (1 + threshold):
+            regressions.append(Regression(
+                f'{name} projection', 'bytes_per_row', before['bytes_per_row'], result['bytes_per_row']
+            ))
+    return regressions
@@ -0,0 +1,231 @@
+"""
+Supplier price-file synchronisation for the hardware catalog.
+
+The file is consumed in fixed-size batches so memory stays bounded by the
+batch size (plus one primary key per matched SKU for deactivation). Rows are
+matched on (manufacturer, model_number); each side is reduced to a content
+hash over the synced columns and only rows whose hash differs are written.
+"""
+import hashlib
+import time
+from dataclasses import dataclass
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from . import pagecache, typeahead
+from .models import Hardware
+from .pricehistory import record_prices
+
+KEY_FIELDS = ('manufacturer', 'model_number')
+
+# Columns a supplier file may carry, with their normalisers
+SYNC_FIELDS = {
+    'name': str,
+    'description': str,
+    'category': str,
+    'unit_cost': lambda value: str(Decimal(value).quantize(Decimal('0.01'))),
+    'currency': lambda value: str(value).upper(),
+    'supplier': str,
+    'lead_time_days': int,
+    'minimum_order_quantity': int,
+}
+
+
+@dataclass
+class CatalogSyncStats:
+    rows: int = 0
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    deactivated: int = 0
+    errors: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+def _validate(name, value):
+    """Check a normalised value against its Hardware field; raises ValueError with the reason"""
+    model_field = Hardware._meta.get_field(name)
+    try:
+        value = model_field.to_python(value)
+        # Lengths, digits and decimal places, non-finite numbers
+        model_field.run_validators(value)
+    except ValidationError as exc:
+        raise ValueError(f'{name}: {" ".join(exc.messages)}')
+    if isinstance(value, (int, Decimal)) and value < 0:
+        raise ValueError(f'{name} must not be negative')
+
+
+def _normalise(row, fields, validate=False):
+    values = {}
+    for name in fields:
+        raw = row.get(name)
+        if raw is None:
+            continue
+        try:
+            values[name] = SYNC_FIELDS[name](raw.strip() if isinstance(raw, str) else raw)
+        except (ValueError, InvalidOperation):
+            raise ValueError(f'{name}: invalid value {raw!r}')
+        if validate:
+            _validate(name, values[name])
+    return values
+
+
+def content_hash(values):
+    """Stable hash of the synced column values (plus the active flag)"""
+    digest = hashlib.sha1()
+    for name in sorted(values):
+        digest.update(f'{name}={values[name]}\x1f'.encode())
+    return digest.hexdigest()
+
+
+def _batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _sync_batch(batch, fields, supplier, stats, seen, stderr=None):
+    """Upsert one batch of ``(line_number, row)`` pairs"""
+    incoming = {}
+    for line_number, row in batch:
+        key = (row.get('manufacturer', '').strip(), row.get('model_number', '').strip())
+        if not key[1]:
+            stats.errors += 1
+            if stderr:
+                stderr(f'line {line_number}: model_number is required')
+            continue
+        try:
+            values = _normalise(row, fields, validate=True)
+        except (ValueError, InvalidOperation) as exc:
+            stats.errors += 1
+            if stderr:
+                stderr(f'line {line_number}: {exc}')
+            continue
+        if supplier and 'supplier' not in values:
+            values['supplier'] = supplier
+        values['is_active'] = True
+        # Later rows for the same SKU win
+        incoming[key] = values
+
+    if not incoming:
+        return
+
+    compared = [name for name in SYNC_FIELDS if any(name in values for values in incoming.values())]
+    existing = {}
+    candidates = Hardware.objects.filter(
+        model_number__in={model_number for _, model_number in incoming}
+    ).only('pk', *KEY_FIELDS, *compared, 'unit_cost', 'currency', 'is_active')
+    for hardware in candidates:
+        existing.setdefault((hardware.manufacturer, hardware.model_number), hardware)
+
+    now = timezone.now()
+    to_create, to_update, repriced = [], [], []
+    for key, values in incoming.items():
+        hardware = existing.get(key)
+        if hardware is None:
+            if 'unit_cost' not in values:
+                stats.errors += 1
+                if stderr:
+                    stderr(f'{key[0]} {key[1]}: new SKU without unit_cost')
+                continue
+            values.setdefault('name', key[1])
+            values.setdefault('category', 'Uncategorised')
+            to_create.append(Hardware(manufacturer=key[0], model_number=key[1], **values))
+            continue
+
+        seen.add(hardware.pk)
+        current = _normalise(
+            {name: getattr(hardware, name) for name in values if name != 'is_active'},
+            [name for name in values if name != 'is_active'],
+        )
+        current['is_active'] = hardware.is_active
+        if content_hash(current) == content_hash(values):
+            stats.unchanged += 1
+            continue
+        for name, value in values.items():
+            setattr(hardware, name, value)
+        hardware.updated_date = now
+        to_update.append(hardware)
+        if Decimal(hardware.unit_cost) != hardware.saved_value('unit_cost') or (
+            hardware.currency != hardware.saved_value('currency')
+        ):
+            repriced.append(hardware)
+
+    if not to_create and not to_update:
+        return
+    with transaction.atomic():
+        created = Hardware.objects.bulk_create(to_create)
+        if to_update:
+            update_fields = sorted({name for values in incoming.values() for name in values} | {'updated_date'})
+            Hardware.objects.bulk_update(to_update, update_fields)
+        # Bulk writes bypass the post_save receiver that keeps the price history
+        record_prices([hardware for hardware in created if hardware.pk], source='catalog sync', effective_from=now)
+        record_prices(repriced, source='catalog sync', effective_from=now)
+    seen.update(hardware.pk for hardware in created if hardware.pk)
+    stats.created += len(to_create)
+    stats.updated += len(to_update)
+
+
+def _deactivate_missing(supplier, seen, batch_size):
+    """Deactivate active, matchable SKUs in scope that the file did not mention"""
+    scope = Hardware.objects.filter(is_active=True).exclude(model_number='')
+    if supplier:
+        scope = scope.filter(supplier=supplier)
+
+    deactivated = 0
+    last_pk = 0
+    now = timezone.now()
+    while True:
+        chunk = list(
+            scope.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size]
+        )
+        if not chunk:
+            return deactivated
+        last_pk = chunk[-1]
+        missing = [pk for pk in chunk if pk not in seen]
+        if missing:
+            deactivated += Hardware.objects.filter(pk__in=missing).update(
+                is_active=False, updated_date=now
+            )
+
+
+def sync_catalog(rows, supplier=None, batch_size=1000, deactivate_missing=True, stderr=None):
+    """
+    Synchronise the catalog with an iterable of ``(line_number, row)`` pairs.
+
+    ``supplier`` fills the supplier column when the file has none and limits
+    deactivation of missing SKUs to that supplier's rows. Deactivation is
+    skipped when any row failed to parse, so a damaged file cannot retire
+    SKUs it merely failed to mention.
+    """
+    stats = CatalogSyncStats()
+    seen = set()
+    started = time.monotonic()
+
+    for batch in _batched(rows, batch_size):
+        # JSON rows need not share their keys; take every column the batch carries
+        fields = [name for name in SYNC_FIELDS if any(name in row for _, row in batch)]
+        stats.rows += len(batch)
+        _sync_batch(batch, fields, supplier, stats, seen, stderr=stderr)
+
+    if deactivate_missing and stats.rows and not stats.errors:
+        stats.deactivated = _deactivate_missing(supplier, seen, batch_size)
+
+    if stats.created or stats.updated or stats.deactivated:
+        # Bulk writes bypass the Hardware signals; a caller's transaction must commit first
+        transaction.on_commit(typeahead.invalidate)
+        transaction.on_commit(pagecache.bump_catalog_version)
+
+    stats.seconds = time.monotonic() - started
+    return stats
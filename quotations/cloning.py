@@ -0,0 +1,224 @@
+"""
+Quotation cloning and templates.
+
+Any quotation can serve as a template:
+
+* ``clone_quotation`` copies its pricing settings and line items into a new
+  quotation;
+* ``clone_to_requests`` does the same for many customer requests at once;
+* ``apply_template`` copies its line items into an existing quotation,
+  leaving out hardware and categories the quotation already has.
+
+The template's lines are read once (one query per line-item table), priced
+and converted in memory, and written with one ``bulk_create`` per line-item
+table, so the number of INSERT statements does not grow with the number of
+lines or clones (SQLite still splits very large batches to stay under its
+bound-parameter limit). New quotations get their numbers from the
+quotation sequence in one reservation and are inserted with one
+``bulk_create``. Totals are computed before the insert, as ``save()``
+would.
+
+With ``reprice`` the copies take the current ``Hardware.unit_cost`` and
+``PersonnelCostCategory.hourly_rate`` (and currency) instead of the
+template's prices. ``quantities`` and ``hours`` (keyed by hardware and
+category id) override the copied amounts.
+"""
+from dataclasses import dataclass, field
+
+from django.db import IntegrityError, connections, router, transaction
+
+from . import stats
+from .currency import get_rate_table, rate_date
+from .models import Quotation, QuotationHardware, QuotationPersonnelCost
+from .numbering import QUOTATION_SEQUENCE, next_numbers
+from .pricing import compute_totals, quantize, recalculate_quotations
+
+# Quotation fields copied from the template
+COPIED_FIELDS = ['currency', 'markup_percentage', 'tax_percentage', 'notes']
+
+
+@dataclass
+class CloneResult:
+    quotations: list = field(default_factory=list)
+    lines: int = 0
+    # Copied lines whose current catalog price differed from the template's
+    repriced: int = 0
+    # Template lines left out because the quotation already had them
+    skipped: list = field(default_factory=list)
+
+    def as_dict(self):
+        return {
+            'quotations': [
+                {
+                    'id': quotation.pk,
+                    'quotation_number': quotation.quotation_number,
+                    'customer_request_id': quotation.customer_request_id,
+                    'total_amount': str(quotation.total_amount),
+                }
+                for quotation in self.quotations
+            ],
+            'lines': self.lines,
+            'repriced': self.repriced,
+            'skipped': self.skipped,
+        }
+
+
+def _line_specs():
+    # line model, priced item key, amount, price field, free-text field
+    return [
+        (QuotationHardware, 'hardware', 'quantity', 'unit_cost', 'notes'),
+        (QuotationPersonnelCost, 'category', 'hours', 'hourly_rate', 'description'),
+    ]
+
+
+def _template_lines(template, reprice, overrides):
+    """
+    The template's lines as ``(model, key id, values, repriced)`` tuples,
+    ``values`` holding the field values of a copy before conversion
+    """
+    lines = []
+    for model, key, amount, price_field, text_field in _line_specs():
+        rows = model.objects.filter(quotation=template).order_by('pk').values(
+            f'{key}_id', amount, price_field, 'currency', text_field,
+            f'{key}__{price_field}', f'{key}__currency',
+        )
+        for row in rows:
+            values = {
+                f'{key}_id': row[f'{key}_id'],
+                amount: overrides[amount].get(row[f'{key}_id'], row[amount]),
+                price_field: row[price_field],
+                'currency': row['currency'] or row[f'{key}__currency'],
+                text_field: row[text_field],
+            }
+            current = (row[f'{key}__{price_field}'], row[f'{key}__currency'])
+            repriced = reprice and current != (values[price_field], values['currency'])
+            if repriced:
+                values[price_field], values['currency'] = current
+            values['total_cost'] = quantize(values[price_field] * values[amount])
+            lines.append((model, row[f'{key}_id'], values, repriced))
+    return lines
+
+
+def _convert(lines, currency, date):
+    """Each line's converted total, and the hardware and personnel totals"""
+    table = get_rate_table()
+    converted, totals = [], {QuotationHardware: 0, QuotationPersonnelCost: 0}
+    for model, _, values, _ in lines:
+        # Raises MissingExchangeRate before anything is written
+        amount = table.convert(values['total_cost'], values['currency'], currency, date)
+        converted.append(amount)
+        totals[model] += amount
+    return converted, totals[QuotationHardware], totals[QuotationPersonnelCost]
+
+
+def _overrides(quantities, hours):
+    return {'quantity': dict(quantities or {}), 'hours': dict(hours or {})}
+
+
+def _bulk_create_lines(lines, converted, quotations, batch_size):
+    created = 0
+    for model, *_ in _line_specs():
+        copies = [
+            model(quotation=quotation, converted_total=amount, **values)
+            for quotation in quotations
+            for (line_model, _, values, _), amount in zip(lines, converted)
+            if line_model is model
+        ]
+        model.objects.bulk_create(copies, batch_size=batch_size)
+        created += len(copies)
+    return created
+
+
+def clone_to_requests(template, customer_requests, user, reprice=False, quantities=None, hours=None,
+                      valid_until=None, batch_size=500):
+    """
+    Clone ``template`` once for each of ``customer_requests`` in one
+    transaction. Returns a ``CloneResult``; raises ``MissingExchangeRate``
+    (writing nothing) when a line cannot be converted.
+    """
+    customer_requests = list(customer_requests)
+    result = CloneResult()
+    if not customer_requests:
+        return result
+    lines = _template_lines(template, reprice, _overrides(quantities, hours))
+    # Rates of the day the clones are created
+    converted, hardware_total, personnel_total = _convert(lines, template.currency, rate_date(None))
+    totals = compute_totals(hardware_total, personnel_total, template.markup_percentage, template.tax_percentage)
+
+    with transaction.atomic():
+        quotations = []
+        numbers = next_numbers(QUOTATION_SEQUENCE, len(customer_requests))
+        for number, customer_request in zip(numbers, customer_requests):
+            quotation = Quotation(
+                quotation_number=number, customer_request=customer_request, created_by=user,
+                valid_until=valid_until, **{name: getattr(template, name) for name in COPIED_FIELDS}, **totals
+            )
+            quotation.approval_stage = quotation.derive_approval_stage()
+            quotations.append(quotation)
+        if connections[router.db_for_write(Quotation)].features.can_return_rows_from_bulk_insert:
+            Quotation.objects.bulk_create(quotations, batch_size=batch_size)
+            # bulk_create sends no post_save signals
+            stats.adjust('total_quotations', len(quotations))
+        else:
+            # The lines need the new primary keys
+            for quotation in quotations:
+                quotation.save()
+        result.lines = _bulk_create_lines(lines, converted, quotations, batch_size)
+    result.quotations = quotations
+    result.repriced = sum(line[3] for line in lines) * len(quotations)
+    return result
+
+
+def clone_quotation(template, user, customer_request=None, reprice=False, quantities=None, hours=None,
+                    valid_until=None):
+    """A new quotation copied from ``template``, for its customer request by default"""
+    result = clone_to_requests(
+        template, [customer_request or template.customer_request], user,
+        reprice=reprice, quantities=quantities, hours=hours, valid_until=valid_until,
+    )
+    return result.quotations[0]
+
+
+def _apply_lines(lines, quotation, batch_size):
+    result = CloneResult(quotations=[quotation])
+    with transaction.atomic():
+        # Concurrent applies to one quotation queue on its row, so each sees
+        # the lines the other added
+        currency, created_date = Quotation.objects.select_for_update().filter(pk=quotation.pk).values_list(
+            'currency', 'created_date'
+        ).get()
+        existing = {
+            model: set(model.objects.filter(quotation=quotation).values_list(f'{key}_id', flat=True))
+            for model, key, *_ in _line_specs()
+        }
+        kept = []
+        for line in lines:
+            model, key_id = line[:2]
+            if key_id in existing[model]:
+                kind = 'hardware' if model is QuotationHardware else 'personnel'
+                result.skipped.append({'type': kind, 'id': key_id})
+            else:
+                kept.append(line)
+        result.repriced = sum(line[3] for line in kept)
+        converted, _, _ = _convert(kept, currency, rate_date(created_date))
+        result.lines = _bulk_create_lines(kept, converted, [quotation], batch_size)
+        # bulk writes skip save(), so rebuild the totals once
+        recalculate_quotations([quotation.pk])
+    return result
+
+
+def apply_template(template, quotation, reprice=False, quantities=None, hours=None, batch_size=500):
+    """
+    Copy ``template``'s line items into ``quotation`` and rebuild its
+    totals. Hardware and categories already on the quotation are kept as
+    they are and listed in ``skipped``.
+    """
+    lines = _template_lines(template, reprice, _overrides(quantities, hours))
+    try:
+        result = _apply_lines(lines, quotation, batch_size)
+    except IntegrityError:
+        # Another apply added one of the lines first (SQLite has no row
+        # locks); its lines are skipped on the second read
+        result = _apply_lines(lines, quotation, batch_size)
+    quotation.refresh_from_db()
+    return result
@@ -0,0 +1,281 @@
+"""
+Exchange rates and currency conversion.
+
+Every line item keeps its cost in its own ``currency`` (the hardware's or
+personnel category's) and, in ``converted_total``, the same amount in its
+quotation's currency at the rate in force on the quote date. Quotation
+totals are sums of ``converted_total``, so mixed-currency quotes add up in
+one currency.
+
+Rates come from ``ExchangeRate`` rows (loaded with ``manage.py
+load_exchange_rates``); a rate applies from its ``effective_date`` until the
+next one for the same pair. A missing direct rate falls back to the inverse
+pair, then to a cross rate through ``FX_PIVOT_CURRENCY``. Each process keeps
+the rate series in memory and memoises lookups by (pair, date); the cache is
+dropped when rates change (shared through a version token in the default
+cache, as for the type-ahead index) and after ``FX_RATE_CACHE_TTL`` seconds.
+Conversion uses Decimal arithmetic with one final ROUND_HALF_UP to cents.
+"""
+import threading
+import time
+import uuid
+from bisect import bisect_right
+from collections import defaultdict
+from dataclasses import dataclass, field
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .pricing import _iter_id_chunks, quantize, recalculate_quotations
+
+VERSION_CACHE_KEY = 'quotations:fx:version'
+DEFAULT_TTL = 300
+ONE = Decimal('1')
+
+
+class MissingExchangeRate(LookupError):
+    def __init__(self, from_currency, to_currency, date):
+        super().__init__(f'No {from_currency}->{to_currency} exchange rate on or before {date}')
+        self.pair = (from_currency, to_currency)
+        self.date = date
+
+
+class RateTable:
+    """As-of lookups over every rate series, memoised by (pair, date)"""
+
+    def __init__(self, rows, version, pivot=None):
+        self.version = version
+        self.built_at = time.monotonic()
+        self.pivot = pivot
+        series = defaultdict(list)
+        for from_currency, to_currency, effective_date, rate in rows:
+            series[(from_currency, to_currency)].append((effective_date, rate))
+        self.dates, self.rates = {}, {}
+        for pair, points in series.items():
+            points.sort()
+            self.dates[pair] = [date for date, _ in points]
+            self.rates[pair] = [rate for _, rate in points]
+        self._memo = {}
+
+    def _direct(self, pair, date):
+        dates = self.dates.get(pair)
+        if not dates:
+            return None
+        position = bisect_right(dates, date)
+        return self.rates[pair][position - 1] if position else None
+
+    def _resolve(self, from_currency, to_currency, date):
+        rate = self._direct((from_currency, to_currency), date)
+        if rate is not None:
+            return rate
+        inverse = self._direct((to_currency, from_currency), date)
+        if inverse:
+            return ONE / inverse
+        pivot = self.pivot
+        if pivot and pivot not in (from_currency, to_currency):
+            first = self._direct((from_currency, pivot), date) or self._inverse((pivot, from_currency), date)
+            second = self._direct((pivot, to_currency), date) or self._inverse((to_currency, pivot), date)
+            if first and second:
+                return first * second
+        return None
+
+    def _inverse(self, pair, date):
+        rate = self._direct(pair, date)
+        return ONE / rate if rate else None
+
+    def rate(self, from_currency, to_currency, date):
+        """Rate for one unit of ``from_currency`` on ``date``"""
+        if from_currency == to_currency:
+            return ONE
+        key = ((from_currency, to_currency), date)
+        try:
+            rate = self._memo[key]
+        except KeyError:
+            rate = self._memo[key] = self._resolve(from_currency, to_currency, date)
+        if rate is None:
+            raise MissingExchangeRate(from_currency, to_currency, date)
+        return rate
+
+    def convert(self, amount, from_currency, to_currency, date):
+        if from_currency == to_currency:
+            return quantize(amount)
+        return quantize(Decimal(amount) * self.rate(from_currency, to_currency, date))
+
+
+_table = None
+_lock = threading.Lock()
+
+
+def _ttl():
+    return getattr(settings, 'FX_RATE_CACHE_TTL', DEFAULT_TTL)
+
+
+def _current_version():
+    version = cache.get(VERSION_CACHE_KEY)
+    if version is None:
+        version = uuid.uuid4().hex
+        cache.add(VERSION_CACHE_KEY, version, timeout=None)
+        version = cache.get(VERSION_CACHE_KEY, version)
+    return version
+
+
+def get_rate_table():
+    """This process's rate table, reloaded (one query) when stale"""
+    global _table
+    version = _current_version()
+    table = _table
+    if table is not None and table.version == version and time.monotonic() - table.built_at < _ttl():
+        return table
+    with _lock:
+        table = _table
+        if table is None or table.version != version or time.monotonic() - table.built_at >= _ttl():
+            from .models import ExchangeRate
+
+            rows = ExchangeRate.objects.order_by().values_list(
+                'from_currency', 'to_currency', 'effective_date', 'rate'
+            )
+            table = _table = RateTable(rows, version, getattr(settings, 'FX_PIVOT_CURRENCY', 'USD'))
+    return table
+
+
+def invalidate(**kwargs):
+    """Drop cached rates here and in other processes (signal receiver)"""
+    global _table
+    _table = None
+    cache.set(VERSION_CACHE_KEY, uuid.uuid4().hex, timeout=None)
+
+
+def rate_date(created_date):
+    """The date whose rates apply to a quote created at ``created_date``"""
+    if created_date is None:
+        return timezone.localdate()
+    return timezone.localtime(created_date).date() if timezone.is_aware(created_date) else created_date.date()
+
+
+def convert(amount, from_currency, to_currency, date):
+    return get_rate_table().convert(amount, from_currency, to_currency, date)
+
+
+def line_item_rate(line_item):
+    """Rate from a line item's currency to its quotation's currency"""
+    quotation = line_item.quotation
+    return get_rate_table().rate(
+        line_item.currency or quotation.currency, quotation.currency, rate_date(quotation.created_date)
+    )
+
+
+def convert_line_item(line_item):
+    """``total_cost`` of a line item in its quotation's currency"""
+    return quantize(Decimal(line_item.total_cost) * line_item_rate(line_item))
+
+
+@dataclass
+class ConversionResult:
+    quotations: int = 0
+    lines_updated: int = 0
+    # (from, to, date) triples that had no rate; those lines were left as they were
+    missing: set = field(default_factory=set)
+
+
+def convert_quotations(quotation_ids=None, batch_size=500):
+    """
+    Recompute ``converted_total`` for every line item of the given quotations
+    (all when ``None``) and rebuild their totals. Each batch costs one read of
+    the quotations, one read and one bulk UPDATE per line-item table, and the
+    aggregate rebuild of ``recalculate_quotations``.
+    """
+    from .models import Quotation, QuotationHardware, QuotationPersonnelCost
+
+    quotations = Quotation.objects.all()
+    if quotation_ids is not None:
+        quotations = quotations.filter(pk__in=list(quotation_ids))
+
+    table = get_rate_table()
+    result = ConversionResult()
+    for chunk in _iter_id_chunks(quotations, batch_size):
+        quotes = {
+            pk: (currency, rate_date(created_date))
+            for pk, currency, created_date in Quotation.objects.filter(pk__in=chunk).order_by().values_list(
+                'pk', 'currency', 'created_date'
+            )
+        }
+        for model in (QuotationHardware, QuotationPersonnelCost):
+            changed = []
+            lines = model.objects.filter(quotation_id__in=chunk).order_by().only(
+                'pk', 'quotation_id', 'currency', 'total_cost', 'converted_total'
+            )
+            for line in lines:
+                currency, date = quotes[line.quotation_id]
+                try:
+                    converted = table.convert(line.total_cost, line.currency or currency, currency, date)
+                except MissingExchangeRate as exc:
+                    result.missing.add((*exc.pair, date))
+                    continue
+                if converted != line.converted_total:
+                    line.converted_total = converted
+                    changed.append(line)
+            model.objects.bulk_update(changed, ['converted_total'], batch_size=batch_size)
+            result.lines_updated += len(changed)
+        recalculate_quotations(chunk, batch_size=batch_size)
+        result.quotations += len(chunk)
+    return result
+
+
+def currency_report(to_currency, quotations=None, as_of=None):
+    """
+    Total ``total_amount`` of ``quotations`` (all by default) converted to
+    ``to_currency``, overall and by month. Quotes convert at the rate of
+    their own date, or of ``as_of`` when given.
+
+    One aggregate query groups the quotes by currency and day, so the cost
+    depends on the number of (currency, day) groups rather than of quotes.
+    """
+    from .models import Quotation
+
+    if quotations is None:
+        quotations = Quotation.objects.all()
+    groups = (
+        quotations.order_by()
+        .annotate(day=TruncDate('created_date'))
+        .values('currency', 'day')
+        .annotate(total=Sum('total_amount'), count=Count('id'))
+        .values_list('currency', 'day', 'total', 'count')
+    )
+
+    table = get_rate_table()
+    report = {
+        'currency': to_currency,
+        'as_of': as_of.isoformat() if as_of else None,
+        'count': 0,
+        'total': Decimal('0.00'),
+        'by_month': {},
+        'by_currency': {},
+        'missing_rates': [],
+    }
+    missing = set()
+    for currency, day, total, count in groups:
+        date = as_of or day or timezone.localdate()
+        try:
+            rate = table.rate(currency, to_currency, date)
+        except MissingExchangeRate:
+            missing.add((currency, to_currency, date.isoformat()))
+            continue
+        # Convert the group sum exactly; round once per group
+        converted = quantize((total or 0) * rate)
+        report['count'] += count
+        report['total'] += converted
+        month = report['by_month'].setdefault(
+            day.strftime('%Y-%m') if day else 'unknown', {'count': 0, 'total': Decimal('0.00')}
+        )
+        month['count'] += count
+        month['total'] += converted
+        original = report['by_currency'].setdefault(currency, {'count': 0, 'total': Decimal('0.00')})
+        original['count'] += count
+        original['total'] += quantize(total or 0)
+    report['by_month'] = dict(sorted(report['by_month'].items()))
+    report['missing_rates'] = sorted(missing)
+    return report
@@ -0,0 +1,211 @@
+"""
+Customer-facing quotation documents (standalone HTML and PDF).
+
+Rendered documents are cached on disk under a content hash of everything
+they show: the quote's pricing fields, its line items, the customer details
+and ``updated_date``. Downloading an unchanged quote is therefore a file
+send; any edit produces a new hash and the next request renders afresh.
+Stale files are never served, only left behind, and ``prune_documents``
+removes the ones older than a cutoff.
+
+PDF output needs WeasyPrint (``pip install weasyprint``); HTML works without
+it. ``render_documents`` renders many quotes in a process pool for batch
+runs such as month-end mailings.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from django.template.loader import render_to_string
+
+from .pricing import TOTAL_FIELDS
+
+FORMATS = {
+    'html': 'text/html; charset=utf-8',
+    'pdf': 'application/pdf',
+}
+TEMPLATE_NAME = 'quotations/quotation_document.html'
+# Bump when the document template changes so cached files are re-rendered
+DOCUMENT_VERSION = 2
+
+QUOTATION_FIELDS = [
+    'quotation_number', 'currency', 'markup_percentage', 'tax_percentage',
+    'notes', 'valid_until', 'created_date', 'updated_date', *TOTAL_FIELDS,
+]
+CUSTOMER_FIELDS = ['request_number', 'customer_name', 'customer_email', 'company_name', 'updated_date']
+
+
+class DocumentError(Exception):
+    pass
+
+
+def cache_dir():
+    return Path(getattr(settings, 'QUOTATION_DOCUMENT_CACHE_DIR', settings.BASE_DIR / 'document_cache'))
+
+
+def _load(quotation):
+    """The line items a document shows, each with its related row"""
+    hardware_items = list(
+        quotation.hardware_items.select_related('hardware').order_by('hardware__category', 'hardware__name', 'id')
+    )
+    personnel_costs = list(quotation.personnel_costs.select_related('category').order_by('category__name', 'id'))
+    return hardware_items, personnel_costs
+
+
+def content_hash(quotation, hardware_items, personnel_costs):
+    """SHA-256 over every value the document renders"""
+    customer = quotation.customer_request
+    payload = {
+        'version': DOCUMENT_VERSION,
+        'quotation': [quotation.pk] + [getattr(quotation, name) for name in QUOTATION_FIELDS],
+        'customer': [getattr(customer, name) for name in CUSTOMER_FIELDS],
+        'hardware': [
+            [item.pk, item.hardware.name, item.hardware.model_number, item.hardware.manufacturer,
+             item.hardware.category, item.quantity, item.unit_cost, item.currency, item.total_cost,
+             item.converted_total, item.notes]
+            for item in hardware_items
+        ],
+        'personnel': [
+            [item.pk, item.category.name, item.hours, item.hourly_rate, item.currency, item.total_cost,
+             item.converted_total, item.description]
+            for item in personnel_costs
+        ],
+    }
+    encoded = json.dumps(payload, default=str, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+def render_html(quotation, hardware_items, personnel_costs):
+    return render_to_string(TEMPLATE_NAME, {
+        'quotation': quotation,
+        'customer': quotation.customer_request,
+        'hardware_items': hardware_items,
+        'personnel_costs': personnel_costs,
+    })
+
+
+def render_pdf(html):
+    try:
+        from weasyprint import HTML
+    except ImportError:
+        raise DocumentError('PDF export requires WeasyPrint (pip install weasyprint)')
+    return HTML(string=html, base_url=str(settings.BASE_DIR)).write_pdf()
+
+
+def _write_atomic(path, data):
+    # Concurrent renders of the same hash race harmlessly: the content is identical
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as temp:
+            temp.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+@dataclass
+class Document:
+    quotation_id: int
+    fmt: str
+    digest: str
+    path: Path
+    cached: bool
+
+    @property
+    def content_type(self):
+        return FORMATS[self.fmt]
+
+    @property
+    def filename(self):
+        return f'{self.digest}.{self.fmt}'
+
+
+def get_document(quotation, fmt='pdf'):
+    """Return the cached document for ``quotation``, rendering it when missing"""
+    if fmt not in FORMATS:
+        raise DocumentError(f'Unknown document format {fmt!r}')
+    hardware_items, personnel_costs = _load(quotation)
+    digest = content_hash(quotation, hardware_items, personnel_costs)
+    path = cache_dir() / fmt / digest[:2] / f'{digest}.{fmt}'
+    if path.exists():
+        # Refresh mtime so prune_documents() keeps recently served files
+        os.utime(path)
+        return Document(quotation.pk, fmt, digest, path, cached=True)
+
+    html = render_html(quotation, hardware_items, personnel_costs)
+    data = render_pdf(html) if fmt == 'pdf' else html.encode('utf-8')
+    _write_atomic(path, data)
+    return Document(quotation.pk, fmt, digest, path, cached=False)
+
+
+def _quotations():
+    from .models import Quotation
+
+    return Quotation.objects.select_related('customer_request')
+
+
+def _render_chunk(quotation_ids, formats):
+    """Process-pool task: render the documents of a chunk of quotations"""
+    results = []
+    for quotation in _quotations().filter(pk__in=quotation_ids).order_by('pk'):
+        for fmt in formats:
+            try:
+                document = get_document(quotation, fmt)
+            except Exception as exc:
+                results.append((quotation.pk, fmt, None, False, str(exc)))
+            else:
+                results.append((quotation.pk, fmt, str(document.path), document.cached, None))
+    return results
+
+
+def _init_worker():
+    import django
+
+    # Spawned workers start without Django; forked ones must not reuse the
+    # parent's database connections.
+    django.setup()
+    for connection in connections.all():
+        connection.close()
+
+
+def render_documents(quotation_ids, formats=('pdf',), processes=None, chunk_size=20):
+    """
+    Render the documents of many quotations, in a process pool when
+    ``processes`` is not 1. Yields ``(quotation_id, fmt, path, cached, error)``
+    tuples as chunks complete.
+    """
+    quotation_ids = list(quotation_ids)
+    chunks = [quotation_ids[i:i + chunk_size] for i in range(0, len(quotation_ids), chunk_size)]
+    if processes == 1:
+        for chunk in chunks:
+            yield from _render_chunk(chunk, formats)
+        return
+
+    # Forked children inherit open sockets; close them so none are shared
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker) as pool:
+        for results in pool.map(_render_chunk, chunks, [formats] * len(chunks)):
+            yield from results
+
+
+def prune_documents(max_age_days=30):
+    """Delete cached documents not used for ``max_age_days``; returns the count"""
+    cutoff = time.time() - max_age_days * 86400
+    removed = 0
+    root = cache_dir()
+    if not root.exists():
+        return 0
+    for path in root.glob('*/*/*'):
+        if path.is_file() and path.stat().st_mtime < cutoff:
+            path.unlink(missing_ok=True)
+            removed += 1
+    return removed
@@ -0,0 +1,347 @@
+"""
+Streaming CSV and XLSX exports of quotations and their line items.
+
+Two datasets:
+
+    quotations   one row per quotation, joined with its customer request
+    lines        one row per hardware or personnel line item, joined with
+                 its quotation and customer request
+
+Rows are read with ``values_list`` (tuples, no model instances) through
+``QuerySet.iterator(chunk_size=...)`` and encoded a chunk at a time, so
+memory stays flat however many rows are exported. On PostgreSQL
+``iterator()`` uses a server-side cursor. Behind a transaction-mode pooler
+(``DISABLE_SERVER_SIDE_CURSORS``) the driver would fetch the whole result
+at once, so the rows are read in primary-key pages instead.
+
+XLSX is written with the standard library: a workbook zip whose single
+worksheet is compressed and emitted as it is generated (inline strings, no
+shared string table). Filters mirror the quotation list (``search``,
+``approval``) plus a ``created_date`` range.
+"""
+import csv
+import re
+import zipfile
+from datetime import date, datetime, time as dt_time, timedelta
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+from django.db import connections
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import QuotationHardware, QuotationPersonnelCost
+
+DEFAULT_CHUNK_SIZE = 2000
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+# (header, lookup) per column
+QUOTATION_COLUMNS = [
+    ('quotation_number', 'quotation_number'),
+    ('created_date', 'created_date'),
+    ('request_number', 'customer_request__request_number'),
+    ('customer_name', 'customer_request__customer_name'),
+    ('company_name', 'customer_request__company_name'),
+    ('customer_email', 'customer_request__customer_email'),
+    ('request_status', 'customer_request__status'),
+    ('created_by', 'created_by__username'),
+    ('approval_stage', 'approval_stage'),
+    ('final_approval', 'final_approval'),
+    ('currency', 'currency'),
+    ('hardware_total', 'hardware_total'),
+    ('personnel_total', 'personnel_total'),
+    ('markup_percentage', 'markup_percentage'),
+    ('markup_amount', 'markup_amount'),
+    ('subtotal', 'subtotal'),
+    ('tax_percentage', 'tax_percentage'),
+    ('tax_amount', 'tax_amount'),
+    ('total_amount', 'total_amount'),
+    ('valid_until', 'valid_until'),
+]
+
+LINE_QUOTATION_COLUMNS = [
+    ('quotation_number', 'quotation__quotation_number'),
+    ('quotation_created_date', 'quotation__created_date'),
+    ('customer_name', 'quotation__customer_request__customer_name'),
+    ('company_name', 'quotation__customer_request__company_name'),
+    ('quotation_currency', 'quotation__currency'),
+]
+# Line columns: header, hardware lookup, personnel lookup (None: blank)
+LINE_ITEM_COLUMNS = [
+    ('item', 'hardware__name', 'category__name'),
+    ('model_number', 'hardware__model_number', None),
+    ('quantity', 'quantity', 'hours'),
+    ('unit_price', 'unit_cost', 'hourly_rate'),
+    ('currency', 'currency', 'currency'),
+    ('total_cost', 'total_cost', 'total_cost'),
+    ('converted_total', 'converted_total', 'converted_total'),
+    ('notes', 'notes', 'description'),
+]
+LINE_HEADER = [
+    *(header for header, _ in LINE_QUOTATION_COLUMNS), 'type', *(header for header, *_ in LINE_ITEM_COLUMNS)
+]
+
+
+class ExportError(ValueError):
+    pass
+
+
+def parse_date(value):
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ExportError(f'Invalid date {value!r}; expected YYYY-MM-DD')
+
+
+def filter_quotations(quotations, search='', approval='', created_from=None, created_to=None):
+    """
+    The quotation list's ``search`` and ``approval`` filters, plus quotes
+    created on or after ``created_from`` and on or before ``created_to``
+    (dates, in local time)
+    """
+    if search:
+        quotations = quotations.filter(
+            Q(quotation_number__icontains=search) |
+            Q(customer_request__customer_name__icontains=search) |
+            Q(customer_request__company_name__icontains=search)
+        )
+    if approval == 'pending':
+        quotations = quotations.filter(final_approval=False)
+    elif approval == 'approved':
+        quotations = quotations.filter(final_approval=True)
+    if created_from:
+        quotations = quotations.filter(created_date__gte=_day_start(created_from))
+    if created_to:
+        quotations = quotations.filter(created_date__lt=_day_start(created_to + timedelta(days=1)))
+    return quotations
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, dt_time.min))
+
+
+def _iter_rows(queryset, chunk_size):
+    """Tuples of a ``values_list`` queryset whose first column is the primary key, without it"""
+    if not connections[queryset.db].settings_dict.get('DISABLE_SERVER_SIDE_CURSORS'):
+        for row in queryset.order_by('pk').iterator(chunk_size=chunk_size):
+            yield row[1:]
+        return
+    last_pk = None
+    while True:
+        page = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        rows = list(page.order_by('pk')[:chunk_size])
+        if not rows:
+            return
+        for row in rows:
+            yield row[1:]
+        last_pk = rows[-1][0]
+
+
+def quotation_rows(quotations, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Header, then one tuple per quotation of ``quotations``"""
+    yield [header for header, _ in QUOTATION_COLUMNS]
+    yield from _iter_rows(
+        quotations.values_list('pk', *(lookup for _, lookup in QUOTATION_COLUMNS)), chunk_size
+    )
+
+
+def line_rows(quotations, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Header, then one tuple per line item of ``quotations``: hardware lines first, then personnel"""
+    yield LINE_HEADER
+    quotation_lookups = [lookup for _, lookup in LINE_QUOTATION_COLUMNS]
+    for model, kind, position in ((QuotationHardware, 'hardware', 1), (QuotationPersonnelCost, 'personnel', 2)):
+        item_lookups = [column[position] for column in LINE_ITEM_COLUMNS]
+        lines = model.objects.using(quotations.db).filter(
+            quotation__in=quotations.values('pk')
+        ).values_list('pk', *quotation_lookups, *(lookup for lookup in item_lookups if lookup))
+        for row in _iter_rows(lines, chunk_size):
+            values = iter(row[len(quotation_lookups):])
+            yield (
+                *row[:len(quotation_lookups)], kind,
+                *(next(values) if lookup else '' for lookup in item_lookups),
+            )
+
+
+DATASETS = {
+    'quotations': quotation_rows,
+    'lines': line_rows,
+}
+
+
+def _local(value):
+    if isinstance(value, datetime) and timezone.is_aware(value):
+        return timezone.localtime(value).replace(tzinfo=None)
+    return value
+
+
+class _Echo:
+    """File-like object that returns what is written to it"""
+
+    def write(self, value):
+        return value
+
+
+def _csv_text(value):
+    value = _local(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat(sep=' ', timespec='seconds') if isinstance(value, datetime) else value.isoformat()
+    if isinstance(value, str) and value[:1] in ('=', '+', '-', '@', '\t', '\r'):
+        # Keep spreadsheet applications from evaluating text as a formula
+        return "'" + value
+    return value
+
+
+def csv_chunks(rows, chunk_size=DEFAULT_CHUNK_SIZE):
+    """UTF-8 CSV (with BOM, for spreadsheet applications) in chunks of up to ``chunk_size`` rows"""
+    writer = csv.writer(_Echo())
+    lines = ['\ufeff']
+    for row in rows:
+        lines.append(writer.writerow([_csv_text(value) for value in row]))
+        if len(lines) >= chunk_size:
+            yield ''.join(lines).encode()
+            lines = []
+    if lines:
+        yield ''.join(lines).encode()
+
+
+class _ZipStream:
+    """Unseekable sink for ZipFile; ``take()`` returns the bytes written since the last call"""
+
+    def __init__(self):
+        self.chunks = []
+        self.offset = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.offset
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+_INVALID_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+_EXCEL_EPOCH = datetime(1899, 12, 30)
+# Style indexes in _STYLES
+_DATETIME_STYLE, _DATE_STYLE = 1, 2
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '</Types>'
+)
+_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+    '</Relationships>'
+)
+_STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<numFmts count="1"><numFmt numFmtId="164" formatCode="yyyy-mm-dd hh:mm:ss"/></numFmts>'
+    '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="3">'
+    '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="14" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '</cellXfs>'
+    '</styleSheet>'
+)
+
+
+def _workbook(sheet_name):
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        f'<sheets><sheet name="{escape(sheet_name[:31])}" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    )
+
+
+def _xlsx_cell(value):
+    value = _local(value)
+    if value is None or value == '':
+        return '<c/>'
+    if isinstance(value, bool):
+        return f'<c t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, Decimal):
+        return f'<c><v>{value:f}</v></c>'
+    if isinstance(value, (int, float)):
+        return f'<c><v>{value}</v></c>'
+    if isinstance(value, datetime):
+        serial = (value - _EXCEL_EPOCH) / timedelta(days=1)
+        return f'<c s="{_DATETIME_STYLE}"><v>{serial:.6f}</v></c>'
+    if isinstance(value, date):
+        return f'<c s="{_DATE_STYLE}"><v>{(value - _EXCEL_EPOCH.date()).days}</v></c>'
+    text = escape(_INVALID_XML.sub('', str(value)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def xlsx_chunks(rows, sheet_name='Export', chunk_size=DEFAULT_CHUNK_SIZE):
+    """An XLSX workbook of one sheet, as compressed chunks of up to ``chunk_size`` rows"""
+    stream = _ZipStream()
+    with zipfile.ZipFile(stream, 'w', zipfile.ZIP_DEFLATED) as workbook:
+        workbook.writestr('[Content_Types].xml', _CONTENT_TYPES)
+        workbook.writestr('_rels/.rels', _ROOT_RELS)
+        workbook.writestr('xl/workbook.xml', _workbook(sheet_name))
+        workbook.writestr('xl/_rels/workbook.xml.rels', _WORKBOOK_RELS)
+        workbook.writestr('xl/styles.xml', _STYLES)
+        with workbook.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            pending = []
+            for row in rows:
+                pending.append('<row>' + ''.join(_xlsx_cell(value) for value in row) + '</row>')
+                if len(pending) >= chunk_size:
+                    sheet.write(''.join(pending).encode())
+                    pending = []
+                    yield stream.take()
+            sheet.write(''.join(pending).encode() + b'</sheetData></worksheet>')
+    yield stream.take()
+
+
+def export_chunks(dataset, fmt, quotations, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Encoded chunks of the ``dataset`` export of ``quotations`` in ``fmt``"""
+    rows = DATASETS[dataset](quotations, chunk_size=chunk_size)
+    if fmt == 'xlsx':
+        return xlsx_chunks(rows, sheet_name=dataset, chunk_size=chunk_size)
+    return csv_chunks(rows, chunk_size=chunk_size)
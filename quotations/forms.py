@@ -26,17 +26,20 @@ class QuotationForm(forms.ModelForm):
     class Meta:
         model = Quotation
         fields = [
-            'quotation_number', 'markup_percentage', 'tax_percentage',
+            'currency', 'markup_percentage', 'tax_percentage',
             'notes', 'valid_until'
         ]
         widgets = {
-            'quotation_number': forms.TextInput(attrs={'class': 'form-control'}),
+            'currency': forms.TextInput(attrs={'class': 'form-control', 'maxlength': 3}),
             'markup_percentage': forms.NumberInput(attrs={'class': 'form-control', 'step': '0.01'}),
             'tax_percentage': forms.NumberInput(attrs={'class': 'form-control', 'step': '0.01'}),
             'notes': forms.Textarea(attrs={'class': 'form-control', 'rows': 3}),
             'valid_until': forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
         }
 
+    def clean_currency(self):
+        return self.cleaned_data['currency'].strip().upper()
+
 
 class QuotationHardwareForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,414 @@
+"""
+Bulk import of quotation line items from a CSV or JSON bill of materials.
+
+Rows are parsed as a stream, hardware and personnel categories are resolved
+with one batched lookup each, ``unique_together`` conflicts are checked in
+memory and the result is written with ``bulk_create``/``bulk_update`` inside
+a single transaction.
+
+Recognised columns:
+
+    type          ``hardware`` (default) or ``personnel``
+    model_number  hardware model number (preferred lookup key)
+    name          hardware name, or personnel category name
+    category      personnel category name (alias of ``name`` for personnel)
+    quantity      hardware quantity (default 1)
+    unit_cost     hardware unit cost (default: catalog ``Hardware.unit_cost``)
+    hours         personnel hours
+    hourly_rate   personnel rate (default: ``PersonnelCostCategory.hourly_rate``)
+    notes         hardware notes / personnel description
+    description   personnel description
+
+Unit prices are in the currency of the hardware or personnel category; each
+line's total is converted to the quotation's currency during validation.
+"""
+import csv
+import json
+from dataclasses import dataclass, field
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Q
+
+from .currency import MissingExchangeRate, get_rate_table, rate_date
+from .models import Hardware, PersonnelCostCategory, QuotationHardware, QuotationPersonnelCost
+from .pricing import quantize, recalculate_quotations
+
+LOOKUP_CHUNK_SIZE = 500
+# Characters read at a time when decoding a JSON array item by item
+JSON_CHUNK_SIZE = 64 * 1024
+
+
+class BomImportError(Exception):
+    """Raised when a bill of materials cannot be parsed at all"""
+
+
+@dataclass
+class BomImportResult:
+    created: int = 0
+    updated: int = 0
+    errors: list = field(default_factory=list)
+
+    @property
+    def ok(self):
+        return not self.errors
+
+    def as_dict(self):
+        return {'created': self.created, 'updated': self.updated, 'errors': self.errors}
+
+
+def detect_format(filename='', content_type=''):
+    """Guess 'csv' or 'json' from an upload's file name or content type"""
+    filename = (filename or '').lower()
+    content_type = (content_type or '').lower()
+    if filename.endswith(('.json', '.jsonl', '.ndjson')) or 'json' in content_type:
+        return 'json'
+    return 'csv'
+
+
+def iter_rows(stream, fmt='csv'):
+    """
+    Yield ``(line_number, row)`` pairs from a text stream.
+
+    JSON input may be a single array of objects or one object per line
+    (JSON Lines); either way one item is decoded at a time, so the whole
+    document is never held in memory.
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        try:
+            for row in reader:
+                yield reader.line_num, {k.strip().lower(): (v or '').strip() for k, v in row.items() if k}
+        except csv.Error as exc:
+            raise BomImportError(f'Invalid CSV on line {reader.line_num}: {exc}')
+        return
+
+    if fmt != 'json':
+        raise BomImportError(f'Unsupported format: {fmt}')
+
+    first = stream.read(1)
+    while first and first.isspace():
+        first = stream.read(1)
+    if first == '[':
+        for index, row in enumerate(_JsonArrayReader(stream, JSON_CHUNK_SIZE), start=1):
+            yield index, _normalise_json_row(row)
+        return
+
+    if not first:
+        return
+    for line_number, line in enumerate(_prepend(first, stream), start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            raise BomImportError(f'Invalid JSON on line {line_number}: {exc}')
+        yield line_number, _normalise_json_row(row)
+
+
+class _JsonArrayReader:
+    """
+    The items of a top-level JSON array whose opening bracket has been read
+    from ``stream``. Holds the item being decoded and one chunk of text.
+    """
+
+    def __init__(self, stream, chunk_size):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.position = 0
+        self.eof = False
+
+    def _read(self):
+        """Append the next chunk, dropping the text already consumed; False at the end of the stream"""
+        chunk = '' if self.eof else self.stream.read(self.chunk_size)
+        self.eof = not chunk
+        self.buffer = self.buffer[self.position:] + chunk
+        self.position = 0
+        return not self.eof
+
+    def _peek(self):
+        """The next character that is not whitespace, without consuming it; '' at the end"""
+        while True:
+            while self.position < len(self.buffer) and self.buffer[self.position].isspace():
+                self.position += 1
+            if self.position < len(self.buffer) or not self._read():
+                return self.buffer[self.position:self.position + 1]
+
+    def _item(self):
+        if not self._peek():
+            raise BomImportError('Invalid JSON: unexpected end of input')
+        while True:
+            try:
+                item, end = self.decoder.raw_decode(self.buffer, self.position)
+            except ValueError as exc:
+                # The item may continue in the next chunk
+                if self._read():
+                    continue
+                raise BomImportError(f'Invalid JSON: {exc}')
+            # So may a number or literal that ends with the buffer
+            if end == len(self.buffer) and self._read():
+                continue
+            self.position = end
+            return item
+
+    def _expect(self, allowed):
+        char = self._peek()
+        if char not in allowed:
+            found = repr(char) if char else 'end of input'
+            raise BomImportError(f'Invalid JSON: expected one of {" ".join(allowed)}, found {found}')
+        self.position += 1
+        return char
+
+    def __iter__(self):
+        if self._peek() == ']':
+            self.position += 1
+        else:
+            while True:
+                yield self._item()
+                if self._expect([',', ']']) == ']':
+                    break
+        if self._peek():
+            raise BomImportError('Invalid JSON: extra data after the array')
+
+
+def _prepend(first, stream):
+    first_line = first + stream.readline()
+    yield first_line
+    yield from stream
+
+
+def _normalise_json_row(row):
+    if not isinstance(row, dict):
+        raise BomImportError('Each JSON item must be an object')
+    return {
+        str(k).strip().lower(): ('' if v is None else str(v).strip())
+        for k, v in row.items()
+    }
+
+
+def _field_value(model, name, value, default=None):
+    """
+    ``value`` converted and validated as ``model``'s field ``name``
+    (``default`` when empty); raises ValueError with the reason
+    """
+    if value in ('', None):
+        return default
+    model_field = model._meta.get_field(name)
+    try:
+        value = model_field.to_python(value)
+        # Digits and decimal places, non-finite numbers, minimums
+        model_field.run_validators(value)
+    except ValidationError as exc:
+        raise ValueError(f'{name}: {" ".join(exc.messages)}')
+    if value < 0:
+        raise ValueError(f'{name} must not be negative')
+    return value
+
+
+def _chunks(values, size=LOOKUP_CHUNK_SIZE):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def _resolve_hardware(model_numbers, names):
+    """Map model numbers and names to Hardware rows; ambiguous keys map to None"""
+    by_model_number, by_name = {}, {}
+    query = Q()
+    for chunk in _chunks(model_numbers):
+        query |= Q(model_number__in=chunk)
+    for chunk in _chunks(names):
+        query |= Q(name__in=chunk)
+    if not query:
+        return by_model_number, by_name
+
+    hardware = Hardware.objects.filter(query).only(
+        'pk', 'name', 'model_number', 'unit_cost', 'currency', 'is_active'
+    )
+    candidates = {}
+    for item in hardware:
+        candidates.setdefault(('model_number', item.model_number), []).append(item)
+        candidates.setdefault(('name', item.name), []).append(item)
+
+    for (kind, key), items in candidates.items():
+        if not key:
+            continue
+        # Prefer active SKUs; several candidates of equal standing are ambiguous
+        pool = [item for item in items if item.is_active] or items
+        index = by_model_number if kind == 'model_number' else by_name
+        index[key] = pool[0] if len(pool) == 1 else None
+    return by_model_number, by_name
+
+
+def _resolve_categories(names):
+    categories = {}
+    for chunk in _chunks(names):
+        categories.update(
+            (category.name, category)
+            for category in PersonnelCostCategory.objects.filter(name__in=chunk)
+        )
+    return categories
+
+
+def import_line_items(quotation, rows, replace_existing=False, batch_size=500):
+    """
+    Import ``(line_number, row)`` pairs into ``quotation``.
+
+    Lines that already exist for the same hardware or personnel category are
+    updated when ``replace_existing`` is set and reported as errors otherwise.
+    Nothing is written unless every row validates.
+    """
+    result = BomImportResult()
+    rates = get_rate_table()
+    quote_date = rate_date(quotation.created_date)
+    hardware_rows, personnel_rows = [], []
+    for line_number, row in rows:
+        if row.get('type', 'hardware').lower() in ('personnel', 'labour', 'labor'):
+            personnel_rows.append((line_number, row))
+        else:
+            hardware_rows.append((line_number, row))
+
+    by_model_number, by_name = _resolve_hardware(
+        {row['model_number'] for _, row in hardware_rows if row.get('model_number')},
+        {row['name'] for _, row in hardware_rows if row.get('name') and not row.get('model_number')},
+    )
+    categories = _resolve_categories(
+        {row.get('category') or row.get('name') for _, row in personnel_rows} - {'', None}
+    )
+
+    existing_hardware = {
+        line.hardware_id: line
+        for line in QuotationHardware.objects.filter(quotation=quotation)
+    }
+    existing_personnel = {
+        line.category_id: line
+        for line in QuotationPersonnelCost.objects.filter(quotation=quotation)
+    }
+
+    hardware_create, hardware_update = [], []
+    seen = set()
+    for line_number, row in hardware_rows:
+        key = row.get('model_number') or row.get('name')
+        index = by_model_number if row.get('model_number') else by_name
+        if not key:
+            result.errors.append({'line': line_number, 'error': 'model_number or name is required'})
+            continue
+        if key not in index:
+            result.errors.append({'line': line_number, 'error': f'Unknown hardware: {key}'})
+            continue
+        hardware = index[key]
+        if hardware is None:
+            result.errors.append({'line': line_number, 'error': f'Ambiguous hardware: {key}'})
+            continue
+        if hardware.pk in seen:
+            result.errors.append({'line': line_number, 'error': f'Duplicate hardware in import: {key}'})
+            continue
+        seen.add(hardware.pk)
+        try:
+            quantity = _field_value(QuotationHardware, 'quantity', row.get('quantity'), 1)
+            if quantity < 1:
+                raise ValueError('quantity must be at least 1')
+            unit_cost = _field_value(QuotationHardware, 'unit_cost', row.get('unit_cost'), hardware.unit_cost)
+            _field_value(QuotationHardware, 'total_cost', quantize(unit_cost * quantity))
+        except ValueError as exc:
+            result.errors.append({'line': line_number, 'error': str(exc)})
+            continue
+
+        line = existing_hardware.get(hardware.pk)
+        if line is not None:
+            if not replace_existing:
+                result.errors.append({'line': line_number, 'error': f'Hardware already on quotation: {key}'})
+                continue
+            hardware_update.append(line)
+        else:
+            line = QuotationHardware(quotation=quotation, hardware=hardware)
+            hardware_create.append(line)
+        line.quantity = quantity
+        line.unit_cost = unit_cost
+        line.notes = row.get('notes', line.notes or '')
+        line.currency = hardware.currency
+        line.total_cost = quantize(line.calculate_total_cost())
+        try:
+            line.converted_total = rates.convert(line.total_cost, line.currency, quotation.currency, quote_date)
+            _field_value(type(line), 'converted_total', line.converted_total)
+        except (MissingExchangeRate, ValueError) as exc:
+            result.errors.append({'line': line_number, 'error': str(exc)})
+
+    personnel_create, personnel_update = [], []
+    seen = set()
+    for line_number, row in personnel_rows:
+        key = row.get('category') or row.get('name')
+        category = categories.get(key)
+        if category is None:
+            result.errors.append({'line': line_number, 'error': f'Unknown personnel category: {key}'})
+            continue
+        if category.pk in seen:
+            result.errors.append({'line': line_number, 'error': f'Duplicate category in import: {key}'})
+            continue
+        seen.add(category.pk)
+        try:
+            hours = _field_value(QuotationPersonnelCost, 'hours', row.get('hours'))
+            if hours is None:
+                raise ValueError('hours is required')
+            hourly_rate = _field_value(
+                QuotationPersonnelCost, 'hourly_rate', row.get('hourly_rate'), category.hourly_rate
+            )
+            _field_value(QuotationPersonnelCost, 'total_cost', quantize(hours * hourly_rate))
+        except ValueError as exc:
+            result.errors.append({'line': line_number, 'error': str(exc)})
+            continue
+
+        line = existing_personnel.get(category.pk)
+        if line is not None:
+            if not replace_existing:
+                result.errors.append({'line': line_number, 'error': f'Category already on quotation: {key}'})
+                continue
+            personnel_update.append(line)
+        else:
+            line = QuotationPersonnelCost(quotation=quotation, category=category)
+            personnel_create.append(line)
+        line.hours = hours
+        line.hourly_rate = hourly_rate
+        line.description = row.get('description') or row.get('notes') or line.description or ''
+        line.currency = category.currency
+        line.total_cost = quantize(line.calculate_total_cost())
+        try:
+            line.converted_total = rates.convert(line.total_cost, line.currency, quotation.currency, quote_date)
+            _field_value(type(line), 'converted_total', line.converted_total)
+        except (MissingExchangeRate, ValueError) as exc:
+            result.errors.append({'line': line_number, 'error': str(exc)})
+
+    if result.errors:
+        return result
+
+    with transaction.atomic():
+        QuotationHardware.objects.bulk_create(hardware_create, batch_size=batch_size)
+        QuotationHardware.objects.bulk_update(
+            hardware_update, ['quantity', 'unit_cost', 'currency', 'total_cost', 'converted_total', 'notes'],
+            batch_size=batch_size
+        )
+        QuotationPersonnelCost.objects.bulk_create(personnel_create, batch_size=batch_size)
+        QuotationPersonnelCost.objects.bulk_update(
+            personnel_update,
+            ['hours', 'hourly_rate', 'currency', 'total_cost', 'converted_total', 'description'],
+            batch_size=batch_size
+        )
+        # bulk writes skip save(), so rebuild the totals once for the whole import
+        recalculate_quotations([quotation.pk])
+
+    result.created = len(hardware_create) + len(personnel_create)
+    result.updated = len(hardware_update) + len(personnel_update)
+    return result
+
+
+def import_bom(quotation, stream, fmt='csv', replace_existing=False, batch_size=500):
+    """Parse a bill of materials from a text stream and import it into ``quotation``"""
+    try:
+        return import_line_items(
+            quotation, iter_rows(stream, fmt),
+            replace_existing=replace_existing, batch_size=batch_size
+        )
+    except BomImportError as exc:
+        return BomImportResult(errors=[{'line': None, 'error': str(exc)}])
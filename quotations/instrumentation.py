@@ -0,0 +1,210 @@
+"""
+Query-count and latency instrumentation.
+
+``QueryRecorder`` counts the SQL statements executed on every database
+connection of the current thread, their total time and how often each
+statement template repeats (the signature of an N+1 pattern), and times
+template rendering. ``QueryMetricsMiddleware`` (in ``middleware.py``) wraps
+each request in a recorder and feeds ``METRICS``, which ``/metrics`` exposes
+in the Prometheus text format.
+
+``assert_max_queries`` and ``assert_within_query_budget`` are helpers for
+tests and scripts that should fail when a view issues more queries than it
+is allowed to.
+"""
+import contextvars
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import ExitStack, contextmanager
+
+from asgiref.sync import sync_to_async
+from django.db import connections
+from django.template.base import Template
+
+DEFAULT_NPLUSONE_THRESHOLD = 5
+
+# The active recorder follows the request context, so concurrent ASGI
+# requests on one event loop (and their sync_to_async threads) stay apart
+_current_recorder = contextvars.ContextVar('query_recorder', default=None)
+_local = threading.local()
+
+
+class QueryRecorder:
+    """Context manager recording queries, DB time and render time"""
+
+    def __init__(self):
+        self.count = 0
+        self.db_seconds = 0.0
+        self.render_seconds = 0.0
+        self.statements = Counter()
+        self._stack = None
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_seconds += time.perf_counter() - started
+            self.count += 1
+            self.statements[sql] += 1
+
+    def _wrap_connections(self):
+        self._stack = ExitStack()
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self))
+
+    def __enter__(self):
+        self._wrap_connections()
+        self._token = _current_recorder.set(self)
+        _install_render_timer()
+        return self
+
+    def __exit__(self, *exc_info):
+        _current_recorder.reset(self._token)
+        self._stack.close()
+        return False
+
+    async def __aenter__(self):
+        # Connections are per thread; async ORM calls run on the request's
+        # thread-sensitive sync thread, so wrap the connections there
+        self._token = _current_recorder.set(self)
+        _install_render_timer()
+        await sync_to_async(self._wrap_connections)()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await sync_to_async(self._stack.close)()
+        _current_recorder.reset(self._token)
+        return False
+
+    @property
+    def duplicates(self):
+        """Number of statements that repeated an earlier statement's SQL"""
+        return sum(count - 1 for count in self.statements.values() if count > 1)
+
+    def repeated(self, threshold=DEFAULT_NPLUSONE_THRESHOLD):
+        """SQL templates executed at least ``threshold`` times (likely N+1)"""
+        return [(sql, count) for sql, count in self.statements.most_common() if count >= threshold]
+
+
+def _install_render_timer():
+    """Time outermost Template.render calls for the active recorder (installed once)"""
+    if getattr(Template.render, '_query_recorder_timed', False):
+        return
+    original = Template.render
+
+    def render(self, context):
+        recorder = _current_recorder.get()
+        depth = getattr(_local, 'render_depth', 0)
+        if recorder is None or depth:
+            return original(self, context)
+        _local.render_depth = depth + 1
+        started = time.perf_counter()
+        try:
+            return original(self, context)
+        finally:
+            recorder.render_seconds += time.perf_counter() - started
+            _local.render_depth = depth
+
+    render._query_recorder_timed = True
+    Template.render = render
+
+
+class MetricsRegistry:
+    """Per-process request metrics, labelled by view name"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = Counter()
+            self.sums = defaultdict(Counter)
+
+    def observe(self, view, method, status, recorder, total_seconds):
+        with self._lock:
+            self.requests[(view, method, str(status))] += 1
+            sums = self.sums[view]
+            sums['requests'] += 1
+            sums['queries'] += recorder.count
+            sums['duplicate_queries'] += recorder.duplicates
+            sums['db_seconds'] += recorder.db_seconds
+            sums['render_seconds'] += recorder.render_seconds
+            sums['request_seconds'] += total_seconds
+
+    def render_prometheus(self):
+        """Metrics in the Prometheus text exposition format"""
+        with self._lock:
+            requests = dict(self.requests)
+            sums = {view: dict(values) for view, values in self.sums.items()}
+
+        lines = [
+            '# HELP quotations_http_requests_total Requests handled, by view, method and status.',
+            '# TYPE quotations_http_requests_total counter',
+        ]
+        for (view, method, status), value in sorted(requests.items()):
+            lines.append(
+                f'quotations_http_requests_total{{view="{_escape(view)}",method="{method}",'
+                f'status="{status}"}} {value}'
+            )
+        series = [
+            ('db_queries_total', 'queries', 'SQL statements executed.'),
+            ('db_duplicate_queries_total', 'duplicate_queries', 'Statements repeating an earlier statement in the same request.'),
+            ('db_seconds_total', 'db_seconds', 'Time spent executing SQL.'),
+            ('render_seconds_total', 'render_seconds', 'Time spent rendering templates.'),
+            ('request_seconds_total', 'request_seconds', 'Wall-clock time handling requests.'),
+        ]
+        for name, key, help_text in series:
+            lines.append(f'# HELP quotations_{name} {help_text}')
+            lines.append(f'# TYPE quotations_{name} counter')
+            for view, values in sorted(sums.items()):
+                lines.append(f'quotations_{name}{{view="{_escape(view)}"}} {values.get(key, 0)}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+METRICS = MetricsRegistry()
+
+
+def query_budget(max_queries):
+    """Declare the maximum number of queries a view may issue"""
+    def decorator(view):
+        view.query_budget = max_queries
+        return view
+    return decorator
+
+
+@contextmanager
+def assert_max_queries(max_queries, max_duplicates=None):
+    """Fail if the block executes more than ``max_queries`` statements"""
+    with QueryRecorder() as recorder:
+        yield recorder
+    problems = []
+    if recorder.count > max_queries:
+        problems.append(f'{recorder.count} queries executed, budget is {max_queries}')
+    if max_duplicates is not None and recorder.duplicates > max_duplicates:
+        problems.append(f'{recorder.duplicates} duplicate queries, budget is {max_duplicates}')
+    if problems:
+        details = '\n'.join(f'  {count}x {sql}' for sql, count in recorder.statements.most_common())
+        raise AssertionError('; '.join(problems) + '\n' + details)
+
+
+def assert_within_query_budget(client, path, method='get', max_duplicates=None, **kwargs):
+    """
+    Request ``path`` with a Django test client and fail if the view exceeds
+    the budget declared with ``@query_budget`` (or repeats a statement more
+    than ``max_duplicates`` times).
+    """
+    from django.urls import resolve
+
+    budget = getattr(resolve(path.split('?')[0]).func, 'query_budget', None)
+    if budget is None:
+        raise AssertionError(f'The view for {path} declares no query budget')
+    with assert_max_queries(budget, max_duplicates):
+        response = getattr(client, method)(path, **kwargs)
+    return response
@@ -0,0 +1,317 @@
+"""
+Database-backed background jobs.
+
+``enqueue`` inserts a ``Job`` row; ``manage.py run_workers`` starts worker
+processes that claim due jobs, run the registered task function and record
+the outcome. No broker is involved, so the queue works on SQLite and
+PostgreSQL alike.
+
+A job is claimed with a conditional UPDATE (``status='queued'`` to
+``'running'``), so two workers can never run the same job. The claim also
+takes a lease; a worker that dies mid-job stops renewing it and the job is
+requeued once it expires. Failed attempts are retried with exponential
+backoff until ``max_attempts`` is reached.
+
+Tasks are plain functions registered with ``@task``. They receive a
+``JobContext`` first, used to report progress (which also renews the lease),
+followed by the job's keyword arguments, and may return any JSON-serialisable
+result.
+
+Finished jobs are deleted by the workers once they are older than
+``JOB_RETENTION_DAYS``.
+"""
+import hashlib
+import json
+import logging
+import os
+import random
+import socket
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+RETRY_BASE_SECONDS = 10
+RETRY_MAX_SECONDS = 3600
+DEFAULT_LEASE_SECONDS = 300
+# How often a worker looks for jobs abandoned by dead workers
+REQUEUE_INTERVAL = 30
+# Minimum interval between progress writes for one job
+PROGRESS_INTERVAL = 1.0
+DEFAULT_RETENTION_DAYS = 14
+# How often a worker deletes finished jobs past their retention
+PRUNE_INTERVAL = 3600
+
+TASKS = {}
+
+
+class UnknownTask(LookupError):
+    pass
+
+
+class IdempotencyKeyReused(ValueError):
+    """An idempotency key was sent again with a different task or arguments"""
+
+
+class JobFailed(Exception):
+    """Raised by a task to fail its job at once, without retries"""
+
+    def __init__(self, message, result=None):
+        super().__init__(message)
+        self.result = result
+
+
+def task(name=None, max_attempts=3, lease_seconds=DEFAULT_LEASE_SECONDS):
+    """Register a function as a background task"""
+    def decorator(func):
+        func.task_name = name or func.__name__
+        func.max_attempts = max_attempts
+        func.lease_seconds = lease_seconds
+        TASKS[func.task_name] = func
+        return func
+    return decorator
+
+
+def scoped_idempotency_key(key, user, task_name, *scope):
+    """
+    Scope a client's ``Idempotency-Key`` to the user, task and target
+    (``scope``), so equal keys from different clients or for different
+    objects never share a job. The scope is hashed with the key, so any
+    number of filters fits the column. Returns None without a key.
+    """
+    if not key:
+        return None
+    digest = hashlib.sha256('\0'.join([*(str(part) for part in scope), key]).encode()).hexdigest()
+    return ':'.join([str(user.pk if user is not None else ''), task_name, digest])
+
+
+def _check_reuse(job, task_name, kwargs):
+    if job.task != task_name or job.kwargs != json.loads(json.dumps(kwargs)):
+        raise IdempotencyKeyReused(
+            f'Idempotency key already used for another request (job {job.pk})'
+        )
+    return job
+
+
+def enqueue(task_name, idempotency_key=None, run_after=None, user=None, max_attempts=None, **kwargs):
+    """
+    Queue ``task_name`` with ``kwargs``. With an ``idempotency_key`` an
+    existing job carrying the same key is returned instead of a new one;
+    ``IdempotencyKeyReused`` is raised if that job has another task or
+    other arguments.
+    """
+    from .models import Job
+
+    if task_name not in TASKS:
+        raise UnknownTask(task_name)
+    if idempotency_key:
+        existing = Job.objects.filter(idempotency_key=idempotency_key).first()
+        if existing is not None:
+            return _check_reuse(existing, task_name, kwargs)
+
+    job = Job(
+        task=task_name,
+        kwargs=kwargs,
+        idempotency_key=idempotency_key or None,
+        max_attempts=max_attempts or TASKS[task_name].max_attempts,
+        run_after=run_after or timezone.now(),
+        created_by=user,
+    )
+    try:
+        with transaction.atomic():
+            job.save()
+    except IntegrityError:
+        if not idempotency_key:
+            raise
+        # Lost a race with another request using the same key
+        return _check_reuse(Job.objects.get(idempotency_key=idempotency_key), task_name, kwargs)
+    return job
+
+
+def retry_delay(attempt):
+    """Seconds to wait before retry number ``attempt`` (1-based), with jitter"""
+    delay = min(RETRY_BASE_SECONDS * 2 ** (attempt - 1), RETRY_MAX_SECONDS)
+    return delay * random.uniform(0.5, 1.0)
+
+
+def prune_jobs(max_age_days=None):
+    """
+    Delete succeeded and failed jobs finished more than ``max_age_days``
+    (``JOB_RETENTION_DAYS`` by default, where None keeps every job) ago.
+    Returns the number deleted.
+    """
+    from .models import Job
+
+    if max_age_days is None:
+        max_age_days = getattr(settings, 'JOB_RETENTION_DAYS', DEFAULT_RETENTION_DAYS)
+    if max_age_days is None:
+        return 0
+    cutoff = timezone.now() - timedelta(days=max_age_days)
+    deleted, _ = Job.objects.filter(status__in=['succeeded', 'failed'], finished_date__lt=cutoff).delete()
+    return deleted
+
+
+class JobContext:
+    """Handle passed to a running task"""
+
+    def __init__(self, job, lease_seconds):
+        self.job = job
+        self.lease_seconds = lease_seconds
+        self._last_write = 0.0
+
+    @property
+    def id(self):
+        return self.job.pk
+
+    def progress(self, current, total=None, message='', force=False):
+        """Record progress; writes are throttled to one per PROGRESS_INTERVAL"""
+        from .models import Job
+
+        now = time.monotonic()
+        if not force and now - self._last_write < PROGRESS_INTERVAL:
+            return
+        self._last_write = now
+        fields = {
+            'progress_current': current,
+            'progress_message': message[:200],
+            'locked_until': timezone.now() + timedelta(seconds=self.lease_seconds),
+        }
+        if total is not None:
+            fields['progress_total'] = total
+        Job.objects.filter(pk=self.job.pk, locked_by=self.job.locked_by).update(**fields)
+
+
+class Worker:
+    """Claims and runs jobs until stopped"""
+
+    def __init__(self, name=None, poll_interval=1.0, batch=10):
+        self.name = name or f'{socket.gethostname()}:{os.getpid()}'
+        self.poll_interval = poll_interval
+        self.batch = batch
+        self._last_requeue = None
+        self._last_prune = None
+
+    def requeue_expired(self):
+        """
+        Return jobs whose worker stopped renewing its lease to the queue, or
+        fail them when that was their last attempt. Returns the number requeued.
+        """
+        from .models import Job
+
+        now = timezone.now()
+        expired = Job.objects.filter(status='running', locked_until__lt=now)
+        expired.filter(attempts__gte=F('max_attempts')).update(
+            status='failed', error='Worker lease expired', finished_date=now,
+            locked_by='', locked_until=None,
+        )
+        return expired.update(status='queued', locked_by='', locked_until=None, run_after=now)
+
+    def claim(self):
+        """Take the next due job, or return None when nothing is due"""
+        from .models import Job
+
+        now = timezone.now()
+        candidates = list(
+            Job.objects.filter(status='queued', run_after__lte=now)
+            .order_by('run_after', 'id')
+            .values_list('pk', 'task')[:self.batch]
+        )
+        for pk, task_name in candidates:
+            lease_seconds = getattr(TASKS.get(task_name), 'lease_seconds', DEFAULT_LEASE_SECONDS)
+            # Compare-and-swap: only one worker's UPDATE matches the queued row
+            claimed = Job.objects.filter(pk=pk, status='queued').update(
+                status='running',
+                locked_by=self.name,
+                locked_until=now + timedelta(seconds=lease_seconds),
+                started_date=now,
+                attempts=F('attempts') + 1,
+            )
+            if claimed:
+                return Job.objects.get(pk=pk)
+        return None
+
+    def execute(self, job):
+        """Run a claimed job and record success, a scheduled retry or failure"""
+        from .models import Job
+
+        func = TASKS.get(job.task)
+        owned = Job.objects.filter(pk=job.pk, locked_by=self.name, status='running')
+        if func is None:
+            owned.update(
+                status='failed', error=f'Unknown task {job.task!r}',
+                finished_date=timezone.now(), locked_by='', locked_until=None,
+            )
+            return 'failed'
+
+        context = JobContext(job, func.lease_seconds)
+        started = time.monotonic()
+        try:
+            result = func(context, **job.kwargs)
+        except JobFailed as exc:
+            owned.update(
+                status='failed', error=str(exc), result=exc.result,
+                finished_date=timezone.now(), locked_by='', locked_until=None,
+            )
+            logger.info('Job %s (%s) failed: %s', job.pk, job.task, exc)
+            return 'failed'
+        except Exception:
+            error = traceback.format_exc()
+            if job.attempts < job.max_attempts:
+                delay = retry_delay(job.attempts)
+                owned.update(
+                    status='queued', error=error, locked_by='', locked_until=None,
+                    run_after=timezone.now() + timedelta(seconds=delay),
+                )
+                logger.warning('Job %s (%s) attempt %s failed; retrying in %.0fs',
+                               job.pk, job.task, job.attempts, delay)
+                return 'retrying'
+            owned.update(
+                status='failed', error=error, finished_date=timezone.now(),
+                locked_by='', locked_until=None,
+            )
+            logger.error('Job %s (%s) failed after %s attempts', job.pk, job.task, job.attempts)
+            return 'failed'
+        finally:
+            # A long task may leave a broken or stale connection behind
+            for connection in connections.all():
+                connection.close_if_unusable_or_obsolete()
+
+        owned.update(
+            status='succeeded', result=result, error='', finished_date=timezone.now(),
+            locked_by='', locked_until=None,
+        )
+        logger.info('Job %s (%s) succeeded in %.2fs', job.pk, job.task, time.monotonic() - started)
+        return 'succeeded'
+
+    def run(self, stop_event=None, burst=False):
+        """
+        Process jobs until ``stop_event`` is set. With ``burst`` return as
+        soon as the queue has no due jobs. Returns the number of jobs run.
+        """
+        processed = 0
+        while stop_event is None or not stop_event.is_set():
+            if self._last_requeue is None or time.monotonic() - self._last_requeue >= REQUEUE_INTERVAL:
+                self.requeue_expired()
+                self._last_requeue = time.monotonic()
+            if self._last_prune is None or time.monotonic() - self._last_prune >= PRUNE_INTERVAL:
+                prune_jobs()
+                self._last_prune = time.monotonic()
+            job = self.claim()
+            if job is None:
+                if burst:
+                    break
+                if stop_event is not None:
+                    stop_event.wait(self.poll_interval)
+                else:
+                    time.sleep(self.poll_interval)
+                continue
+            self.execute(job)
+            processed += 1
+        return processed
+
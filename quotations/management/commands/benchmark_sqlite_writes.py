@@ -0,0 +1,164 @@
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from decimal import Decimal
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections
+
+MODES = {
+    'default': '0',
+    'tuned': '1',
+}
+
+
+def _percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure concurrent line-item save throughput on a scratch SQLite file, with the '
+        'default backend and with DB_SQLITE_TUNING (WAL, pragmas, BEGIN IMMEDIATE)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=4, help='Concurrent writer processes')
+        parser.add_argument('--seconds', type=float, default=10.0, help='Duration of each run')
+        parser.add_argument('--quotations', type=int, default=100, help='Quotations to seed (5 lines each)')
+        parser.add_argument('--mode', choices=[*MODES, 'both'], default='both')
+        parser.add_argument('--json', dest='json_path', help='Also write the results to this file')
+        # Internal: the phases run in child processes configured through DB_* variables
+        parser.add_argument('--seed', action='store_true', help='(internal) seed the scratch database')
+        parser.add_argument('--worker', action='store_true', help='(internal) run one writer')
+        parser.add_argument('--start-at', type=float, default=0.0, help='(internal) synchronised start time')
+
+    def handle(self, *args, **options):
+        if (options['seed'] or options['worker']) and (
+            str(connections['default'].settings_dict['NAME']) != os.environ.get('DB_NAME')
+        ):
+            raise CommandError('The settings module does not take its database from DB_NAME')
+        if options['seed']:
+            return self._seed(options['quotations'])
+        if options['worker']:
+            return self._worker(options['start_at'], options['seconds'])
+
+        modes = list(MODES) if options['mode'] == 'both' else [options['mode']]
+        results = [self._run(mode, options) for mode in modes]
+        self.stdout.write(
+            f"{'mode':<8} {'procs':>5} {'saves':>7} {'saves/s':>9} {'locked':>7} {'p50 ms':>8} {'p95 ms':>8}"
+        )
+        for result in results:
+            self.stdout.write(
+                f"{result['mode']:<8} {result['processes']:>5} {result['saves']:>7} "
+                f"{result['saves_per_second']:>9.1f} {result['locked_errors']:>7} "
+                f"{result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f}"
+            )
+        if options['json_path']:
+            Path(options['json_path']).write_text(json.dumps(results, indent=2))
+
+    def _run(self, mode, options):
+        with tempfile.TemporaryDirectory(prefix='sqlite-bench-') as directory:
+            env = {
+                **os.environ,
+                'DB_ENGINE': 'sqlite',
+                'DB_NAME': str(Path(directory) / 'bench.sqlite3'),
+                'DB_REPLICA_NAME': '',
+                'DB_SQLITE_TUNING': MODES[mode],
+            }
+            manage = [sys.executable, str(Path(settings.BASE_DIR) / 'manage.py')]
+            subprocess.run([*manage, 'migrate', '--run-syncdb', '-v0'], env=env, check=True)
+            subprocess.run(
+                [*manage, 'benchmark_sqlite_writes', '--seed', '--quotations', str(options['quotations'])],
+                env=env, check=True,
+            )
+            start_at = time.time() + 2
+            workers = [
+                subprocess.Popen(
+                    [*manage, 'benchmark_sqlite_writes', '--worker', '--start-at', str(start_at),
+                     '--seconds', str(options['seconds'])],
+                    env=env, stdout=subprocess.PIPE, text=True,
+                )
+                for _ in range(options['processes'])
+            ]
+            outputs = [worker.communicate()[0] for worker in workers]
+        if any(worker.returncode for worker in workers):
+            raise CommandError(f'A {mode} writer process failed')
+
+        runs = [json.loads(output.strip().splitlines()[-1]) for output in outputs]
+        latencies = [latency for run in runs for latency in run['latencies_ms']]
+        saves = sum(run['saves'] for run in runs)
+        return {
+            'mode': mode,
+            'processes': options['processes'],
+            'seconds': options['seconds'],
+            'saves': saves,
+            'saves_per_second': saves / options['seconds'],
+            'locked_errors': sum(run['locked'] for run in runs),
+            'other_errors': sum(run['errors'] for run in runs),
+            'p50_ms': statistics.median(latencies) if latencies else 0.0,
+            'p95_ms': _percentile(latencies, 0.95),
+        }
+
+    def _seed(self, quotation_count):
+        from django.contrib.auth.models import User
+
+        from quotations.models import (
+            CustomerQuotationRequest, Hardware, Quotation, QuotationHardware
+        )
+
+        user = User.objects.create_user('benchmark')
+        hardware = [
+            Hardware.objects.create(name=f'Part {number}', category='Benchmark', unit_cost=Decimal('9.99'))
+            for number in range(5)
+        ]
+        for number in range(quotation_count):
+            request = CustomerQuotationRequest.objects.create(
+                customer_name=f'Customer {number}', customer_email='bench@example.com', project_description='-'
+            )
+            quotation = Quotation.objects.create(
+                quotation_number=f'BENCH-{number:05d}', customer_request=request, created_by=user
+            )
+            for part in hardware:
+                QuotationHardware.objects.create(quotation=quotation, hardware=part, quantity=1, unit_cost=part.unit_cost)
+
+    def _worker(self, start_at, seconds):
+        from quotations.models import QuotationHardware
+
+        line_ids = list(QuotationHardware.objects.values_list('pk', flat=True))
+        connections.close_all()
+        time.sleep(max(0.0, start_at - time.time()))
+        deadline = time.monotonic() + seconds
+        saves = locked = errors = 0
+        latencies = []
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                # The editor's save path: load the line, change it, save() (which
+                # also moves the quotation totals in the same transaction)
+                line = QuotationHardware.objects.select_related('quotation', 'hardware').get(
+                    pk=random.choice(line_ids)
+                )
+                line.quantity = random.randint(1, 50)
+                line.save()
+            except OperationalError as exc:
+                if 'locked' in str(exc):
+                    locked += 1
+                else:
+                    errors += 1
+                continue
+            saves += 1
+            latencies.append((time.perf_counter() - started) * 1000)
+        self.stdout.write(json.dumps({
+            'saves': saves, 'locked': locked, 'errors': errors, 'latencies_ms': latencies,
+        }))
@@ -0,0 +1,180 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, OperationalError, connections
+from django.test.utils import override_settings
+
+
+class Command(BaseCommand):
+    help = (
+        'Create quotations from many processes and threads at once on a scratch SQLite file '
+        'and check that the allocated quotation and request numbers never collide'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=8, help='Concurrent worker processes')
+        parser.add_argument('--threads', type=int, default=2, help='Threads per worker process')
+        parser.add_argument('--quotations', type=int, default=4000, help='Quotations to create in total')
+        parser.add_argument(
+            '--block-size', type=int, default=None,
+            help='NUMBER_BLOCK_SIZE for the run (default: the setting); 1 also checks for gaps'
+        )
+        # Internal: the phases run in child processes configured through DB_* variables
+        parser.add_argument('--seed', action='store_true', help='(internal) seed the scratch database')
+        parser.add_argument('--worker', action='store_true', help='(internal) run one worker process')
+        parser.add_argument('--verify', action='store_true', help='(internal) report the allocated numbers')
+        parser.add_argument('--count', type=int, default=0, help='(internal) quotations for this worker')
+        parser.add_argument('--start-at', type=float, default=0.0, help='(internal) synchronised start time')
+
+    def handle(self, *args, **options):
+        internal = options['seed'] or options['worker'] or options['verify']
+        if internal and str(connections['default'].settings_dict['NAME']) != os.environ.get('DB_NAME'):
+            raise CommandError('The settings module does not take its database from DB_NAME')
+        block_size = options['block_size'] or settings.NUMBER_BLOCK_SIZE
+        if block_size < 1:
+            raise CommandError('--block-size must be at least 1')
+        with override_settings(NUMBER_BLOCK_SIZE=block_size):
+            if options['seed']:
+                return self._seed()
+            if options['worker']:
+                return self._worker(options['count'], options['threads'], options['start_at'])
+            if options['verify']:
+                return self._verify()
+        self._run(block_size, options)
+
+    def _run(self, block_size, options):
+        processes, total = options['processes'], options['quotations']
+        with tempfile.TemporaryDirectory(prefix='numbering-check-') as directory:
+            env = {
+                **os.environ,
+                'DB_ENGINE': 'sqlite',
+                'DB_NAME': str(Path(directory) / 'numbering.sqlite3'),
+                'DB_REPLICA_NAME': '',
+                # BEGIN IMMEDIATE: concurrent writers wait instead of failing
+                'DB_SQLITE_TUNING': '1',
+                'DB_SQLITE_BUSY_TIMEOUT': '30000',
+            }
+            manage = [sys.executable, str(Path(settings.BASE_DIR) / 'manage.py'), 'check_number_allocation']
+            subprocess.run([*manage[:2], 'migrate', '--run-syncdb', '-v0'], env=env, check=True)
+            subprocess.run([*manage, '--seed'], env=env, check=True)
+            start_at = time.time() + 2
+            started = time.perf_counter()
+            workers = [
+                subprocess.Popen(
+                    [*manage, '--worker', '--count', str(total // processes + (number < total % processes)),
+                     '--threads', str(options['threads']), '--block-size', str(block_size),
+                     '--start-at', str(start_at)],
+                    env=env, stdout=subprocess.PIPE, text=True,
+                )
+                for number in range(processes)
+            ]
+            outputs = [worker.communicate()[0] for worker in workers]
+            elapsed = time.perf_counter() - started - 2
+            if any(worker.returncode for worker in workers):
+                raise CommandError('A worker process failed')
+            verify = subprocess.run([*manage, '--verify'], env=env, check=True, stdout=subprocess.PIPE, text=True)
+
+        runs = [json.loads(output.strip().splitlines()[-1]) for output in outputs]
+        created = sum(run['created'] for run in runs)
+        collisions = sum(run['collisions'] for run in runs)
+        errors = sum(run['errors'] for run in runs)
+        found = json.loads(verify.stdout.strip().splitlines()[-1])
+        self.stdout.write(
+            f'{processes} process(es) x {options["threads"]} thread(s), block size {block_size}: '
+            f'{created} quotation(s) in {elapsed:.1f}s ({created / max(elapsed, 0.001):.0f}/s)'
+        )
+        problems = []
+        if collisions:
+            problems.append(f'{collisions} unique-number collision(s)')
+        if errors:
+            problems.append(f'{errors} other error(s)')
+        for name, numbers in found.items():
+            self.stdout.write(
+                f'  {name}: {numbers["rows"]} row(s), {numbers["distinct"]} distinct number(s), '
+                f'values {numbers["first"]}..{numbers["last"]}, {numbers["gaps"]} unused'
+            )
+            if numbers['rows'] != created or numbers['distinct'] != created:
+                problems.append(f'{name}: {numbers["distinct"]} distinct number(s) for {created} row(s)')
+            # Only the blocks still held by the exited workers may be unused
+            allowed = 0 if block_size == 1 else processes * (block_size - 1)
+            if numbers['gaps'] > allowed:
+                problems.append(f'{name}: {numbers["gaps"]} unused value(s), at most {allowed} expected')
+        if problems:
+            raise CommandError('; '.join(problems))
+        self.stdout.write(self.style.SUCCESS('No collisions'))
+
+    def _seed(self):
+        from django.contrib.auth.models import User
+
+        User.objects.create_user('numbering-check')
+
+    def _worker(self, count, threads, start_at):
+        from django.contrib.auth.models import User
+
+        from quotations.models import CustomerQuotationRequest, Quotation
+
+        user = User.objects.get(username='numbering-check')
+        connections.close_all()
+        totals = {'created': 0, 'collisions': 0, 'errors': 0}
+        lock = threading.Lock()
+
+        def create(share):
+            counts = {'created': 0, 'collisions': 0, 'errors': 0}
+            time.sleep(max(0.0, start_at - time.time()))
+            try:
+                for number in range(share):
+                    try:
+                        # Both numbers are allocated by save(); no retries
+                        request = CustomerQuotationRequest.objects.create(
+                            customer_name=f'Customer {number}', customer_email='check@example.com',
+                            project_description='-'
+                        )
+                        Quotation.objects.create(customer_request=request, created_by=user)
+                    except IntegrityError:
+                        counts['collisions'] += 1
+                    except OperationalError:
+                        counts['errors'] += 1
+                    else:
+                        counts['created'] += 1
+            finally:
+                connections.close_all()
+                with lock:
+                    for key, value in counts.items():
+                        totals[key] += value
+
+        workers = [
+            threading.Thread(target=create, args=(count // threads + (number < count % threads),))
+            for number in range(threads)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.stdout.write(json.dumps(totals))
+
+    def _verify(self):
+        from quotations.models import CustomerQuotationRequest, Quotation
+
+        found = {}
+        for name, model, field in (
+            ('quotation_number', Quotation, 'quotation_number'),
+            ('request_number', CustomerQuotationRequest, 'request_number'),
+        ):
+            numbers = list(model.objects.values_list(field, flat=True))
+            values = sorted(int(number.rsplit('-', 1)[1]) for number in numbers)
+            found[name] = {
+                'rows': len(numbers),
+                'distinct': len(set(numbers)),
+                'first': values[0] if values else 0,
+                'last': values[-1] if values else 0,
+                'gaps': values[-1] - len(set(values)) if values else 0,
+            }
+        self.stdout.write(json.dumps(found))
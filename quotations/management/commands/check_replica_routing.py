@@ -0,0 +1,93 @@
+from contextlib import ExitStack
+
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import RequestFactory
+from django.urls import URLPattern, get_resolver, reverse
+
+from quotations.models import Hardware, Quotation
+from quotations.routers import REPLICA_ALIAS, _replica_reads
+
+
+def _replica_views(patterns):
+    for pattern in patterns:
+        if isinstance(pattern, URLPattern):
+            if getattr(pattern.callback, 'use_replica', False) and pattern.name:
+                yield pattern.name, pattern.callback
+        else:
+            yield from _replica_views(pattern.url_patterns)
+
+
+def _first_pk(model):
+    return model.objects.using('default').order_by('pk').values_list('pk', flat=True).first()
+
+
+# URL name -> (kwargs, query string) builders for routes that need them
+SAMPLES = {
+    'hardware_detail': lambda: ({'pk': _first_pk(Hardware)}, ''),
+    'api_editor_quotation_detail': lambda: ({'pk': _first_pk(Quotation)}, ''),
+    'api_editor_quotation_batch': lambda: ({}, f'ids={_first_pk(Quotation)}'),
+    'api_approval_queue': lambda: ({'stage': 'technical'}, ''),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Request every @use_replica view and report which database alias its queries used; '
+        'fails when a query inside a replica view reached the primary'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', help='User to request login-only views as (default: first superuser)')
+
+    def handle(self, *args, **options):
+        if REPLICA_ALIAS not in connections.databases:
+            raise CommandError('No replica database is configured (set DB_REPLICA_HOST or DB_REPLICA_NAME)')
+        users = User.objects.using('default')
+        user = users.get(username=options['username']) if options['username'] else (
+            users.filter(is_superuser=True).order_by('pk').first()
+        )
+
+        counts = {}
+
+        def recorder(alias):
+            def record(execute, sql, params, many, context):
+                if _replica_reads.get():
+                    counts[alias] = counts.get(alias, 0) + 1
+                return execute(sql, params, many, context)
+            return record
+
+        factory = RequestFactory()
+        failures = 0
+        with ExitStack() as stack:
+            for alias in ('default', REPLICA_ALIAS):
+                stack.enter_context(connections[alias].execute_wrapper(recorder(alias)))
+            for name, view in sorted(_replica_views(get_resolver().url_patterns)):
+                kwargs, query = SAMPLES.get(name, lambda: ({}, ''))()
+                if any(value is None for value in kwargs.values()):
+                    self.stdout.write(f'{name}: skipped (no sample rows)')
+                    continue
+                request = factory.get(f"{reverse(name, kwargs=kwargs)}?{query}", SERVER_NAME='localhost')
+                request.user = user or AnonymousUser()
+                counts.clear()
+                try:
+                    if iscoroutinefunction(view):
+                        response = async_to_sync(view)(request, **kwargs)
+                    else:
+                        response = view(request, **kwargs)
+                except Exception as exc:
+                    failures += 1
+                    self.stdout.write(self.style.ERROR(f'{name}: {exc.__class__.__name__}: {exc}'))
+                    continue
+                replica, primary = counts.get(REPLICA_ALIAS, 0), counts.get('default', 0)
+                line = f'{name}: {response.status_code}, {replica} replica / {primary} primary queries'
+                if primary:
+                    failures += 1
+                    self.stdout.write(self.style.ERROR(line))
+                else:
+                    self.stdout.write(line)
+        if failures:
+            raise CommandError(f'{failures} view(s) failed or sent queries to the primary')
+        self.stdout.write(self.style.SUCCESS('All replica views read from the replica'))
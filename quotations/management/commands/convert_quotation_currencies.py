@@ -0,0 +1,51 @@
+import json
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+
+from quotations.currency import convert_quotations, currency_report
+from quotations.models import Quotation
+
+
+class Command(BaseCommand):
+    help = (
+        'Convert line items into their quotation currency and rebuild totals, '
+        'or with --report print quotation totals converted to one currency'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('quotation_numbers', nargs='*', help='Limit to these quotations')
+        parser.add_argument('--batch-size', type=int, default=500, help='Quotations per batch')
+        parser.add_argument('--report', metavar='CURRENCY', help='Report totals converted to CURRENCY instead')
+        parser.add_argument('--as-of', type=date.fromisoformat, help='Report: convert at this date\'s rates')
+        parser.add_argument('--since', type=date.fromisoformat, help='Report: quotations created on or after')
+        parser.add_argument('--until', type=date.fromisoformat, help='Report: quotations created before')
+        parser.add_argument('--approved', action='store_true', help='Report: finally approved quotations only')
+
+    def handle(self, *args, **options):
+        quotations = Quotation.objects.all()
+        if options['quotation_numbers']:
+            quotations = quotations.filter(quotation_number__in=options['quotation_numbers'])
+
+        if options['report']:
+            if options['since']:
+                quotations = quotations.filter(created_date__date__gte=options['since'])
+            if options['until']:
+                quotations = quotations.filter(created_date__date__lt=options['until'])
+            if options['approved']:
+                quotations = quotations.filter(final_approval=True)
+            report = currency_report(options['report'].upper(), quotations, as_of=options['as_of'])
+            self.stdout.write(json.dumps(report, cls=DjangoJSONEncoder, indent=2))
+            return
+
+        quotation_ids = None
+        if options['quotation_numbers']:
+            quotation_ids = list(quotations.values_list('pk', flat=True))
+        result = convert_quotations(quotation_ids, batch_size=options['batch_size'])
+        for from_currency, to_currency, on in sorted(result.missing):
+            self.stderr.write(f'No {from_currency}->{to_currency} rate on or before {on}')
+        summary = f'{result.quotations} quotation(s) converted, {result.lines_updated} line(s) changed'
+        if result.missing:
+            raise CommandError(f'{summary}; {len(result.missing)} missing rate(s) left lines unconverted')
+        self.stdout.write(self.style.SUCCESS(summary))
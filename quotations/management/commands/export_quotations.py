@@ -0,0 +1,47 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from quotations.exports import (
+    DATASETS, DEFAULT_CHUNK_SIZE, FORMATS, ExportError, export_chunks, filter_quotations, parse_date
+)
+from quotations.models import Quotation
+
+
+class Command(BaseCommand):
+    help = 'Export quotations or their line items as CSV or XLSX, streaming rows a chunk at a time'
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=list(DATASETS))
+        parser.add_argument('--format', dest='fmt', choices=list(FORMATS), default='csv')
+        parser.add_argument('--output', '-o', help='File to write (default: standard output, CSV only)')
+        parser.add_argument('--search', default='', help='Quotation number, customer or company contains')
+        parser.add_argument('--approval', choices=['pending', 'approved'], help='Final approval state')
+        parser.add_argument('--from', dest='created_from', help='Created on or after YYYY-MM-DD')
+        parser.add_argument('--to', dest='created_to', help='Created on or before YYYY-MM-DD')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='Rows fetched per round trip')
+        parser.add_argument('--database', default='default', help='Database alias to read from')
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be at least 1')
+        if options['fmt'] == 'xlsx' and not options['output']:
+            raise CommandError('XLSX exports need --output')
+        try:
+            created_from = parse_date(options['created_from']) if options['created_from'] else None
+            created_to = parse_date(options['created_to']) if options['created_to'] else None
+        except ExportError as exc:
+            raise CommandError(str(exc))
+        quotations = filter_quotations(
+            Quotation.objects.using(options['database']),
+            options['search'], options['approval'], created_from, created_to,
+        )
+        chunks = export_chunks(options['dataset'], options['fmt'], quotations, chunk_size=options['chunk_size'])
+        if options['output']:
+            with open(options['output'], 'wb') as output:
+                written = sum(output.write(chunk) for chunk in chunks)
+            self.stderr.write(f'Wrote {written} bytes to {options["output"]}')
+        else:
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+            sys.stdout.buffer.flush()
@@ -0,0 +1,48 @@
+from dataclasses import replace
+
+from django.core.management.base import BaseCommand, CommandError
+
+from quotations.benchmarks.data import SCALES, generate
+
+
+class Command(BaseCommand):
+    help = (
+        'Fill the database with synthetic requests, hardware, personnel categories, quotations and '
+        'line items for benchmarking (use a dedicated database)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', choices=SCALES, default='small', help='Preset sizes')
+        parser.add_argument('--requests', type=int, help='Customer requests (overrides the preset)')
+        parser.add_argument('--hardware', type=int, help='Hardware SKUs')
+        parser.add_argument('--categories', type=int, help='Personnel cost categories')
+        parser.add_argument('--quotations', type=int, help='Quotations')
+        parser.add_argument('--lines', dest='hardware_lines', type=int, help='Hardware lines per quotation')
+        parser.add_argument('--personnel-lines', type=int, help='Personnel lines per quotation')
+        parser.add_argument('--days', type=int, help='Spread creation dates over this many days')
+        parser.add_argument(
+            '--text-words', type=int, help='Extra words in descriptions and notes (heavy text columns)'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        overrides = {
+            name: options[name]
+            for name in (
+                'requests', 'hardware', 'categories', 'quotations', 'hardware_lines', 'personnel_lines',
+                'days', 'text_words',
+            )
+            if options[name] is not None
+        }
+        scale = replace(SCALES[options['scale']], **overrides)
+        if scale.quotations and not (scale.requests and scale.hardware):
+            raise CommandError('Quotations need at least one request and one hardware item')
+        self.stdout.write(f'Generating {scale}')
+        try:
+            counts = generate(scale, seed=options['seed'], batch_size=options['batch_size'], log=self.stdout.write)
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(self.style.SUCCESS(
+            'Generated ' + ', '.join(f'{count} {name}' for name, count in counts.items())
+        ))
@@ -0,0 +1,43 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from quotations.importers import detect_format, import_bom
+from quotations.models import Quotation
+
+
+class Command(BaseCommand):
+    help = 'Import hardware and personnel line items into a quotation from a CSV or JSON file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('quotation_number', help='Quotation to import into')
+        parser.add_argument('path', help='CSV or JSON bill of materials')
+        parser.add_argument('--format', choices=['csv', 'json'], help='Input format (default: from file extension)')
+        parser.add_argument('--replace', action='store_true', help='Update lines already on the quotation')
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows per bulk INSERT/UPDATE')
+
+    def handle(self, *args, **options):
+        try:
+            quotation = Quotation.objects.get(quotation_number=options['quotation_number'])
+        except Quotation.DoesNotExist:
+            raise CommandError(f"Quotation {options['quotation_number']} does not exist")
+
+        fmt = options['format'] or detect_format(options['path'])
+        started = time.monotonic()
+        with open(options['path'], encoding='utf-8-sig', newline='') as stream:
+            result = import_bom(
+                quotation, stream, fmt=fmt,
+                replace_existing=options['replace'],
+                batch_size=options['batch_size'],
+            )
+        elapsed = time.monotonic() - started
+
+        if not result.ok:
+            for error in result.errors:
+                self.stderr.write(f"line {error['line']}: {error['error']}")
+            raise CommandError(f'Import failed with {len(result.errors)} error(s); nothing was written')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported into {quotation.quotation_number}: '
+            f'{result.created} created, {result.updated} updated in {elapsed:.2f}s'
+        ))
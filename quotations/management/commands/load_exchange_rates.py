@@ -0,0 +1,71 @@
+import csv
+import json
+from datetime import date
+from decimal import Decimal, InvalidOperation
+
+from django.core.management.base import BaseCommand, CommandError
+
+from quotations import currency
+from quotations.models import ExchangeRate
+
+COLUMN_ALIASES = {
+    'from_currency': ('from_currency', 'from', 'base'),
+    'to_currency': ('to_currency', 'to', 'quote'),
+    'effective_date': ('effective_date', 'date'),
+    'rate': ('rate',),
+}
+
+
+def _column(row, name):
+    for alias in COLUMN_ALIASES[name]:
+        value = row.get(alias)
+        if value not in (None, ''):
+            return str(value).strip()
+    raise ValueError(f'missing {name}')
+
+
+class Command(BaseCommand):
+    help = 'Load exchange rates (from_currency, to_currency, effective_date, rate) from a CSV or JSON file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV with a header row, or a JSON array of objects')
+        parser.add_argument('--source', default='', help='Recorded as the source of every rate')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per bulk upsert')
+
+    def _rows(self, path):
+        with open(path, encoding='utf-8-sig', newline='') as stream:
+            if path.lower().endswith('.json'):
+                return json.load(stream)
+            return [{key.strip().lower(): value for key, value in row.items() if key} for row in csv.DictReader(stream)]
+
+    def handle(self, *args, **options):
+        rates, errors = [], []
+        for line_number, row in enumerate(self._rows(options['path']), start=2):
+            try:
+                rate = Decimal(_column(row, 'rate'))
+                if rate <= 0:
+                    raise ValueError('rate must be positive')
+                rates.append(ExchangeRate(
+                    from_currency=_column(row, 'from_currency').upper(),
+                    to_currency=_column(row, 'to_currency').upper(),
+                    effective_date=date.fromisoformat(_column(row, 'effective_date')),
+                    rate=rate,
+                    source=options['source'],
+                ))
+            except (ValueError, InvalidOperation) as exc:
+                errors.append(f'row {line_number}: {exc}')
+        if errors:
+            for error in errors:
+                self.stderr.write(error)
+            raise CommandError(f'{len(errors)} invalid row(s); nothing was loaded')
+
+        # Re-loading a file replaces the rates it already loaded
+        ExchangeRate.objects.bulk_create(
+            rates, batch_size=options['batch_size'],
+            update_conflicts=True,
+            unique_fields=['from_currency', 'to_currency', 'effective_date'],
+            update_fields=['rate', 'source'],
+        )
+        # bulk_create sends no signals
+        currency.invalidate()
+        self.stdout.write(self.style.SUCCESS(f'Loaded {len(rates)} exchange rate(s)'))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from quotations.search import rebuild_search_indexes
+
+
+class Command(BaseCommand):
+    help = 'Create and fully repopulate the hardware and customer request search indexes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS, help='Database alias to index')
+
+    def handle(self, *args, **options):
+        rebuild_search_indexes(options['database'])
+        self.stdout.write(self.style.SUCCESS('Search indexes rebuilt'))
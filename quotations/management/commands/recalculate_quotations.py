@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from quotations.pricing import recalculate_quotations
+
+
+class Command(BaseCommand):
+    help = 'Rebuild quotation totals from their hardware and personnel line items'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'quotation_ids', nargs='*', type=int,
+            help='Quotations to recalculate (default: all)'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Quotations aggregated per batch'
+        )
+
+    def handle(self, *args, **options):
+        count = recalculate_quotations(
+            options['quotation_ids'] or None,
+            batch_size=options['batch_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'Recalculated {count} quotation(s)'))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from quotations.stats import reconcile_counters
+
+
+class Command(BaseCommand):
+    help = 'Recount the denormalized dashboard counters and repair any drift'
+
+    def handle(self, *args, **options):
+        changes = reconcile_counters()
+        for name, (old, new) in sorted(changes.items()):
+            self.stdout.write(f'{name}: {old} -> {new}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Repaired {len(changes)} counter(s)' if changes else 'All counters are consistent'
+        ))
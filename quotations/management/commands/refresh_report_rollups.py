@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from quotations.rollups import DEFAULT_CHUNK_DAYS, get_watermark, rebuild_rollups, refresh_rollups
+
+
+class Command(BaseCommand):
+    help = (
+        'Refresh the daily reporting rollups from the days changed since the last run, '
+        'or rebuild them all with --rebuild'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild', action='store_true',
+            help='Recompute every day (after deletes or hardware re-categorisation)'
+        )
+        parser.add_argument(
+            '--chunk-days', type=int, default=DEFAULT_CHUNK_DAYS, help='Days recomputed per transaction'
+        )
+
+    def handle(self, *args, **options):
+        if options['chunk_days'] < 1:
+            raise CommandError('--chunk-days must be at least 1')
+        log = self.stdout.write if options['verbosity'] > 1 else None
+        previous = get_watermark()
+        if options['rebuild']:
+            result = rebuild_rollups(chunk_days=options['chunk_days'], log=log)
+        else:
+            result = refresh_rollups(chunk_days=options['chunk_days'], log=log)
+        action = 'Rebuilt' if result.rebuilt else f'Refreshed changes since {previous:%Y-%m-%d %H:%M:%S}:'
+        self.stdout.write(self.style.SUCCESS(
+            f'{action} {result.days} day(s), {result.rows} rollup row(s); watermark {result.watermark:%Y-%m-%d %H:%M:%S}'
+        ))
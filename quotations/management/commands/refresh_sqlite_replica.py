@@ -0,0 +1,32 @@
+import sqlite3
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from quotations.routers import REPLICA_ALIAS
+
+
+class Command(BaseCommand):
+    help = (
+        'Copy the SQLite primary database onto the SQLite replica file, standing in for '
+        'replication in the local two-file setup (DB_REPLICA_NAME)'
+    )
+
+    def handle(self, *args, **options):
+        if REPLICA_ALIAS not in connections.databases:
+            raise CommandError('No replica database is configured (set DB_REPLICA_NAME)')
+        primary, replica = connections['default'], connections[REPLICA_ALIAS]
+        if primary.vendor != 'sqlite' or replica.vendor != 'sqlite':
+            raise CommandError('Only SQLite primaries and replicas can be copied; use real replication otherwise')
+        replica.close()
+        source = sqlite3.connect(primary.settings_dict['NAME'])
+        target = sqlite3.connect(replica.settings_dict['NAME'])
+        try:
+            # Online backup: consistent even while the primary is being written
+            source.backup(target)
+        finally:
+            source.close()
+            target.close()
+        self.stdout.write(self.style.SUCCESS(
+            f"Copied {primary.settings_dict['NAME']} to {replica.settings_dict['NAME']}"
+        ))
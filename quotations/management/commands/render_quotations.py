@@ -0,0 +1,87 @@
+import datetime
+import shutil
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from quotations.documents import FORMATS, prune_documents, render_documents
+from quotations.models import Quotation
+
+
+class Command(BaseCommand):
+    help = 'Render quotation PDF/HTML documents into the document cache, in parallel'
+
+    def add_arguments(self, parser):
+        parser.add_argument('quotation_numbers', nargs='*', help='Quotations to render (default: see --month/--all)')
+        parser.add_argument('--month', help='Render quotations created in this month (YYYY-MM)')
+        parser.add_argument('--all', action='store_true', help='Render every quotation')
+        parser.add_argument('--approved', action='store_true', help='Only finally approved quotations')
+        parser.add_argument(
+            '--format', action='append', choices=sorted(FORMATS), dest='formats',
+            help='Document format; repeat for several (default: pdf)'
+        )
+        parser.add_argument('--processes', type=int, help='Worker processes (default: one per CPU, 1 renders inline)')
+        parser.add_argument('--chunk-size', type=int, default=20, help='Quotations per worker task')
+        parser.add_argument('--output-dir', help='Also copy each document here as <quotation number>.<format>')
+        parser.add_argument('--prune-days', type=int, help='First delete cached documents unused for this many days')
+
+    def _quotations(self, options):
+        quotations = Quotation.objects.all()
+        if options['quotation_numbers']:
+            quotations = quotations.filter(quotation_number__in=options['quotation_numbers'])
+        elif options['month']:
+            try:
+                start = datetime.datetime.strptime(options['month'], '%Y-%m')
+            except ValueError:
+                raise CommandError('--month must look like 2024-01')
+            end = (start + datetime.timedelta(days=32)).replace(day=1)
+            tz = timezone.get_current_timezone()
+            quotations = quotations.filter(
+                created_date__gte=timezone.make_aware(start, tz),
+                created_date__lt=timezone.make_aware(end, tz),
+            )
+        elif not options['all']:
+            raise CommandError('Give quotation numbers, --month or --all')
+        if options['approved']:
+            quotations = quotations.filter(final_approval=True)
+        return quotations
+
+    def handle(self, *args, **options):
+        if options['prune_days'] is not None:
+            removed = prune_documents(options['prune_days'])
+            self.stdout.write(f'Pruned {removed} cached document(s)')
+
+        numbers = dict(self._quotations(options).order_by('pk').values_list('pk', 'quotation_number'))
+        formats = tuple(options['formats'] or ['pdf'])
+        output_dir = Path(options['output_dir']) if options['output_dir'] else None
+        if output_dir:
+            output_dir.mkdir(parents=True, exist_ok=True)
+
+        started = time.monotonic()
+        rendered = cached = failed = 0
+        for quotation_id, fmt, path, was_cached, error in render_documents(
+            numbers, formats, processes=options['processes'], chunk_size=options['chunk_size']
+        ):
+            if error:
+                failed += 1
+                self.stderr.write(f'{numbers[quotation_id]} ({fmt}): {error}')
+                continue
+            if was_cached:
+                cached += 1
+            else:
+                rendered += 1
+            if output_dir:
+                shutil.copyfile(path, output_dir / f'{numbers[quotation_id]}.{fmt}')
+            if options['verbosity'] > 1:
+                self.stdout.write(f'{numbers[quotation_id]} ({fmt}): {path}')
+        elapsed = time.monotonic() - started
+
+        summary = (
+            f'{len(numbers)} quotation(s): {rendered} rendered, {cached} from cache, '
+            f'{failed} failed in {elapsed:.2f}s'
+        )
+        if failed:
+            raise CommandError(summary)
+        self.stdout.write(self.style.SUCCESS(summary))
@@ -0,0 +1,47 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+
+from quotations.models import Quotation
+from quotations.pricehistory import parse_as_of, quotations_using, reprice_quotations
+
+
+class Command(BaseCommand):
+    help = (
+        'Reprice quotations at the catalog prices in force on a date (now by default) '
+        'and report the change in each total; --apply writes the new prices'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('quotation_numbers', nargs='*', help='Limit to these quotations')
+        parser.add_argument('--as-of', help='Date (end of day) or ISO datetime; default now')
+        parser.add_argument('--open', action='store_true', help='Only quotations without final approval')
+        parser.add_argument('--hardware', type=int, action='append', default=[],
+                            help='Only quotations using this hardware id (repeatable)')
+        parser.add_argument('--category', type=int, action='append', default=[],
+                            help='Only quotations using this personnel category id (repeatable)')
+        parser.add_argument('--apply', action='store_true', help='Write the repriced lines and totals')
+        parser.add_argument('--all', action='store_true', help='List unchanged quotations too')
+        parser.add_argument('--batch-size', type=int, default=500, help='Quotations per batch')
+
+    def handle(self, *args, **options):
+        try:
+            as_of = parse_as_of(options['as_of']) if options['as_of'] else None
+        except ValueError as exc:
+            raise CommandError(exc)
+        quotations = Quotation.objects.all()
+        if options['quotation_numbers']:
+            quotations = quotations.filter(quotation_number__in=options['quotation_numbers'])
+        quotations = quotations_using(quotations, options['hardware'], options['category'], options['open'])
+
+        result = reprice_quotations(
+            quotations, as_of=as_of, apply=options['apply'], batch_size=options['batch_size']
+        )
+        self.stdout.write(json.dumps(result.as_dict(changed_only=not options['all']), cls=DjangoJSONEncoder, indent=2))
+        for from_currency, to_currency, on in sorted(result.missing_rates):
+            self.stderr.write(f'No {from_currency}->{to_currency} rate on or before {on}; lines kept their price')
+        verb = 'repriced' if options['apply'] else 'would change'
+        self.stderr.write(self.style.SUCCESS(
+            f'{len(result.changed)} of {result.quotations} quotation(s) {verb} as of {result.as_of:%Y-%m-%d %H:%M}'
+        ))
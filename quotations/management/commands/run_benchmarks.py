@@ -0,0 +1,101 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from quotations.benchmarks.data import BENCHMARK_USERNAME
+from quotations.benchmarks.load import run_load
+from quotations.benchmarks.micro import run_microbenchmarks, sample_cases
+from quotations.benchmarks.projections import run_projection_benchmark
+from quotations.benchmarks.results import compare, load_results, run_metadata, save_results
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark every read-only view and API endpoint, optionally under concurrent load, '
+        'write the results as JSON and flag regressions against a baseline file'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help='Write the results to this JSON file')
+        parser.add_argument('--baseline', help='Compare against this earlier result file')
+        parser.add_argument(
+            '--threshold', type=float, default=0.2,
+            help='Relative latency/throughput change flagged as a regression (default 0.2)'
+        )
+        parser.add_argument('--iterations', type=int, default=50, help='Timed requests per case')
+        parser.add_argument('--warmup', type=int, default=5, help='Untimed requests per case')
+        parser.add_argument('--case', action='append', help='Only run cases whose name contains this (repeatable)')
+        parser.add_argument('--skip-micro', action='store_true', help='Only run the load test')
+        parser.add_argument('--load', action='store_true', help='Also run the concurrent load driver')
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--duration', type=float, default=30.0, help='Load test length in seconds')
+        parser.add_argument('--base-url', help='Load test a running server instead of in-process')
+        parser.add_argument('--cookie', help='Cookie header for --base-url, e.g. "sessionid=..."')
+        parser.add_argument(
+            '--projections', action='store_true',
+            help='Also measure the bytes and memory per row the list views save by deferring heavy text'
+        )
+        parser.add_argument('--projection-rows', type=int, default=500, help='Rows read per list projection')
+        parser.add_argument('--username', default=BENCHMARK_USERNAME, help='User the requests are made as')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"No user {options['username']!r}; run generate_benchmark_data first")
+
+        cases = sample_cases()
+        if options['case']:
+            cases = [case for case in cases if any(part in case.name for part in options['case'])]
+            if not cases:
+                raise CommandError('No case matches --case')
+
+        results = {'meta': run_metadata()}
+        if not options['skip_micro']:
+            self.stdout.write(f"{'case':<36} {'status':>6} {'queries':>7} {'p50 ms':>8} {'p95 ms':>8} {'bytes':>9}")
+            results['micro'] = run_microbenchmarks(
+                user, cases, options['iterations'], options['warmup'], log=self._log_case
+            )
+        if options['load']:
+            load = run_load(
+                user, cases, options['concurrency'], options['duration'],
+                base_url=options['base_url'], cookie=options['cookie'],
+            )
+            results['load'] = load
+            self.stdout.write(
+                f"\nLoad ({load['target']}, {load['concurrency']} workers, {load['duration']:.0f}s): "
+                f"{load['requests']} requests, {load['requests_per_second']:.1f}/s, {load['errors']} errors, "
+                f"p50 {load['p50_ms']:.1f} ms, p95 {load['p95_ms']:.1f} ms, p99 {load['p99_ms']:.1f} ms"
+            )
+        if options['projections']:
+            self.stdout.write(
+                f"\n{'list':<16} {'columns':>11} {'bytes/row':>18} {'memory/row':>18} {'saved':>12}"
+            )
+            results['projections'] = run_projection_benchmark(options['projection_rows'], log=self._log_projection)
+
+        if options['output']:
+            save_results(options['output'], results)
+            self.stdout.write(f"Results written to {options['output']}")
+
+        if options['baseline']:
+            regressions = compare(load_results(options['baseline']), results, options['threshold'])
+            for regression in regressions:
+                self.stdout.write(self.style.ERROR(f'REGRESSION {regression}'))
+            if regressions:
+                raise CommandError(f'{len(regressions)} regression(s) against {options["baseline"]}')
+            self.stdout.write(self.style.SUCCESS(f"No regressions against {options['baseline']}"))
+
+    def _log_case(self, name, result):
+        line = (
+            f"{name:<36} {result['status']!s:>6} {result['queries']:>7} "
+            f"{result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f} {result['bytes']:>9}"
+        )
+        self.stdout.write(self.style.ERROR(line) if result['errors'] else line)
+
+    def _log_projection(self, name, result):
+        full, deferred = result['full'], result['deferred']
+        self.stdout.write(
+            f"{name:<16} {full['columns']:>4} -> {deferred['columns']:<3} "
+            f"{full['bytes_per_row']:>7.0f} -> {deferred['bytes_per_row']:<7.0f} "
+            f"{full['memory_per_row']:>7.0f} -> {deferred['memory_per_row']:<7.0f} "
+            f"{result['bytes_saved_pct']:>5.1f}%/{result['memory_saved_pct']:.1f}%"
+        )
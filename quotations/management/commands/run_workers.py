@@ -0,0 +1,59 @@
+import multiprocessing
+import signal
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from quotations.jobs import Worker
+
+
+def _work(stop_event, poll_interval, burst):
+    # Ctrl-C reaches the whole process group; let the parent coordinate shutdown
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, lambda *args: stop_event.set())
+    for connection in connections.all():
+        connection.close()
+    Worker(poll_interval=poll_interval).run(stop_event, burst=burst)
+
+
+class Command(BaseCommand):
+    help = 'Run background job workers until interrupted'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=2, help='Worker processes')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds between polls of an empty queue')
+        parser.add_argument('--burst', action='store_true', help='Exit once no job is due')
+
+    def handle(self, *args, **options):
+        processes = max(1, options['processes'])
+        stop_event = multiprocessing.Event()
+        # Children must open their own database connections
+        connections.close_all()
+        workers = [
+            multiprocessing.Process(
+                target=_work, args=(stop_event, options['poll_interval'], options['burst']),
+                name=f'quotations-worker-{number}',
+            )
+            for number in range(processes)
+        ]
+        for worker in workers:
+            worker.start()
+        self.stdout.write(f'Started {processes} worker process(es)')
+
+        def stop(*args):
+            stop_event.set()
+
+        signal.signal(signal.SIGTERM, stop)
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            self.stdout.write('Stopping after the current jobs finish...')
+            stop_event.set()
+            for worker in workers:
+                worker.join()
+
+        failed = [worker.name for worker in workers if worker.exitcode]
+        if failed:
+            self.stderr.write(f'Worker(s) exited abnormally: {", ".join(failed)}')
+        self.stdout.write(self.style.SUCCESS('Workers stopped'))
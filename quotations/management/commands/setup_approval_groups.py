@@ -0,0 +1,37 @@
+from django.contrib.auth.models import Group, Permission, User
+from django.core.management.base import BaseCommand
+
+from quotations.workflow import STAGES
+
+# Stage -> (group name, user added to the group when it exists)
+GROUPS = {
+    'technical': ('Technical approvers', 'technical_manager'),
+    'sales': ('Sales approvers', 'sales_manager'),
+    'final': ('Final approvers', None),
+}
+
+
+class Command(BaseCommand):
+    help = 'Create one group per approval stage holding its approve permission'
+
+    def add_arguments(self, parser):
+        for stage in STAGES:
+            parser.add_argument(
+                f'--{stage}', action='append', default=[], metavar='USERNAME',
+                help=f'Add a user to the {stage} approvers (repeatable)'
+            )
+
+    def handle(self, *args, **options):
+        for stage in STAGES:
+            name, default_user = GROUPS[stage]
+            group, created = Group.objects.get_or_create(name=name)
+            group.permissions.add(Permission.objects.get(
+                content_type__app_label='quotations', codename=f'approve_{stage}'
+            ))
+            usernames = options[stage] or ([default_user] if default_user else [])
+            users = list(User.objects.filter(username__in=usernames))
+            group.user_set.add(*users)
+            self.stdout.write(
+                f"{'Created' if created else 'Updated'} {name}: "
+                f"{', '.join(user.username for user in users) or 'no users added'}"
+            )
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from quotations.catalog import sync_catalog
+from quotations.importers import BomImportError, detect_format, iter_rows
+
+
+class Command(BaseCommand):
+    help = 'Synchronise the hardware catalog with a supplier price file (CSV or JSON Lines)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Supplier price file')
+        parser.add_argument('--format', choices=['csv', 'json'], help='Input format (default: from file extension)')
+        parser.add_argument('--supplier', help='Supplier name for rows without one; limits deactivation to this supplier')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per upsert batch')
+        parser.add_argument(
+            '--keep-missing', action='store_true',
+            help='Do not deactivate SKUs that are missing from the file'
+        )
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or detect_format(options['path'])
+        try:
+            with open(options['path'], encoding='utf-8-sig', newline='') as stream:
+                stats = sync_catalog(
+                    iter_rows(stream, fmt),
+                    supplier=options['supplier'],
+                    batch_size=options['batch_size'],
+                    deactivate_missing=not options['keep_missing'],
+                    stderr=self.stderr.write,
+                )
+        except BomImportError as exc:
+            raise CommandError(str(exc))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{stats.rows} rows in {stats.seconds:.2f}s ({stats.rows_per_second:.0f} rows/sec): '
+            f'{stats.created} created, {stats.updated} updated, {stats.unchanged} unchanged, '
+            f'{stats.deactivated} deactivated, {stats.errors} error(s)'
+        ))
+        if stats.errors and not options['keep_missing']:
+            self.stderr.write('Skipped deactivation because some rows could not be parsed')
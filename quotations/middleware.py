@@ -0,0 +1,107 @@
+import json
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from .instrumentation import DEFAULT_NPLUSONE_THRESHOLD, METRICS, QueryRecorder
+from .routers import PIN_COOKIE, SAFE_METHODS, replica_available
+
+logger = logging.getLogger('quotations.performance')
+
+DEFAULT_REPLICA_PIN_SECONDS = 5
+
+
+class QueryMetricsMiddleware:
+    """
+    Record query count, DB time, duplicate queries and render time for every
+    request; report them as a Server-Timing header, a structured log line and
+    the per-process ``METRICS`` registry behind ``/metrics``.
+
+    Runs natively under ASGI too, so async views are not forced onto a thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        started = time.perf_counter()
+        with QueryRecorder() as recorder:
+            response = self.get_response(request)
+        return self._report(request, response, recorder, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        async with QueryRecorder() as recorder:
+            response = await self.get_response(request)
+        return self._report(request, response, recorder, time.perf_counter() - started)
+
+    def _report(self, request, response, recorder, total):
+        match = getattr(request, 'resolver_match', None)
+        view = (match.view_name or match._func_path) if match else 'unresolved'
+        METRICS.observe(view, request.method, response.status_code, recorder, total)
+
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={recorder.db_seconds * 1000:.1f};desc="{recorder.count} queries"',
+            f'render;dur={recorder.render_seconds * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ])
+
+        threshold = getattr(settings, 'NPLUSONE_THRESHOLD', DEFAULT_NPLUSONE_THRESHOLD)
+        repeated = recorder.repeated(threshold)
+        budget = getattr(match.func, 'query_budget', None) if match else None
+        record = {
+            'view': view,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': recorder.count,
+            'duplicate_queries': recorder.duplicates,
+            'db_ms': round(recorder.db_seconds * 1000, 2),
+            'render_ms': round(recorder.render_seconds * 1000, 2),
+            'total_ms': round(total * 1000, 2),
+        }
+        if repeated:
+            record['repeated'] = [{'sql': sql[:200], 'count': count} for sql, count in repeated]
+        if budget is not None and recorder.count > budget:
+            record['query_budget'] = budget
+            logger.warning(json.dumps(record))
+        elif repeated:
+            logger.warning(json.dumps(record))
+        else:
+            logger.info(json.dumps(record))
+        return response
+
+
+class ReplicaPinMiddleware:
+    """Pin a client to the primary for a few seconds after it writes"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return self._pin(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self._pin(request, await self.get_response(request))
+
+    def _pin(self, request, response):
+        if request.method not in SAFE_METHODS and replica_available():
+            seconds = getattr(settings, 'DATABASE_REPLICA_PIN_SECONDS', DEFAULT_REPLICA_PIN_SECONDS)
+            response.set_cookie(PIN_COOKIE, '1', max_age=seconds, httponly=True, samesite='Lax')
+        return response
@@ -0,0 +1,144 @@
+# Generated by Django 4.2.30 on 2026-10-18 02:46
+
+from decimal import Decimal
+from django.conf import settings
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerQuotationRequest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('request_number', models.CharField(blank=True, max_length=50, null=True, unique=True)),
+                ('customer_name', models.CharField(max_length=200)),
+                ('customer_email', models.EmailField(max_length=254)),
+                ('customer_phone', models.CharField(blank=True, max_length=20)),
+                ('company_name', models.CharField(blank=True, max_length=200)),
+                ('project_description', models.TextField()),
+                ('quantity', models.PositiveIntegerField(default=1)),
+                ('created_date', models.DateTimeField(auto_now_add=True)),
+                ('updated_date', models.DateTimeField(auto_now=True)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('in_progress', 'In Progress'), ('quoted', 'Quoted'), ('approved', 'Approved'), ('rejected', 'Rejected')], default='pending', max_length=20)),
+            ],
+            options={
+                'ordering': ['-created_date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Hardware',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200)),
+                ('description', models.TextField(blank=True)),
+                ('category', models.CharField(max_length=100)),
+                ('manufacturer', models.CharField(blank=True, max_length=100)),
+                ('model_number', models.CharField(blank=True, max_length=100)),
+                ('unit_cost', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('currency', models.CharField(default='USD', max_length=3)),
+                ('supplier', models.CharField(blank=True, max_length=200)),
+                ('lead_time_days', models.PositiveIntegerField(default=0)),
+                ('minimum_order_quantity', models.PositiveIntegerField(default=1)),
+                ('power_consumption', models.CharField(blank=True, max_length=100)),
+                ('dimensions', models.CharField(blank=True, max_length=100)),
+                ('weight', models.CharField(blank=True, max_length=50)),
+                ('operating_temperature', models.CharField(blank=True, max_length=100)),
+                ('connectivity_options', models.TextField(blank=True)),
+                ('bluetooth_version', models.CharField(blank=True, max_length=50)),
+                ('created_date', models.DateTimeField(auto_now_add=True)),
+                ('updated_date', models.DateTimeField(auto_now=True)),
+                ('is_active', models.BooleanField(default=True)),
+            ],
+            options={
+                'ordering': ['category', 'name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PersonnelCostCategory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('description', models.TextField(blank=True)),
+                ('hourly_rate', models.DecimalField(decimal_places=2, max_digits=8)),
+                ('currency', models.CharField(default='USD', max_length=3)),
+                ('is_active', models.BooleanField(default=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Personnel Cost Categories',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Quotation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quotation_number', models.CharField(max_length=50, unique=True)),
+                ('created_date', models.DateTimeField(auto_now_add=True)),
+                ('updated_date', models.DateTimeField(auto_now=True)),
+                ('technical_approval', models.BooleanField(default=False)),
+                ('technical_approval_date', models.DateTimeField(blank=True, null=True)),
+                ('sales_approval', models.BooleanField(default=False)),
+                ('sales_approval_date', models.DateTimeField(blank=True, null=True)),
+                ('final_approval', models.BooleanField(default=False)),
+                ('final_approval_date', models.DateTimeField(blank=True, null=True)),
+                ('hardware_total', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('personnel_total', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('markup_percentage', models.DecimalField(decimal_places=2, default=0, max_digits=5)),
+                ('markup_amount', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('subtotal', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('tax_percentage', models.DecimalField(decimal_places=2, default=0, max_digits=5)),
+                ('tax_amount', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('total_amount', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('notes', models.TextField(blank=True)),
+                ('valid_until', models.DateField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='created_quotations', to=settings.AUTH_USER_MODEL)),
+                ('customer_request', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='quotations.customerquotationrequest')),
+                ('final_approved_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='final_approvals', to=settings.AUTH_USER_MODEL)),
+                ('sales_approved_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='sales_approvals', to=settings.AUTH_USER_MODEL)),
+                ('technical_approved_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='technical_approvals', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='QuotationPersonnelCost',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hours', models.DecimalField(decimal_places=2, max_digits=8, validators=[django.core.validators.MinValueValidator(Decimal('0.01'))])),
+                ('hourly_rate', models.DecimalField(decimal_places=2, max_digits=8)),
+                ('total_cost', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('description', models.TextField(blank=True)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='quotations.personnelcostcategory')),
+                ('quotation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='personnel_costs', to='quotations.quotation')),
+            ],
+            options={
+                'unique_together': {('quotation', 'category')},
+            },
+        ),
+        migrations.CreateModel(
+            name='QuotationHardware',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField(default=1)),
+                ('unit_cost', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('total_cost', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('notes', models.TextField(blank=True)),
+                ('hardware', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='quotations.hardware')),
+                ('quotation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='hardware_items', to='quotations.quotation')),
+            ],
+            options={
+                'unique_together': {('quotation', 'hardware')},
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 02:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quotations', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='hardware',
+            index=models.Index(fields=['model_number', 'manufacturer'], name='hardware_sku_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.30 on 2026-10-18 02:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quotations', '0003_dashboardcounter'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customerquotationrequest',
+            index=models.Index(fields=['created_date', 'id'], name='request_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='hardware',
+            index=models.Index(fields=['category', 'name', 'id'], name='hardware_catalog_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quotation',
+            index=models.Index(fields=['created_date', 'id'], name='quotation_created_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-18 02:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quotations', '0004_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customerquotationrequest',
+            index=models.Index(fields=['status', 'created_date', 'id'], name='request_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customerquotationrequest',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['created_date', 'id'], name='request_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='hardware',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['category', 'name', 'id'], name='hardware_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quotation',
+            index=models.Index(fields=['final_approval', 'created_date', 'id'], name='quotation_approval_idx'),
+        ),
+    ]
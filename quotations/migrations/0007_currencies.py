@@ -0,0 +1,65 @@
+# Generated by Django 4.2.30 on 2026-10-18 02:46
+
+from django.db import migrations, models
+
+
+def backfill_converted_totals(apps, schema_editor):
+    # Existing lines were priced in their quotation's currency, which is what
+    # a blank line currency means
+    for name in ('QuotationHardware', 'QuotationPersonnelCost'):
+        apps.get_model('quotations', name).objects.update(converted_total=models.F('total_cost'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quotations', '0006_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExchangeRate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_currency', models.CharField(max_length=3)),
+                ('to_currency', models.CharField(max_length=3)),
+                ('rate', models.DecimalField(decimal_places=8, max_digits=18)),
+                ('effective_date', models.DateField()),
+                ('source', models.CharField(blank=True, max_length=100)),
+                ('created_date', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['from_currency', 'to_currency', '-effective_date'],
+            },
+        ),
+        migrations.AddField(
+            model_name='quotation',
+            name='currency',
+            field=models.CharField(default='USD', max_length=3),
+        ),
+        migrations.AddField(
+            model_name='quotationhardware',
+            name='converted_total',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='quotationhardware',
+            name='currency',
+            field=models.CharField(blank=True, max_length=3),
+        ),
+        migrations.AddField(
+            model_name='quotationpersonnelcost',
+            name='converted_total',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='quotationpersonnelcost',
+            name='currency',
+            field=models.CharField(blank=True, max_length=3),
+        ),
+        migrations.AddConstraint(
+            model_name='exchangerate',
+            constraint=models.UniqueConstraint(fields=('from_currency', 'to_currency', 'effective_date'), name='exchange_rate_pair_date'),
+        ),
+        migrations.RunPython(backfill_converted_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.30 on 2026-10-18 02:46
+
+from django.db import migrations, models
+
+
+def backfill_approval_stages(apps, schema_editor):
+    # The first stage whose flag is not set, as Quotation.derive_approval_stage()
+    Quotation = apps.get_model('quotations', 'Quotation')
+    Quotation.objects.update(approval_stage=models.Case(
+        models.When(technical_approval=False, then=models.Value('technical')),
+        models.When(sales_approval=False, then=models.Value('sales')),
+        models.When(final_approval=False, then=models.Value('final')),
+        default=models.Value('approved'),
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quotations', '0007_currencies'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='quotation',
+            options={'ordering': ['-created_date'], 'permissions': [('approve_technical', 'Can give technical approval'), ('approve_sales', 'Can give sales approval'), ('approve_final', 'Can give final approval')]},
+        ),
+        migrations.AddField(
+            model_name='quotation',
+            name='approval_stage',
+            field=models.CharField(choices=[('technical', 'Awaiting technical approval'), ('sales', 'Awaiting sales approval'), ('final', 'Awaiting final approval'), ('approved', 'Approved')], default='technical', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='quotation',
+            index=models.Index(fields=['approval_stage', 'created_date', 'id'], name='quotation_stage_idx'),
+        ),
+        migrations.RunPython(backfill_approval_stages, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 4.2.30 on 2026-10-18 02:46
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quotations', '0008_approval_stage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PersonnelRateHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('currency', models.CharField(max_length=3)),
+                ('effective_from', models.DateTimeField(default=django.utils.timezone.now)),
+                ('source', models.CharField(blank=True, max_length=50)),
+                ('hourly_rate', models.DecimalField(decimal_places=2, max_digits=8)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rate_history', to='quotations.personnelcostcategory')),
+            ],
+            options={
+                'verbose_name_plural': 'Personnel rate history',
+                'ordering': ['category', '-effective_from'],
+                'indexes': [models.Index(fields=['category', 'effective_from'], name='personnel_rate_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='HardwarePriceHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('currency', models.CharField(max_length=3)),
+                ('effective_from', models.DateTimeField(default=django.utils.timezone.now)),
+                ('source', models.CharField(blank=True, max_length=50)),
+                ('unit_cost', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('hardware', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='price_history', to='quotations.hardware')),
+            ],
+            options={
+                'verbose_name_plural': 'Hardware price history',
+                'ordering': ['hardware', '-effective_from'],
+                'indexes': [models.Index(fields=['hardware', 'effective_from'], name='hardware_price_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,107 @@
+# Generated by Django 4.2.30 on 2026-10-18 02:46
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quotations', '0009_price_history'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyHardwareSpendRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('category', models.CharField(max_length=100)),
+                ('currency', models.CharField(max_length=3)),
+                ('lines', models.PositiveIntegerField(default=0)),
+                ('quantity', models.BigIntegerField(default=0)),
+                ('spend', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+            ],
+            options={
+                'ordering': ['day'],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyPersonnelRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('currency', models.CharField(max_length=3)),
+                ('lines', models.PositiveIntegerField(default=0)),
+                ('hours', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('cost', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+            ],
+            options={
+                'ordering': ['day'],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyQuotationRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('currency', models.CharField(max_length=3)),
+                ('quotations', models.PositiveIntegerField(default=0)),
+                ('approved', models.PositiveIntegerField(default=0)),
+                ('total_amount', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+            ],
+            options={
+                'ordering': ['day'],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyRequestRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('status', models.CharField(max_length=20)),
+                ('requests', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['day'],
+            },
+        ),
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('value', models.DateTimeField()),
+                ('updated_date', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='customerquotationrequest',
+            index=models.Index(fields=['updated_date'], name='request_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quotation',
+            index=models.Index(fields=['updated_date'], name='quotation_updated_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='dailyrequestrollup',
+            unique_together={('day', 'status')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='dailyquotationrollup',
+            unique_together={('day', 'currency')},
+        ),
+        migrations.AddField(
+            model_name='dailypersonnelrollup',
+            name='category',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='quotations.personnelcostcategory'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='dailyhardwarespendrollup',
+            unique_together={('day', 'category', 'currency')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='dailypersonnelrollup',
+            unique_together={('day', 'category', 'currency')},
+        ),
+    ]
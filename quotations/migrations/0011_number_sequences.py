@@ -0,0 +1,30 @@
+# Generated by Django 4.2.30 on 2026-10-18 02:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quotations', '0010_report_rollups'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='quotation',
+            name='quotation_number',
+            field=models.CharField(blank=True, max_length=50, unique=True),
+        ),
+        migrations.CreateModel(
+            name='NumberSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('prefix', models.CharField(max_length=20)),
+                ('year', models.PositiveIntegerField()),
+                ('next_value', models.PositiveBigIntegerField(default=1)),
+            ],
+            options={
+                'unique_together': {('prefix', 'year')},
+            },
+        ),
+    ]
@@ -1,10 +1,45 @@
-from django.db import models
+import re
+
+from django.db import models, router, transaction
 from django.contrib.auth.models import User
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
 from django.core.validators import MinValueValidator
+from django.utils import timezone
 from decimal import Decimal
 
+from .currency import MissingExchangeRate, convert_line_item, get_rate_table, line_item_rate, rate_date
+from .numbering import QUOTATION_SEQUENCE, REQUEST_SEQUENCE, next_number
+from .pricing import compute_totals, quantize
+
+
+class TrackedFieldsMixin:
+    """
+    Remembers the values of ``tracked_fields`` as last loaded from or saved to
+    the database, so post_save receivers can tell what a save changed.
+    Saves run in a transaction shared with those receivers.
+    """
+    tracked_fields = ()
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._remember_saved_state()
+        return instance
+    
+    def _remember_saved_state(self):
+        self._saved_state = {name: self.__dict__.get(name) for name in self.tracked_fields}
+    
+    def saved_value(self, name):
+        """Value of a tracked field as stored in the database (None if unknown)"""
+        return getattr(self, '_saved_state', {}).get(name)
+    
+    def save(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+        self._remember_saved_state()
+
 
-class CustomerQuotationRequest(models.Model):
+class CustomerQuotationRequest(TrackedFieldsMixin, models.Model):
     """Model for customer quotation requests"""
     request_number = models.CharField(max_length=50, unique=True, null=True, blank=True)
     customer_name = models.CharField(max_length=200)
@@ -27,14 +62,36 @@ class CustomerQuotationRequest(models.Model):
         default='pending'
     )
     
+    tracked_fields = ('status',)
+    
     class Meta:
         ordering = ['-created_date']
+        indexes = [
+            # Keyset pagination key for the request list
+            models.Index(fields=['created_date', 'id'], name='request_created_idx'),
+            # Status filter on the request list, newest first
+            models.Index(fields=['status', 'created_date', 'id'], name='request_status_idx'),
+            # Small partial index for the pending queue
+            models.Index(
+                fields=['created_date', 'id'], name='request_pending_idx',
+                condition=models.Q(status='pending')
+            ),
+            # Rows changed since the reporting rollups' watermark
+            models.Index(fields=['updated_date'], name='request_updated_idx'),
+        ]
+    
+    def save(self, *args, **kwargs):
+        # Allocated in the insert's transaction (see numbering.py)
+        with transaction.atomic(using=kwargs.get('using')):
+            if not self.request_number:
+                self.request_number = next_number(REQUEST_SEQUENCE)
+            super().save(*args, **kwargs)
     
     def __str__(self):
         return f"{self.customer_name} - {self.project_description[:50]}"
 
 
-class Hardware(models.Model):
+class Hardware(TrackedFieldsMixin, models.Model):
     """Model for hardware components"""
     name = models.CharField(max_length=200)
     description = models.TextField(blank=True)
@@ -59,14 +116,28 @@ class Hardware(models.Model):
     updated_date = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)
     
+    # Changes are appended to HardwarePriceHistory
+    tracked_fields = ('unit_cost', 'currency')
+    
     class Meta:
         ordering = ['category', 'name']
+        indexes = [
+            # Supplier catalog sync matches on (manufacturer, model_number)
+            models.Index(fields=['model_number', 'manufacturer'], name='hardware_sku_idx'),
+            # Keyset pagination key for the catalog list
+            models.Index(fields=['category', 'name', 'id'], name='hardware_catalog_idx'),
+            # The public catalog only ever lists active hardware
+            models.Index(
+                fields=['category', 'name', 'id'], name='hardware_active_idx',
+                condition=models.Q(is_active=True)
+            ),
+        ]
     
     def __str__(self):
         return f"{self.name} ({self.category})"
 
 
-class PersonnelCostCategory(models.Model):
+class PersonnelCostCategory(TrackedFieldsMixin, models.Model):
     """Model for personnel cost categories"""
     name = models.CharField(max_length=100, unique=True)
     description = models.TextField(blank=True)
@@ -74,6 +145,9 @@ class PersonnelCostCategory(models.Model):
     currency = models.CharField(max_length=3, default='USD')
     is_active = models.BooleanField(default=True)
     
+    # Changes are appended to PersonnelRateHistory
+    tracked_fields = ('hourly_rate', 'currency')
+    
     class Meta:
         verbose_name_plural = "Personnel Cost Categories"
         ordering = ['name']
@@ -82,9 +156,18 @@ class PersonnelCostCategory(models.Model):
         return f"{self.name} - {self.hourly_rate} {self.currency}/hr"
 
 
-class Quotation(models.Model):
+APPROVAL_STAGE_CHOICES = [
+    ('technical', 'Awaiting technical approval'),
+    ('sales', 'Awaiting sales approval'),
+    ('final', 'Awaiting final approval'),
+    ('approved', 'Approved'),
+]
+
+
+class Quotation(TrackedFieldsMixin, models.Model):
     """Model for quotations"""
-    quotation_number = models.CharField(max_length=50, unique=True)
+    # Allocated from the quotation number sequence when left blank
+    quotation_number = models.CharField(max_length=50, unique=True, blank=True)
     customer_request = models.ForeignKey(CustomerQuotationRequest, on_delete=models.CASCADE)
     created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='created_quotations')
     created_date = models.DateTimeField(auto_now_add=True)
@@ -111,8 +194,11 @@ class Quotation(models.Model):
         related_name='final_approvals'
     )
     final_approval_date = models.DateTimeField(null=True, blank=True)
+    # Stage awaiting approval, kept in step with the flags above (see workflow.py)
+    approval_stage = models.CharField(max_length=20, choices=APPROVAL_STAGE_CHOICES, default='technical')
     
-    # Pricing
+    # Pricing, in ``currency``; line items are converted into it
+    currency = models.CharField(max_length=3, default='USD')
     hardware_total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     personnel_total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     markup_percentage = models.DecimalField(max_digits=5, decimal_places=2, default=0)
@@ -125,15 +211,134 @@ class Quotation(models.Model):
     notes = models.TextField(blank=True)
     valid_until = models.DateField(null=True, blank=True)
     
+    tracked_fields = ('final_approval', 'currency')
+    
     class Meta:
         ordering = ['-created_date']
+        indexes = [
+            # Keyset pagination key for the quotation list
+            models.Index(fields=['created_date', 'id'], name='quotation_created_idx'),
+            # Approval filter on the quotation list, newest first
+            models.Index(fields=['final_approval', 'created_date', 'id'], name='quotation_approval_idx'),
+            # Per-stage approval queues, oldest first
+            models.Index(fields=['approval_stage', 'created_date', 'id'], name='quotation_stage_idx'),
+            # Rows changed since the reporting rollups' watermark
+            models.Index(fields=['updated_date'], name='quotation_updated_idx'),
+        ]
+        permissions = [
+            ('approve_technical', 'Can give technical approval'),
+            ('approve_sales', 'Can give sales approval'),
+            ('approve_final', 'Can give final approval'),
+        ]
+    
+    def calculate_totals(self):
+        """Derive markup, subtotal, tax and total from the stored line totals"""
+        totals = compute_totals(
+            self.hardware_total, self.personnel_total,
+            self.markup_percentage, self.tax_percentage
+        )
+        for field, value in totals.items():
+            setattr(self, field, value)
+    
+    def derive_approval_stage(self):
+        """First stage whose flag is not set yet"""
+        for stage, _ in APPROVAL_STAGE_CHOICES[:-1]:
+            if not getattr(self, f'{stage}_approval'):
+                return stage
+        return 'approved'
+    
+    def clean(self):
+        super().clean()
+        if not re.fullmatch(r'[A-Z]{3}', self.currency or ''):
+            raise ValidationError({'currency': 'Enter a three-letter currency code, such as USD.'})
+        if self.pk is None or self.saved_value('currency') == self.currency:
+            return
+        # Switching currency converts every line item; each needs a rate
+        date = rate_date(self.created_date)
+        table = get_rate_table()
+        for line_currency in sorted(self._line_currencies() - {self.currency}):
+            try:
+                table.rate(line_currency, self.currency, date)
+            except MissingExchangeRate as exc:
+                raise ValidationError({'currency': str(exc)})
+    
+    def _line_currencies(self):
+        currencies = set()
+        for items in (self.hardware_items, self.personnel_costs):
+            currencies.update(items.order_by().values_list('currency', flat=True).distinct())
+        # Blank lines are in the quotation's currency
+        return currencies - {''}
+    
+    def _refresh_line_totals(self, using):
+        """Reload the line totals the line-item signals maintain, locking the row"""
+        stored = (
+            type(self).objects.using(using).select_for_update()
+            .filter(pk=self.pk).values('hardware_total', 'personnel_total').first()
+        )
+        if stored:
+            self.hardware_total = stored['hardware_total']
+            self.personnel_total = stored['personnel_total']
+    
+    def save(self, *args, **kwargs):
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        self.approval_stage = self.derive_approval_stage()
+        with transaction.atomic(using=using):
+            if not self._state.adding and self.pk is not None:
+                # A stale instance must not write back the totals it loaded
+                self._refresh_line_totals(using)
+            self.calculate_totals()
+            if not self.quotation_number:
+                self.quotation_number = next_number(QUOTATION_SEQUENCE)
+            super().save(*args, **kwargs)
     
     def __str__(self):
         return f"Quote {self.quotation_number} - {self.customer_request.customer_name}"
 
 
-class QuotationHardware(models.Model):
+class QuotationLineItem(TrackedFieldsMixin, models.Model):
+    """Abstract base for line items that keep their quotation's totals current"""
+    # Currency of unit price and total_cost; converted_total is in the quotation's currency
+    currency = models.CharField(max_length=3, blank=True)
+    converted_total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    
+    # Quotation field that accumulates this line type's converted_total
+    quotation_total_field = None
+    tracked_fields = ('quotation_id', 'converted_total')
+    
+    class Meta:
+        abstract = True
+    
+    def calculate_total_cost(self):
+        raise NotImplementedError
+    
+    def source_currency(self):
+        """Currency of the priced item (hardware or personnel category)"""
+        raise NotImplementedError
+    
+    def clean(self):
+        super().clean()
+        try:
+            if not self.currency:
+                self.currency = self.source_currency()
+            line_item_rate(self)
+        except ObjectDoesNotExist:
+            # Missing quotation or priced item; reported by field validation
+            pass
+        except MissingExchangeRate as exc:
+            raise ValidationError(str(exc))
+    
+    def save(self, *args, **kwargs):
+        self.total_cost = quantize(self.calculate_total_cost())
+        if not self.currency:
+            self.currency = self.source_currency()
+        self.converted_total = convert_line_item(self)
+        super().save(*args, **kwargs)
+
+
+class QuotationHardware(QuotationLineItem):
     """Model for hardware items in a quotation"""
+    quotation_total_field = 'hardware_total'
+    
     quotation = models.ForeignKey(Quotation, on_delete=models.CASCADE, related_name='hardware_items')
     hardware = models.ForeignKey(Hardware, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(default=1)
@@ -144,16 +349,20 @@ class QuotationHardware(models.Model):
     class Meta:
         unique_together = ['quotation', 'hardware']
     
-    def save(self, *args, **kwargs):
-        self.total_cost = self.unit_cost * self.quantity
-        super().save(*args, **kwargs)
+    def source_currency(self):
+        return self.hardware.currency
+    
+    def calculate_total_cost(self):
+        return self.unit_cost * self.quantity
     
     def __str__(self):
         return f"{self.hardware.name} x {self.quantity}"
 
 
-class QuotationPersonnelCost(models.Model):
+class QuotationPersonnelCost(QuotationLineItem):
     """Model for personnel costs in a quotation"""
+    quotation_total_field = 'personnel_total'
+    
     quotation = models.ForeignKey(Quotation, on_delete=models.CASCADE, related_name='personnel_costs')
     category = models.ForeignKey(PersonnelCostCategory, on_delete=models.CASCADE)
     hours = models.DecimalField(max_digits=8, decimal_places=2, validators=[MinValueValidator(Decimal('0.01'))])
@@ -164,9 +373,252 @@ class QuotationPersonnelCost(models.Model):
     class Meta:
         unique_together = ['quotation', 'category']
     
+    def source_currency(self):
+        return self.category.currency
+    
+    def calculate_total_cost(self):
+        return self.hours * self.hourly_rate
+    
+    def __str__(self):
+        return f"{self.category.name} - {self.hours} hrs"
+
+
+class ExchangeRate(models.Model):
+    """Units of to_currency per unit of from_currency, from effective_date on"""
+    from_currency = models.CharField(max_length=3)
+    to_currency = models.CharField(max_length=3)
+    rate = models.DecimalField(max_digits=18, decimal_places=8)
+    effective_date = models.DateField()
+    source = models.CharField(max_length=100, blank=True)
+    created_date = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['from_currency', 'to_currency', '-effective_date']
+        constraints = [
+            # Also the index for as-of lookups by pair and date
+            models.UniqueConstraint(
+                fields=['from_currency', 'to_currency', 'effective_date'], name='exchange_rate_pair_date'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.from_currency}/{self.to_currency} {self.rate} from {self.effective_date}"
+
+
+class PriceHistoryEntry(models.Model):
+    """Abstract base for append-only catalog price records"""
+    currency = models.CharField(max_length=3)
+    # The price applies from this moment until the item's next entry
+    effective_from = models.DateTimeField(default=timezone.now)
+    source = models.CharField(max_length=50, blank=True)
+    
+    class Meta:
+        abstract = True
+    
     def save(self, *args, **kwargs):
-        self.total_cost = self.hours * self.hourly_rate
+        if not self._state.adding:
+            raise ValueError('Price history is append-only')
         super().save(*args, **kwargs)
     
+    def delete(self, *args, **kwargs):
+        raise ValueError('Price history is append-only')
+
+
+class HardwarePriceHistory(PriceHistoryEntry):
+    """Hardware unit cost from effective_from on"""
+    hardware = models.ForeignKey(Hardware, on_delete=models.CASCADE, related_name='price_history')
+    unit_cost = models.DecimalField(max_digits=10, decimal_places=2)
+    
+    class Meta:
+        verbose_name_plural = 'Hardware price history'
+        ordering = ['hardware', '-effective_from']
+        indexes = [
+            # As-of lookups: latest entry of an item on or before a date
+            models.Index(fields=['hardware', 'effective_from'], name='hardware_price_idx'),
+        ]
+    
     def __str__(self):
-        return f"{self.category.name} - {self.hours} hrs"
+        return f"{self.hardware_id}: {self.unit_cost} {self.currency} from {self.effective_from:%Y-%m-%d}"
+
+
+class PersonnelRateHistory(PriceHistoryEntry):
+    """Personnel hourly rate from effective_from on"""
+    category = models.ForeignKey(PersonnelCostCategory, on_delete=models.CASCADE, related_name='rate_history')
+    hourly_rate = models.DecimalField(max_digits=8, decimal_places=2)
+    
+    class Meta:
+        verbose_name_plural = 'Personnel rate history'
+        ordering = ['category', '-effective_from']
+        indexes = [
+            models.Index(fields=['category', 'effective_from'], name='personnel_rate_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.category_id}: {self.hourly_rate} {self.currency}/hr from {self.effective_from:%Y-%m-%d}"
+
+
+class DashboardCounter(models.Model):
+    """Denormalized row counts shown on the dashboard"""
+    name = models.CharField(max_length=50, unique=True)
+    value = models.BigIntegerField(default=0)
+    updated_date = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['name']
+    
+    def __str__(self):
+        return f"{self.name} = {self.value}"
+
+
+class DailyRequestRollup(models.Model):
+    """Customer requests created per day, by current status (see rollups.py)"""
+    day = models.DateField()
+    status = models.CharField(max_length=20)
+    requests = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        ordering = ['day']
+        unique_together = ['day', 'status']
+    
+    def __str__(self):
+        return f"{self.day} {self.status}: {self.requests}"
+
+
+class DailyQuotationRollup(models.Model):
+    """Quotations created per day and currency"""
+    day = models.DateField()
+    currency = models.CharField(max_length=3)
+    quotations = models.PositiveIntegerField(default=0)
+    approved = models.PositiveIntegerField(default=0)
+    total_amount = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    
+    class Meta:
+        ordering = ['day']
+        unique_together = ['day', 'currency']
+    
+    def __str__(self):
+        return f"{self.day} {self.currency}: {self.quotations}"
+
+
+class DailyHardwareSpendRollup(models.Model):
+    """Hardware lines of the quotations created per day, by category and quotation currency"""
+    day = models.DateField()
+    category = models.CharField(max_length=100)
+    currency = models.CharField(max_length=3)
+    lines = models.PositiveIntegerField(default=0)
+    quantity = models.BigIntegerField(default=0)
+    spend = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    
+    class Meta:
+        ordering = ['day']
+        unique_together = ['day', 'category', 'currency']
+    
+    def __str__(self):
+        return f"{self.day} {self.category}: {self.spend} {self.currency}"
+
+
+class DailyPersonnelRollup(models.Model):
+    """Personnel lines of the quotations created per day, by category and quotation currency"""
+    day = models.DateField()
+    category = models.ForeignKey(PersonnelCostCategory, on_delete=models.CASCADE)
+    currency = models.CharField(max_length=3)
+    lines = models.PositiveIntegerField(default=0)
+    hours = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    cost = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    
+    class Meta:
+        ordering = ['day']
+        unique_together = ['day', 'category', 'currency']
+    
+    def __str__(self):
+        return f"{self.day} {self.category_id}: {self.hours} hrs"
+
+
+class NumberSequence(models.Model):
+    """Next unreserved value of a quotation or request number sequence (see numbering.py)"""
+    prefix = models.CharField(max_length=20)
+    year = models.PositiveIntegerField()
+    next_value = models.PositiveBigIntegerField(default=1)
+    
+    class Meta:
+        unique_together = ['prefix', 'year']
+    
+    def __str__(self):
+        return f"{self.prefix}-{self.year}: next {self.next_value}"
+
+
+class RollupWatermark(models.Model):
+    """Fact-table changes up to ``value`` are reflected in the rollups"""
+    name = models.CharField(max_length=50, unique=True)
+    value = models.DateTimeField()
+    updated_date = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.name} @ {self.value:%Y-%m-%d %H:%M:%S}"
+
+
+class Job(models.Model):
+    """Background job claimed and run by ``manage.py run_workers``"""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    ]
+    
+    task = models.CharField(max_length=100)
+    kwargs = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    # Enqueueing twice with the same key returns the first job
+    idempotency_key = models.CharField(max_length=200, unique=True, null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_after = models.DateTimeField()
+    
+    # Lease held by the worker running the job; expired leases are requeued
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    
+    progress_current = models.PositiveIntegerField(default=0)
+    progress_total = models.PositiveIntegerField(null=True, blank=True)
+    progress_message = models.CharField(max_length=200, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='jobs')
+    created_date = models.DateTimeField(auto_now_add=True)
+    updated_date = models.DateTimeField(auto_now=True)
+    started_date = models.DateTimeField(null=True, blank=True)
+    finished_date = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-created_date']
+        indexes = [
+            # Claim query: next due job in the queue
+            models.Index(fields=['status', 'run_after', 'id'], name='job_claim_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Job {self.pk} {self.task} ({self.status})"
+    
+    def as_dict(self, include_result=True):
+        data = {
+            'id': self.pk,
+            'task': self.task,
+            'status': self.status,
+            'attempts': self.attempts,
+            'max_attempts': self.max_attempts,
+            'progress': {
+                'current': self.progress_current,
+                'total': self.progress_total,
+                'message': self.progress_message,
+            },
+            'created_date': self.created_date.isoformat() if self.created_date else None,
+            'started_date': self.started_date.isoformat() if self.started_date else None,
+            'finished_date': self.finished_date.isoformat() if self.finished_date else None,
+            'run_after': self.run_after.isoformat() if self.run_after else None,
+        }
+        if include_result:
+            data['result'] = self.result
+            data['error'] = self.error
+        return data
@@ -0,0 +1,142 @@
+"""
+Quotation and request numbers from per-prefix sequences.
+
+Numbers look like ``Q-2026-000123``: a prefix, the year and a sequence that
+restarts every year. Each (prefix, year) pair has a ``NumberSequence`` row
+holding the next value nobody has reserved yet.
+
+A process reserves a block of ``NUMBER_BLOCK_SIZE`` values with one
+conditional UPDATE of that row (``next_value = next_value + size``), then
+hands the block out from memory, so most inserts never touch the sequence
+row. Blocks never overlap, so numbers never collide across processes or
+threads. The trade-offs of a block:
+
+* numbers are unique but interleave between workers, so a later quote may
+  carry a lower number;
+* the unused rest of a block is lost when its process exits, and a number
+  taken by a save that then rolls back is not reused, leaving gaps.
+
+``NUMBER_BLOCK_SIZE = 1`` gives a gapless sequence instead. Every number is
+then reserved in the inserting transaction, which holds the sequence row
+lock until it commits; a rollback gives the number back.
+
+A reservation made inside a transaction only becomes usable by other saves
+once that transaction commits; if it rolls back, the block is discarded
+together with the UPDATE that reserved it.
+"""
+import os
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.db import IntegrityError, router, transaction
+from django.db.models import F
+from django.utils import timezone
+
+QUOTATION_SEQUENCE = 'quotation'
+REQUEST_SEQUENCE = 'request'
+DEFAULT_BLOCK_SIZE = 20
+
+# Sequence name -> (model label, number field, settings name of the prefix, default prefix)
+SEQUENCES = {
+    QUOTATION_SEQUENCE: ('quotations.Quotation', 'quotation_number', 'QUOTATION_NUMBER_PREFIX', 'Q'),
+    REQUEST_SEQUENCE: ('quotations.CustomerQuotationRequest', 'request_number', 'REQUEST_NUMBER_PREFIX', 'REQ'),
+}
+
+# (database, prefix, year) -> deque of reserved, unused values
+_blocks = {}
+_lock = threading.Lock()
+
+
+def _reset_after_fork():
+    # A forked worker must not hand out its parent's numbers again
+    global _lock
+    _lock = threading.Lock()
+    _blocks.clear()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def block_size():
+    return max(1, getattr(settings, 'NUMBER_BLOCK_SIZE', DEFAULT_BLOCK_SIZE))
+
+
+def sequence_prefix(sequence):
+    _, _, setting, default = SEQUENCES[sequence]
+    return getattr(settings, setting, default)
+
+
+def format_number(prefix, year, value):
+    return f'{prefix}-{year}-{value:06d}'
+
+
+def _highest_issued(sequence, prefix, year, using):
+    """Largest value already stored under ``prefix``/``year`` (typed in by hand or imported)"""
+    from django.apps import apps
+
+    label, field, _, _ = SEQUENCES[sequence]
+    start = f'{prefix}-{year}-'
+    highest = 0
+    values = (
+        apps.get_model(label)._default_manager.using(using)
+        .filter(**{f'{field}__startswith': start}).values_list(field, flat=True)
+    )
+    for number in values.iterator():
+        suffix = number[len(start):]
+        if suffix.isdigit():
+            highest = max(highest, int(suffix))
+    return highest
+
+
+def _reserve(sequence, prefix, year, count, using):
+    """First of ``count`` consecutive values taken from the sequence row"""
+    from .models import NumberSequence
+
+    rows = NumberSequence.objects.using(using).filter(prefix=prefix, year=year)
+    with transaction.atomic(using=using):
+        # The UPDATE takes the row (or, on SQLite, database) write lock first,
+        # so the value read back is ours alone
+        if not rows.update(next_value=F('next_value') + count):
+            first = _highest_issued(sequence, prefix, year, using) + 1
+            try:
+                with transaction.atomic(using=using):
+                    NumberSequence.objects.using(using).create(prefix=prefix, year=year, next_value=first + count)
+                return first
+            except IntegrityError:
+                # Another worker created the row first
+                rows.update(next_value=F('next_value') + count)
+        return rows.values_list('next_value', flat=True).get() - count
+
+
+def next_numbers(sequence, count):
+    """``count`` new formatted numbers of ``sequence`` (see the module docstring)"""
+    from .models import NumberSequence
+
+    using = router.db_for_write(NumberSequence)
+    prefix = sequence_prefix(sequence)
+    year = timezone.localdate().year
+    key = (using, prefix, year)
+    values = []
+    with _lock:
+        block = _blocks.get(key)
+        while block and len(values) < count:
+            values.append(block.popleft())
+    missing = count - len(values)
+    if missing:
+        size = block_size()
+        reserve = missing if size == 1 else max(size, missing)
+        first = _reserve(sequence, prefix, year, reserve, using)
+        values.extend(range(first, first + missing))
+        rest = range(first + missing, first + reserve)
+        if rest:
+            def release():
+                with _lock:
+                    _blocks.setdefault(key, deque()).extend(rest)
+            transaction.on_commit(release, using=using)
+    return [format_number(prefix, year, value) for value in values]
+
+
+def next_number(sequence):
+    """One new formatted number of ``sequence``"""
+    return next_numbers(sequence, 1)[0]
@@ -0,0 +1,153 @@
+"""
+Catalog page and fragment caching keyed by a catalog version.
+
+Every ``Hardware`` save or delete (and every bulk catalog sync) replaces the
+catalog version token kept in the default cache once its transaction
+commits. Rendered catalog pages and fragments are stored under keys that
+include the version, so a change makes every older entry unreachable at
+once. Entries also expire after ``CATALOG_CACHE_TIMEOUT`` seconds, which
+bounds how long unreachable entries occupy the cache and, with the
+per-process locmem backend (where other workers cannot see a new version),
+how stale a page can get; a shared cache is configured in
+``quotation_system/caches.py``.
+
+Whatever is stored is read from the primary database, even inside
+``@use_replica`` views: a replica lagging behind the version bump would
+otherwise cache old data under the new version.
+
+``cache_catalog_page`` serves anonymous GET/HEAD requests from the cache and
+answers conditional requests. Pages are keyed by the view's URL arguments
+and the query parameters the view reads, so reordered or unrelated
+parameters share an entry. Its ETag comes from the rendered page and its
+Last-Modified from ``Hardware.updated_date``. Signed-in users, and visitors
+with pending flash messages, get a freshly rendered page.
+"""
+import functools
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+from .routers import primary_reads
+
+VERSION_CACHE_KEY = 'quotations:catalog:version'
+DEFAULT_TIMEOUT = 3600
+_MISSING = object()
+
+
+def _timeout():
+    return getattr(settings, 'CATALOG_CACHE_TIMEOUT', DEFAULT_TIMEOUT)
+
+
+def catalog_version():
+    """Shared catalog version token; created on first use"""
+    version = cache.get(VERSION_CACHE_KEY)
+    if version is None:
+        version = uuid.uuid4().hex
+        cache.add(VERSION_CACHE_KEY, version, timeout=None)
+        version = cache.get(VERSION_CACHE_KEY, version)
+    return version
+
+
+def bump_catalog_version(**kwargs):
+    """Make every cached catalog page and fragment stale (call after the change commits)"""
+    cache.set(VERSION_CACHE_KEY, uuid.uuid4().hex, timeout=None)
+
+
+def cached_fragment(name, build, *parts):
+    """``build()``'s value, cached per catalog version under ``name`` and ``parts``"""
+    key = ':'.join(['quotations:catalog', catalog_version(), name, *map(str, parts)])
+    value = cache.get(key, _MISSING)
+    if value is _MISSING:
+        with primary_reads():
+            value = build()
+        cache.set(key, value, timeout=_timeout())
+    return value
+
+
+def catalog_categories():
+    """Sorted distinct hardware categories for the catalog filter"""
+    from .models import Hardware
+
+    return cached_fragment('categories', lambda: sorted(
+        Hardware.objects.order_by().values_list('category', flat=True).distinct()
+    ))
+
+
+def catalog_last_modified():
+    """Latest ``Hardware.updated_date``, cached per catalog version"""
+    from django.db.models import Max
+
+    from .models import Hardware
+
+    return cached_fragment('last-modified', lambda: Hardware.objects.aggregate(latest=Max('updated_date'))['latest'])
+
+
+def _cacheable(request):
+    return (
+        request.method in ('GET', 'HEAD')
+        and not request.user.is_authenticated
+        # len() peeks without marking the messages as shown
+        and not len(get_messages(request))
+    )
+
+
+def _conditional(request, entry):
+    response = HttpResponse(entry['content'], content_type=entry['content_type'])
+    last_modified = int(entry['last_modified'].timestamp()) if entry['last_modified'] else None
+    response['ETag'] = entry['etag']
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified)
+    # Browsers and proxies revalidate every time; the ETag makes that cheap
+    patch_cache_control(response, no_cache=True)
+    patch_vary_headers(response, ['Cookie'])
+    return get_conditional_response(request, etag=entry['etag'], last_modified=last_modified, response=response)
+
+
+def _page_key(view, request, params, args, kwargs):
+    parts = [*map(str, args), *(f'{name}={value}' for name, value in sorted(kwargs.items()))]
+    # A parameter's presence can matter (``page``), so present-but-empty is kept
+    parts += [f'{name}={request.GET.get(name)}' for name in sorted(params) if name in request.GET]
+    digest = hashlib.md5('&'.join(parts).encode()).hexdigest()
+    return f'quotations:catalog:{catalog_version()}:page:{view.__name__}:{digest}'
+
+
+def cache_catalog_page(last_modified, params=()):
+    """
+    Cache a catalog view's anonymous responses per catalog version.
+    ``last_modified(request, *args, **kwargs)`` returns the page's
+    Last-Modified datetime; it only runs when the page is rendered.
+    ``params`` names the query parameters the view reads; others are
+    left out of the cache key.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not _cacheable(request):
+                return view(request, *args, **kwargs)
+            key = _page_key(view, request, params, args, kwargs)
+            entry = cache.get(key)
+            if entry is None:
+                with primary_reads():
+                    response = view(request, *args, **kwargs)
+                    # A page carrying a CSRF token is per visitor
+                    if (
+                        response.status_code != 200 or response.streaming
+                        or request.META.get('CSRF_COOKIE_NEEDS_UPDATE')
+                    ):
+                        return response
+                    entry = {
+                        'content': response.content,
+                        'content_type': response['Content-Type'],
+                        'etag': f'"{hashlib.md5(response.content).hexdigest()}"',
+                        'last_modified': last_modified(request, *args, **kwargs),
+                    }
+                cache.set(key, entry, timeout=_timeout())
+            return _conditional(request, entry)
+        return wrapper
+    return decorator
@@ -0,0 +1,224 @@
+"""
+Keyset (cursor) pagination.
+
+Instead of ``COUNT(*)`` plus ``OFFSET``, each page seeks past the ordering key
+of the last row it returned, so page 5,000 costs the same index range scan
+as page 1. Cursors are opaque URL-safe tokens carrying the key values and
+the direction of travel.
+
+Orderings without a stable key (relevance-ranked searches) use numbered
+pages from ``OffsetPaginator``, which skips the ``COUNT(*)`` as well.
+"""
+import base64
+import datetime
+import decimal
+import json
+
+from django.db.models import Q
+
+# Orderings used by the list views; they match each model's Meta.ordering
+# with the primary key appended as a tie-breaker.
+REQUEST_ORDERING = ('-created_date', '-id')
+QUOTATION_ORDERING = ('-created_date', '-id')
+HARDWARE_ORDERING = ('category', 'name', 'id')
+# Approval queues are worked oldest first
+APPROVAL_QUEUE_ORDERING = ('created_date', 'id')
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _encode_value(value):
+    # Full precision: DjangoJSONEncoder would drop microseconds from datetimes
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    return value
+
+
+def encode_cursor(values, direction='next'):
+    payload = json.dumps(
+        {'d': direction, 'k': [_encode_value(value) for value in values]},
+        separators=(',', ':')
+    )
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return ``(values, direction)`` from a cursor token"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        direction, values = payload['d'], payload['k']
+    except (ValueError, KeyError, TypeError):
+        raise InvalidCursor(cursor)
+    if direction not in ('next', 'prev') or not isinstance(values, list):
+        raise InvalidCursor(cursor)
+    return values, direction
+
+
+class KeysetPage:
+    """One page of results, mirroring the parts of Django's Page API templates use"""
+
+    def __init__(self, object_list, has_next, has_previous, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self._has_next = has_next
+        self._has_previous = has_previous
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+
+class OffsetPage(KeysetPage):
+    """A numbered page; there is no page count, as no ``COUNT(*)`` was run"""
+
+    def __init__(self, object_list, number, has_next):
+        super().__init__(object_list, has_next, number > 1, None, None)
+        self.number = number
+
+    def next_page_number(self):
+        return self.number + 1
+
+    def previous_page_number(self):
+        return self.number - 1
+
+
+class OffsetPaginator:
+    """Numbered pages of ``queryset``, fetching one extra row to detect more"""
+
+    def __init__(self, queryset, per_page):
+        self.queryset = queryset
+        self.per_page = per_page
+
+    def get_page(self, number=None):
+        """Page ``number`` (1-based); an invalid number yields the first page"""
+        try:
+            number = max(1, int(number))
+        except (TypeError, ValueError):
+            number = 1
+        start = (number - 1) * self.per_page
+        rows = list(self.queryset[start:start + self.per_page + 1])
+        return OffsetPage(rows[:self.per_page], number, len(rows) > self.per_page)
+
+
+class KeysetPaginator:
+    """
+    Paginate ``queryset`` by ``ordering`` (field names, ``-`` for descending).
+    The last field must be unique, e.g. the primary key.
+    """
+
+    def __init__(self, queryset, per_page, ordering):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = tuple(ordering)
+        self.fields = [
+            (name.lstrip('-'), name.startswith('-')) for name in self.ordering
+        ]
+
+    def _key(self, row):
+        if isinstance(row, dict):
+            return [row[name] for name, _ in self.fields]
+        return [getattr(row, name) for name, _ in self.fields]
+
+    def _to_python(self, values):
+        if len(values) != len(self.fields):
+            raise InvalidCursor(values)
+        model = self.queryset.model
+        try:
+            return [
+                model._meta.get_field(name).to_python(value)
+                for (name, _), value in zip(self.fields, values)
+            ]
+        except Exception:
+            raise InvalidCursor(values)
+
+    def _seek(self, values, forward):
+        """
+        Rows strictly after ``values`` in the travel direction. Written as
+        ``k1 <= v1 AND (k1 < v1 OR (k1 = v1 AND ...))`` so the leading key
+        bounds an index range scan.
+        """
+        condition = Q()
+        for position in reversed(range(len(self.fields))):
+            name, descending = self.fields[position]
+            after = 'lt' if descending == forward else 'gt'
+            step = Q(**{f'{name}__{after}': values[position]})
+            if position < len(self.fields) - 1:
+                step |= Q(**{name: values[position]}) & condition
+            condition = step
+        name, descending = self.fields[0]
+        bound = 'lte' if descending == forward else 'gte'
+        return Q(**{f'{name}__{bound}': values[0]}) & condition
+
+    def _decode(self, cursor):
+        if not cursor:
+            return None, True
+        values, direction = decode_cursor(cursor)
+        return self._to_python(values), direction == 'next'
+
+    def page_queryset(self, cursor=None):
+        """The query that fetches a page (one extra row to detect more)"""
+        values, forward = self._decode(cursor)
+        queryset = self.queryset
+        if values is not None:
+            queryset = queryset.filter(self._seek(values, forward))
+        ordering = self.ordering if forward else tuple(
+            name[1:] if name.startswith('-') else f'-{name}' for name in self.ordering
+        )
+        return queryset.order_by(*ordering)[:self.per_page + 1]
+
+    def page(self, cursor=None):
+        values, forward = self._decode(cursor)
+        return self._build_page(list(self.page_queryset(cursor)), values, forward)
+
+    async def apage(self, cursor=None):
+        """page() for async views, fetching with async iteration"""
+        values, forward = self._decode(cursor)
+        return self._build_page([row async for row in self.page_queryset(cursor)], values, forward)
+
+    def _build_page(self, rows, values, forward):
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if not forward:
+            rows.reverse()
+
+        if forward:
+            has_next, has_previous = has_more, values is not None
+        else:
+            has_next, has_previous = True, has_more
+
+        next_cursor = encode_cursor(self._key(rows[-1]), 'next') if rows and has_next else None
+        previous_cursor = encode_cursor(self._key(rows[0]), 'prev') if rows and has_previous else None
+        return KeysetPage(rows, has_next, has_previous, next_cursor, previous_cursor)
+
+    def get_page(self, cursor=None):
+        """Like page(), but an invalid cursor yields the first page"""
+        try:
+            return self.page(cursor)
+        except InvalidCursor:
+            return self.page(None)
+
+    async def aget_page(self, cursor=None):
+        try:
+            return await self.apage(cursor)
+        except InvalidCursor:
+            return await self.apage(None)
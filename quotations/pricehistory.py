@@ -0,0 +1,294 @@
+"""
+Catalog price history and point-in-time repricing.
+
+Every change to ``Hardware.unit_cost``/``currency`` or
+``PersonnelCostCategory.hourly_rate``/``currency`` appends a row to
+``HardwarePriceHistory`` or ``PersonnelRateHistory``: single saves through
+the post_save receivers in ``signals.py``, bulk catalog syncs through
+``record_prices``. Rows are never updated or deleted; the price in force at
+a moment is the item's latest entry whose ``effective_from`` is not after
+it, found through the (item, effective_from) index.
+
+``reprice_quotations`` recomputes quotations against the prices in force
+on any date (now by default). Each batch of quotations costs one query per
+table (the quotations, and each line-item table with the as-of price and
+currency looked up in correlated subqueries), whatever the number of lines.
+The result lists the change in total for every quotation. With
+``apply=True`` the lines take the as-of prices and the totals are rebuilt.
+"""
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timezone as dt_timezone
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery
+from django.utils import timezone
+
+from .currency import MissingExchangeRate, get_rate_table, rate_date
+from .pricing import _iter_id_chunks, compute_totals, quantize, recalculate_quotations
+
+# Personnel categories have no creation date; their first recorded rate is
+# taken to apply from here on
+HISTORY_EPOCH = datetime(2000, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def _history_models():
+    from .models import Hardware, HardwarePriceHistory, PersonnelCostCategory, PersonnelRateHistory
+
+    # priced model -> (history model, foreign key, price field)
+    return {
+        Hardware: (HardwarePriceHistory, 'hardware', 'unit_cost'),
+        PersonnelCostCategory: (PersonnelRateHistory, 'category', 'hourly_rate'),
+    }
+
+
+def _entry(instance, source, effective_from):
+    history, key, price_field = _history_models()[type(instance)]
+    return history(**{
+        key: instance,
+        price_field: getattr(instance, price_field),
+        'currency': instance.currency,
+        'source': source,
+        'effective_from': effective_from,
+    })
+
+
+def record_prices(instances, source='', effective_from=None):
+    """Append the current price of each of ``instances`` (one model) in one INSERT"""
+    instances = list(instances)
+    if not instances:
+        return 0
+    effective_from = effective_from or timezone.now()
+    history = _history_models()[type(instances[0])][0]
+    history.objects.bulk_create([_entry(instance, source, effective_from) for instance in instances])
+    return len(instances)
+
+
+def price_changed(instance):
+    """True unless the instance's price fields match their saved values"""
+    return any(
+        instance.saved_value(name) is None or instance.saved_value(name) != getattr(instance, name)
+        for name in instance.tracked_fields
+    )
+
+
+def record_saved(instance, created):
+    """post_save hook: append a history row for a new item or a price change"""
+    if created or price_changed(instance):
+        record_prices([instance], source='created' if created else 'edit')
+
+
+def backfill_price_history(batch_size=1000, **kwargs):
+    """
+    Give every item without history an initial entry holding its current
+    price (post_migrate receiver; a no-op once every item has one).
+    """
+    for model, (history, key, _) in _history_models().items():
+        missing = model.objects.exclude(pk__in=history.objects.values(key))
+        batch = []
+        for instance in missing.order_by('pk').iterator(chunk_size=batch_size):
+            batch.append(_entry(instance, 'initial', getattr(instance, 'created_date', HISTORY_EPOCH)))
+            if len(batch) >= batch_size:
+                history.objects.bulk_create(batch)
+                batch = []
+        history.objects.bulk_create(batch)
+
+
+def parse_as_of(value):
+    """
+    A datetime from an ISO date or datetime string; a bare date means the
+    end of that day (prices changed during the day are in force)
+    """
+    try:
+        moment = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f'Invalid date {value!r}; expected YYYY-MM-DD or an ISO datetime')
+    if len(value) <= 10:
+        moment = datetime.combine(date.fromisoformat(value), time.max)
+    return timezone.make_aware(moment) if timezone.is_naive(moment) else moment
+
+
+def quotations_using(quotations, hardware_ids=(), category_ids=(), open_only=False):
+    """Narrow ``quotations`` to those with lines for the given items, optionally not finally approved"""
+    from .models import QuotationHardware, QuotationPersonnelCost
+
+    if open_only:
+        quotations = quotations.filter(final_approval=False)
+    if hardware_ids or category_ids:
+        quotations = quotations.filter(
+            pk__in=QuotationHardware.objects.filter(hardware_id__in=hardware_ids).values('quotation_id')
+        ) | quotations.filter(
+            pk__in=QuotationPersonnelCost.objects.filter(category_id__in=category_ids).values('quotation_id')
+        )
+    return quotations
+
+
+def price_as_of(history, key, field, as_of, outer):
+    """Correlated subquery: ``field`` of the entry in force at ``as_of`` for ``outer``"""
+    return Subquery(
+        history.objects.filter(**{key: OuterRef(outer), 'effective_from__lte': as_of})
+        .order_by('-effective_from', '-id')
+        .values(field)[:1]
+    )
+
+
+@dataclass
+class QuotationDelta:
+    quotation_id: int
+    quotation_number: str
+    currency: str
+    old_total: Decimal
+    new_total: Decimal
+    lines_changed: int
+
+    @property
+    def delta(self):
+        return self.new_total - self.old_total
+
+    def as_dict(self):
+        return {
+            'id': self.quotation_id,
+            'quotation_number': self.quotation_number,
+            'currency': self.currency,
+            'old_total': self.old_total,
+            'new_total': self.new_total,
+            'delta': self.delta,
+            'lines_changed': self.lines_changed,
+        }
+
+
+@dataclass
+class RepriceResult:
+    as_of: datetime
+    applied: bool = False
+    deltas: list = field(default_factory=list)
+    quotations: int = 0
+    lines: int = 0
+    # Lines whose item has no price on the date; they keep their price
+    unpriced_lines: int = 0
+    # (from, to, date) triples without an exchange rate; those lines keep their price
+    missing_rates: set = field(default_factory=set)
+
+    @property
+    def changed(self):
+        return [delta for delta in self.deltas if delta.delta]
+
+    def totals_by_currency(self):
+        totals = {}
+        for delta in self.changed:
+            entry = totals.setdefault(delta.currency, {'count': 0, 'delta': Decimal('0.00')})
+            entry['count'] += 1
+            entry['delta'] += delta.delta
+        return totals
+
+    def as_dict(self, changed_only=True):
+        return {
+            'as_of': self.as_of.isoformat(),
+            'applied': self.applied,
+            'quotations': self.quotations,
+            'lines': self.lines,
+            'changed': len(self.changed),
+            'unpriced_lines': self.unpriced_lines,
+            'missing_rates': [[a, b, date.isoformat()] for a, b, date in sorted(self.missing_rates)],
+            'totals_by_currency': self.totals_by_currency(),
+            'results': [delta.as_dict() for delta in (self.changed if changed_only else self.deltas)],
+        }
+
+
+def _line_specs():
+    from .models import (
+        HardwarePriceHistory, PersonnelRateHistory, QuotationHardware, QuotationPersonnelCost
+    )
+
+    # line model, history, priced item key (same name on both), amount, price field, quotation total
+    return [
+        (QuotationHardware, HardwarePriceHistory, 'hardware', 'quantity', 'unit_cost', 'hardware_total'),
+        (QuotationPersonnelCost, PersonnelRateHistory, 'category', 'hours', 'hourly_rate', 'personnel_total'),
+    ]
+
+
+def _reprice_chunk(chunk, as_of, apply, table, result, batch_size):
+    from .models import Quotation
+
+    quotes = {
+        row['pk']: row for row in Quotation.objects.filter(pk__in=chunk).order_by().values(
+            'pk', 'quotation_number', 'currency', 'created_date',
+            'markup_percentage', 'tax_percentage', 'total_amount',
+        )
+    }
+    new_totals = {pk: {'hardware_total': Decimal('0'), 'personnel_total': Decimal('0')} for pk in quotes}
+    lines_changed = dict.fromkeys(quotes, 0)
+
+    for line_model, history, key, amount, price_field, total_field in _line_specs():
+        lines = line_model.objects.filter(quotation_id__in=chunk).order_by().annotate(
+            as_of_price=price_as_of(history, key, price_field, as_of, key),
+            as_of_currency=price_as_of(history, key, 'currency', as_of, key),
+            item_currency=F(f'{key}__currency'),
+        ).only('pk', 'quotation_id', amount, price_field, 'currency', 'total_cost', 'converted_total')
+        changed = []
+        for line in lines:
+            result.lines += 1
+            quote = quotes[line.quotation_id]
+            converted = line.converted_total
+            # Lines saved before currencies were tracked are in their item's currency
+            currency = line.currency or line.item_currency
+            if line.as_of_price is None:
+                result.unpriced_lines += 1
+            elif (line.as_of_price, line.as_of_currency) != (getattr(line, price_field), currency):
+                total_cost = quantize(line.as_of_price * getattr(line, amount))
+                date = rate_date(quote['created_date'])
+                try:
+                    converted = table.convert(total_cost, line.as_of_currency, quote['currency'], date)
+                except MissingExchangeRate as exc:
+                    result.missing_rates.add((*exc.pair, date))
+                else:
+                    lines_changed[line.quotation_id] += 1
+                    setattr(line, price_field, line.as_of_price)
+                    line.currency = line.as_of_currency
+                    line.total_cost = total_cost
+                    line.converted_total = converted
+                    changed.append(line)
+            new_totals[line.quotation_id][total_field] += converted
+        if apply and changed:
+            line_model.objects.bulk_update(
+                changed, [price_field, 'currency', 'total_cost', 'converted_total'], batch_size=batch_size
+            )
+
+    for pk, quote in quotes.items():
+        totals = compute_totals(
+            new_totals[pk]['hardware_total'], new_totals[pk]['personnel_total'],
+            quote['markup_percentage'], quote['tax_percentage'],
+        )
+        result.deltas.append(QuotationDelta(
+            pk, quote['quotation_number'], quote['currency'],
+            quote['total_amount'], totals['total_amount'], lines_changed[pk],
+        ))
+    if apply:
+        recalculate_quotations(chunk, batch_size=batch_size)
+    result.quotations += len(quotes)
+
+
+def reprice_quotations(quotations=None, as_of=None, apply=False, batch_size=500, progress=None):
+    """
+    Recompute ``quotations`` (a queryset, all by default) at the catalog
+    prices in force at ``as_of`` (a datetime, now by default). Repriced
+    lines convert into the quotation currency at the rates of the quote
+    date, as in ``convert_line_item``. Returns a ``RepriceResult``; with
+    ``apply`` the repriced lines are written and the totals rebuilt, one
+    transaction per batch. ``progress`` is called with the number of
+    quotations done after each batch.
+    """
+    from .models import Quotation
+
+    as_of = as_of or timezone.now()
+    if quotations is None:
+        quotations = Quotation.objects.all()
+    table = get_rate_table()
+    result = RepriceResult(as_of=as_of, applied=apply)
+    for chunk in _iter_id_chunks(quotations, batch_size):
+        with transaction.atomic() if apply else nullcontext():
+            _reprice_chunk(chunk, as_of, apply, table, result, batch_size)
+        if progress is not None:
+            progress(result.quotations)
+    return result
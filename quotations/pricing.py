@@ -0,0 +1,185 @@
+"""
+Pricing engine for quotation totals.
+
+Saving or deleting a single line item applies the change in its
+``converted_total`` (its cost in the quotation's currency) to the parent quotation with one UPDATE, so the totals stay current without
+re-summing every line. ``recalculate_quotations`` rebuilds totals for any
+number of quotations from one aggregate query per line-item table.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db.models import F, Sum, Value
+from django.db.models.functions import Round
+from django.utils import timezone
+
+CENT = Decimal('0.01')
+HUNDRED = Decimal('100')
+
+TOTAL_FIELDS = [
+    'hardware_total', 'personnel_total', 'markup_amount',
+    'subtotal', 'tax_amount', 'total_amount',
+]
+
+
+def quantize(amount):
+    """Round an amount to cents the same way the database does"""
+    return Decimal(amount).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def compute_totals(hardware_total, personnel_total, markup_percentage, tax_percentage):
+    """Return the pricing fields derived from the two line-item totals"""
+    hardware_total = quantize(hardware_total or 0)
+    personnel_total = quantize(personnel_total or 0)
+    base = hardware_total + personnel_total
+    markup_amount = quantize(base * (markup_percentage or 0) / HUNDRED)
+    subtotal = base + markup_amount
+    tax_amount = quantize(subtotal * (tax_percentage or 0) / HUNDRED)
+    return {
+        'hardware_total': hardware_total,
+        'personnel_total': personnel_total,
+        'markup_amount': markup_amount,
+        'subtotal': subtotal,
+        'tax_amount': tax_amount,
+        'total_amount': subtotal + tax_amount,
+    }
+
+
+def _total_expressions(hardware_total, personnel_total):
+    """SQL counterpart of compute_totals() evaluated against the row's percentages"""
+    base = hardware_total + personnel_total
+    markup_amount = Round(base * F('markup_percentage') / Value(HUNDRED), 2)
+    subtotal = base + markup_amount
+    tax_amount = Round(subtotal * F('tax_percentage') / Value(HUNDRED), 2)
+    return {
+        'hardware_total': hardware_total,
+        'personnel_total': personnel_total,
+        'markup_amount': markup_amount,
+        'subtotal': subtotal,
+        'tax_amount': tax_amount,
+        'total_amount': subtotal + tax_amount,
+    }
+
+
+def apply_delta(quotation_id, hardware_delta=0, personnel_delta=0):
+    """Shift a quotation's line totals by the given amounts in a single UPDATE"""
+    from .models import Quotation
+
+    hardware_delta = quantize(hardware_delta)
+    personnel_delta = quantize(personnel_delta)
+    if not hardware_delta and not personnel_delta:
+        return 0
+
+    hardware_total = F('hardware_total')
+    if hardware_delta:
+        hardware_total = Round(hardware_total + Value(hardware_delta), 2)
+    personnel_total = F('personnel_total')
+    if personnel_delta:
+        personnel_total = Round(personnel_total + Value(personnel_delta), 2)
+
+    return Quotation.objects.filter(pk=quotation_id).update(
+        updated_date=timezone.now(),
+        **_total_expressions(hardware_total, personnel_total)
+    )
+
+
+def _apply_line_delta(line_item, quotation_id, delta):
+    if line_item.quotation_total_field == 'hardware_total':
+        return apply_delta(quotation_id, hardware_delta=delta)
+    return apply_delta(quotation_id, personnel_delta=delta)
+
+
+def apply_line_item_saved(line_item, created):
+    """Propagate a saved line item's cost change to its quotation(s)"""
+    new_total = line_item.converted_total
+    if created:
+        _apply_line_delta(line_item, line_item.quotation_id, new_total)
+        return
+
+    old_quotation_id = line_item.saved_value('quotation_id')
+    old_total = line_item.saved_value('converted_total')
+    if old_quotation_id is None or old_total is None:
+        # The previous state was never loaded (e.g. deferred fields), so the
+        # delta is unknown; fall back to an aggregate rebuild of this quote.
+        recalculate_quotations([line_item.quotation_id])
+        return
+
+    if old_quotation_id == line_item.quotation_id:
+        _apply_line_delta(line_item, line_item.quotation_id, new_total - old_total)
+    else:
+        _apply_line_delta(line_item, old_quotation_id, -old_total)
+        _apply_line_delta(line_item, line_item.quotation_id, new_total)
+
+
+def apply_line_item_deleted(line_item):
+    """Remove a deleted line item's cost from its quotation"""
+    _apply_line_delta(line_item, line_item.quotation_id, -(line_item.converted_total or 0))
+
+
+def _iter_id_chunks(queryset, batch_size):
+    """Yield primary keys of ``queryset`` in ascending chunks without OFFSET"""
+    last_pk = None
+    queryset = queryset.order_by('pk').values_list('pk', flat=True)
+    while True:
+        page = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        chunk = list(page[:batch_size])
+        if not chunk:
+            return
+        yield chunk
+        last_pk = chunk[-1]
+
+
+def _sum_by_quotation(model, quotation_ids):
+    rows = (
+        model.objects.filter(quotation_id__in=quotation_ids)
+        .order_by()
+        .values('quotation_id')
+        .annotate(total=Sum('converted_total'))
+        .values_list('quotation_id', 'total')
+    )
+    return dict(rows)
+
+
+def recalculate_quotations(quotation_ids=None, batch_size=500):
+    """
+    Rebuild the totals of the given quotations (all when ``None``) from their
+    line items. Each batch costs one aggregate query per line-item table, one
+    read of the quotation percentages and one bulk UPDATE of the quotations
+    whose totals changed.
+
+    Returns the number of quotations recalculated.
+    """
+    from .models import Quotation, QuotationHardware, QuotationPersonnelCost
+
+    quotations = Quotation.objects.all()
+    if quotation_ids is not None:
+        quotations = quotations.filter(pk__in=list(quotation_ids))
+
+    count = 0
+    for chunk in _iter_id_chunks(quotations, batch_size):
+        hardware_totals = _sum_by_quotation(QuotationHardware, chunk)
+        personnel_totals = _sum_by_quotation(QuotationPersonnelCost, chunk)
+
+        batch = list(
+            Quotation.objects.filter(pk__in=chunk)
+            .order_by()
+            .only('pk', 'markup_percentage', 'tax_percentage', *TOTAL_FIELDS)
+        )
+        now = timezone.now()
+        changed = []
+        for quotation in batch:
+            totals = compute_totals(
+                hardware_totals.get(quotation.pk, 0),
+                personnel_totals.get(quotation.pk, 0),
+                quotation.markup_percentage,
+                quotation.tax_percentage,
+            )
+            if any(getattr(quotation, field) != value for field, value in totals.items()):
+                for field, value in totals.items():
+                    setattr(quotation, field, value)
+                # Marks the quotation for the next reporting rollup refresh
+                quotation.updated_date = now
+                changed.append(quotation)
+
+        Quotation.objects.bulk_update(changed, [*TOTAL_FIELDS, 'updated_date'], batch_size=batch_size)
+        count += len(batch)
+    return count
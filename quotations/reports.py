@@ -0,0 +1,145 @@
+"""
+Sales reports by month, read from the daily rollups in ``rollups.py`` only.
+
+Each report sums a rollup table by calendar month (and its dimensions), so
+its cost depends on the number of days and categories in range, never on
+the number of requests, quotations or line items. Amounts stay in the
+quotation currency; nothing is converted.
+"""
+from datetime import date
+
+from django.db.models import Sum
+from django.db.models.functions import TruncMonth
+
+from .models import DailyHardwareSpendRollup, DailyPersonnelRollup, DailyQuotationRollup, DailyRequestRollup
+from .pricing import quantize
+from .rollups import get_watermark
+
+WON, LOST = 'approved', 'rejected'
+
+
+def parse_month(value, end=False):
+    """First day of a ``YYYY-MM`` month, or the first day after it when ``end``"""
+    try:
+        year, month = (int(part) for part in value.split('-'))
+        first = date(year, month, 1)
+    except ValueError:
+        raise ValueError(f'Invalid month {value!r}; expected YYYY-MM')
+    if end:
+        return date(year + month // 12, month % 12 + 1, 1)
+    return first
+
+
+def _monthly(model, start, end, currency, dimensions, sums):
+    rows = model.objects.all()
+    if start:
+        rows = rows.filter(day__gte=start)
+    if end:
+        rows = rows.filter(day__lt=end)
+    if currency:
+        rows = rows.filter(currency=currency)
+    return (
+        rows.order_by()
+        .annotate(month=TruncMonth('day'))
+        .values('month', *dimensions)
+        .annotate(**{name: Sum(name) for name in sums})
+        .order_by('month', *dimensions)
+    )
+
+
+def _month(value):
+    return value.strftime('%Y-%m')
+
+
+def _amount(value):
+    # SQLite sums decimals as floats
+    return quantize(value or 0)
+
+
+def quotation_report(start=None, end=None, currency=None):
+    """Quote volume, final approvals and average total per month and currency"""
+    rows = _monthly(DailyQuotationRollup, start, end, currency, ['currency'], ['quotations', 'approved', 'total_amount'])
+    results = []
+    for row in rows:
+        results.append({
+            'month': _month(row['month']),
+            'currency': row['currency'],
+            'quotations': row['quotations'],
+            'approved': row['approved'],
+            'total_amount': _amount(row['total_amount']),
+            'average_total': _amount(row['total_amount'] / row['quotations']),
+        })
+    return results
+
+
+def win_rate_report(start=None, end=None, currency=None):
+    """
+    Requests per month by status. The win rate is approved / (approved +
+    rejected) among the requests created that month; open requests are left out.
+    """
+    months = {}
+    for row in _monthly(DailyRequestRollup, start, end, None, ['status'], ['requests']):
+        month = months.setdefault(_month(row['month']), {'requests': 0, 'by_status': {}})
+        month['requests'] += row['requests']
+        month['by_status'][row['status']] = row['requests']
+    results = []
+    for month, values in months.items():
+        won, lost = values['by_status'].get(WON, 0), values['by_status'].get(LOST, 0)
+        results.append({
+            'month': month,
+            **values,
+            'decided': won + lost,
+            'win_rate': round(won / (won + lost), 4) if won + lost else None,
+        })
+    return results
+
+
+def hardware_spend_report(start=None, end=None, currency=None):
+    """Hardware spend and quantity per month, category and currency"""
+    rows = _monthly(
+        DailyHardwareSpendRollup, start, end, currency, ['category', 'currency'], ['lines', 'quantity', 'spend']
+    )
+    return [
+        {**row, 'month': _month(row['month']), 'spend': _amount(row['spend'])}
+        for row in rows
+    ]
+
+
+def personnel_hours_report(start=None, end=None, currency=None):
+    """Personnel hours and cost per month, category and currency"""
+    rows = _monthly(
+        DailyPersonnelRollup, start, end, currency, ['category_id', 'category__name', 'currency'],
+        ['lines', 'hours', 'cost'],
+    )
+    return [
+        {
+            'month': _month(row['month']),
+            'category_id': row['category_id'],
+            'category': row['category__name'],
+            'currency': row['currency'],
+            'lines': row['lines'],
+            'hours': _amount(row['hours']),
+            'cost': _amount(row['cost']),
+        }
+        for row in rows
+    ]
+
+
+REPORTS = {
+    'quotations': quotation_report,
+    'win-rate': win_rate_report,
+    'hardware-spend': hardware_spend_report,
+    'personnel-hours': personnel_hours_report,
+}
+
+
+def run_report(name, start=None, end=None, currency=None):
+    """The ``name`` report as a JSON-ready dict; raises KeyError for an unknown name"""
+    results = REPORTS[name](start, end, currency)
+    watermark = get_watermark()
+    return {
+        'report': name,
+        # Facts changed after this moment are not in the report yet
+        'as_of': watermark.isoformat() if watermark else None,
+        'results': results,
+    }
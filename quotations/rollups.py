@@ -0,0 +1,222 @@
+"""
+Pre-aggregated daily rollups for the sales reports.
+
+Four summary tables hold one row per day (of the fact row's
+``created_date``) and dimension:
+
+* ``DailyRequestRollup``: requests per current status;
+* ``DailyQuotationRollup``: quotations, final approvals and total amount per
+  currency;
+* ``DailyHardwareSpendRollup``: hardware lines, quantity and spend (in the
+  quotation currency) per hardware category;
+* ``DailyPersonnelRollup``: personnel lines, hours and cost per category.
+
+``refresh_rollups`` is incremental. It finds the days of every request and
+quotation whose ``updated_date`` is after the stored watermark, and
+recomputes those whole days from the fact tables. Line-item writes move
+their quotation's ``updated_date`` through the totals bookkeeping. A day is
+always recomputed whole, so a refresh is idempotent and the watermark is
+read back ``WATERMARK_OVERLAP`` early, which catches transactions that
+committed late. Deleted rows and re-categorised hardware leave no
+``updated_date`` behind; ``rebuild_rollups`` recomputes everything, a chunk
+of days at a time.
+
+The reports in ``reports.py`` read only these tables.
+"""
+from dataclasses import dataclass, field
+from datetime import datetime, time as dt_time, timedelta
+
+from django.db import transaction
+from django.db.models import Count, Max, Min, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import (
+    CustomerQuotationRequest, DailyHardwareSpendRollup, DailyPersonnelRollup, DailyQuotationRollup,
+    DailyRequestRollup, Quotation, QuotationHardware, QuotationPersonnelCost, RollupWatermark
+)
+
+WATERMARK_NAME = 'daily_rollups'
+WATERMARK_OVERLAP = timedelta(minutes=5)
+DEFAULT_CHUNK_DAYS = 31
+
+
+@dataclass
+class RollupResult:
+    days: int = 0
+    rows: int = 0
+    watermark: datetime = None
+    rebuilt: bool = False
+    ranges: list = field(default_factory=list)
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, dt_time.min))
+
+
+def _request_rows(start, end):
+    rows = (
+        CustomerQuotationRequest.objects.filter(created_date__gte=start, created_date__lt=end)
+        .order_by()
+        .annotate(day=TruncDate('created_date'))
+        .values('day', 'status')
+        .annotate(requests=Count('id'))
+    )
+    return [DailyRequestRollup(**row) for row in rows]
+
+
+def _quotation_rows(start, end):
+    rows = (
+        Quotation.objects.filter(created_date__gte=start, created_date__lt=end)
+        .order_by()
+        .annotate(day=TruncDate('created_date'))
+        .values('day', 'currency')
+        .annotate(
+            quotations=Count('id'),
+            approved=Count('id', filter=Q(final_approval=True)),
+            total_amount=Sum('total_amount'),
+        )
+    )
+    return [DailyQuotationRollup(**row) for row in rows]
+
+
+def _hardware_rows(start, end):
+    rows = (
+        QuotationHardware.objects.filter(quotation__created_date__gte=start, quotation__created_date__lt=end)
+        .order_by()
+        .annotate(day=TruncDate('quotation__created_date'))
+        .values('day', 'hardware__category', 'quotation__currency')
+        .annotate(lines=Count('id'), quantity=Sum('quantity'), spend=Sum('converted_total'))
+    )
+    return [
+        DailyHardwareSpendRollup(
+            day=row['day'], category=row['hardware__category'], currency=row['quotation__currency'],
+            lines=row['lines'], quantity=row['quantity'], spend=row['spend'],
+        )
+        for row in rows
+    ]
+
+
+def _personnel_rows(start, end):
+    rows = (
+        QuotationPersonnelCost.objects.filter(quotation__created_date__gte=start, quotation__created_date__lt=end)
+        .order_by()
+        .annotate(day=TruncDate('quotation__created_date'))
+        .values('day', 'category_id', 'quotation__currency')
+        .annotate(lines=Count('id'), hours=Sum('hours'), cost=Sum('converted_total'))
+    )
+    return [
+        DailyPersonnelRollup(
+            day=row['day'], category_id=row['category_id'], currency=row['quotation__currency'],
+            lines=row['lines'], hours=row['hours'], cost=row['cost'],
+        )
+        for row in rows
+    ]
+
+
+ROLLUPS = [
+    (DailyRequestRollup, _request_rows),
+    (DailyQuotationRollup, _quotation_rows),
+    (DailyHardwareSpendRollup, _hardware_rows),
+    (DailyPersonnelRollup, _personnel_rows),
+]
+
+
+def recompute_days(first_day, last_day):
+    """Replace the rollup rows of ``first_day`` through ``last_day`` in one transaction"""
+    start, end = _day_start(first_day), _day_start(last_day + timedelta(days=1))
+    rows = 0
+    with transaction.atomic():
+        for model, build in ROLLUPS:
+            model.objects.filter(day__gte=first_day, day__lte=last_day).delete()
+            created = model.objects.bulk_create(build(start, end), batch_size=1000)
+            rows += len(created)
+    return rows
+
+
+def _ranges(days, chunk_days):
+    """Group sorted days into contiguous (first, last) ranges of at most ``chunk_days``"""
+    ranges = []
+    for day in sorted(days):
+        if ranges and day - ranges[-1][1] == timedelta(days=1) and (day - ranges[-1][0]).days < chunk_days:
+            ranges[-1][1] = day
+        else:
+            ranges.append([day, day])
+    return [tuple(day_range) for day_range in ranges]
+
+
+def get_watermark():
+    return RollupWatermark.objects.filter(name=WATERMARK_NAME).values_list('value', flat=True).first()
+
+
+def _set_watermark(value):
+    RollupWatermark.objects.update_or_create(name=WATERMARK_NAME, defaults={'value': value})
+
+
+def changed_days_queryset(model, since):
+    return (
+        model.objects.filter(updated_date__gt=since).order_by()
+        .annotate(day=TruncDate('created_date')).values_list('day', flat=True).distinct()
+    )
+
+
+def changed_days(since):
+    """Local days with a request or quotation created there and changed after ``since``"""
+    days = set()
+    for model in (CustomerQuotationRequest, Quotation):
+        days.update(changed_days_queryset(model, since))
+    return days
+
+
+def refresh_rollups(chunk_days=DEFAULT_CHUNK_DAYS, log=None):
+    """
+    Bring the rollups up to date; recomputes only the days touched since the
+    last refresh (everything the first time). Returns a ``RollupResult``.
+    """
+    watermark = get_watermark()
+    if watermark is None:
+        return rebuild_rollups(chunk_days=chunk_days, log=log)
+    # Taken before reading, so writes made during the refresh are seen next time
+    started = timezone.now()
+    result = RollupResult(watermark=started)
+    days = changed_days(watermark - WATERMARK_OVERLAP)
+    for first_day, last_day in _ranges(days, chunk_days):
+        result.rows += recompute_days(first_day, last_day)
+        result.ranges.append((first_day, last_day))
+        if log:
+            log(f'{first_day} .. {last_day}')
+    result.days = len(days)
+    _set_watermark(started)
+    return result
+
+
+def rebuild_rollups(chunk_days=DEFAULT_CHUNK_DAYS, log=None):
+    """Recompute every rollup from the fact tables, ``chunk_days`` days per transaction"""
+    started = timezone.now()
+    result = RollupResult(watermark=started, rebuilt=True)
+    bounds = [
+        model.objects.aggregate(first=Min('created_date'), last=Max('created_date'))
+        for model in (CustomerQuotationRequest, Quotation)
+    ]
+    firsts = [bound['first'] for bound in bounds if bound['first']]
+    if firsts:
+        first_day = timezone.localdate(min(firsts))
+        last_day = timezone.localdate(max(bound['last'] for bound in bounds if bound['last']))
+        with transaction.atomic():
+            # Rows of days that no longer have any facts
+            for model, _ in ROLLUPS:
+                model.objects.exclude(day__gte=first_day, day__lte=last_day).delete()
+        day = first_day
+        while day <= last_day:
+            chunk_end = min(day + timedelta(days=chunk_days - 1), last_day)
+            result.rows += recompute_days(day, chunk_end)
+            result.ranges.append((day, chunk_end))
+            result.days += (chunk_end - day).days + 1
+            if log:
+                log(f'{day} .. {chunk_end}')
+            day = chunk_end + timedelta(days=1)
+    else:
+        for model, _ in ROLLUPS:
+            model.objects.all().delete()
+    _set_watermark(started)
+    return result
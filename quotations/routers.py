@@ -0,0 +1,101 @@
+"""
+Read-replica routing.
+
+Views decorated with ``@use_replica`` read from the ``replica`` database
+alias on GET and HEAD requests; every write, and every read outside those
+views, goes to ``default``. Place the decorator below ``login_required`` so
+the session and user are still loaded from the primary.
+
+A replica lags behind the primary, so a client that has just written (any
+non-GET request) is pinned to the primary for ``DATABASE_REPLICA_PIN_SECONDS``
+by a cookie that ``middleware.ReplicaPinMiddleware`` sets; it sees its own
+writes. Without a ``replica`` alias everything runs on ``default``.
+``primary_reads()`` keeps a block on the primary even inside those views,
+for reads whose result is shared with other clients (the page cache).
+"""
+import contextvars
+import functools
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction
+from django.db import connections
+
+REPLICA_ALIAS = 'replica'
+PIN_COOKIE = 'db_primary_pin'
+SAFE_METHODS = ('GET', 'HEAD')
+
+_replica_reads = contextvars.ContextVar('replica_reads', default=False)
+_primary_reads = contextvars.ContextVar('primary_reads', default=False)
+
+
+def replica_available():
+    return REPLICA_ALIAS in connections.databases
+
+
+@contextmanager
+def replica_reads():
+    """Route the block's reads to the replica (when one is configured)"""
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+@contextmanager
+def primary_reads():
+    """Route the block's reads to the primary, overriding ``replica_reads()``"""
+    token = _primary_reads.set(True)
+    try:
+        yield
+    finally:
+        _primary_reads.reset(token)
+
+
+def _reads_from_replica():
+    return _replica_reads.get() and not _primary_reads.get()
+
+
+def _wants_replica(request):
+    return request.method in SAFE_METHODS and PIN_COOKIE not in request.COOKIES
+
+
+def use_replica(view):
+    """Serve a read-only view from the replica"""
+    if iscoroutinefunction(view):
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if not _wants_replica(request):
+                return await view(request, *args, **kwargs)
+            with replica_reads():
+                return await view(request, *args, **kwargs)
+    else:
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not _wants_replica(request):
+                return view(request, *args, **kwargs)
+            with replica_reads():
+                return view(request, *args, **kwargs)
+    wrapper.use_replica = True
+    return wrapper
+
+
+class ReplicaRouter:
+    """Reads in ``replica_reads()`` (outside ``primary_reads()``) go to the replica; the rest to default"""
+
+    def db_for_read(self, model, **hints):
+        if _reads_from_replica() and replica_available():
+            return REPLICA_ALIAS
+        return None
+
+    def db_for_write(self, model, **hints):
+        # Explicit, so saving an instance read from the replica writes to the primary
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica receives the schema through replication
+        return db != REPLICA_ALIAS
@@ -0,0 +1,210 @@
+"""
+Full-text search over the hardware catalog and customer requests.
+
+The backend is picked from the queryset's database vendor:
+
+* SQLite: an external-content FTS5 table per model, kept in sync by
+  INSERT/UPDATE/DELETE triggers, so every save, delete and bulk write
+  (imports, catalog syncs) maintains the index inside the same statement.
+* PostgreSQL: a GIN expression index over ``to_tsvector('simple', ...)``,
+  maintained by PostgreSQL itself.
+* Anything else: the previous OR-ed ``icontains`` filters.
+
+Every search term is treated as a prefix, so partial words typed into the
+AJAX search box already match. Results come back ordered by relevance.
+"""
+import re
+
+from django.apps import apps
+from django.db import connections
+from django.db.models import Q
+
+# Indexed fields per model, most significant first (SQLite weights them)
+SEARCH_FIELDS = {
+    'quotations.Hardware': (
+        ('name', 10.0), ('model_number', 8.0), ('manufacturer', 4.0),
+        ('category', 4.0), ('description', 1.0),
+    ),
+    'quotations.CustomerQuotationRequest': (
+        ('customer_name', 10.0), ('company_name', 8.0), ('project_description', 1.0),
+    ),
+}
+
+# PostgreSQL GIN index names (index names are limited to 30 characters)
+GIN_INDEX_NAMES = {
+    'quotations.Hardware': 'hardware_search_gin',
+    'quotations.CustomerQuotationRequest': 'request_search_gin',
+}
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(query):
+    """Split free text into search terms, dropping FTS syntax characters"""
+    return TOKEN_RE.findall(query or '')
+
+
+def _fields(model):
+    return SEARCH_FIELDS[model._meta.label]
+
+
+class FallbackSearchBackend:
+    """Unindexed ``icontains`` search for databases without a native engine"""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def install(self, model):
+        pass
+
+    def rebuild(self, model):
+        pass
+
+    def search(self, queryset, terms):
+        condition = Q()
+        for term in terms:
+            term_condition = Q()
+            for name, _ in _fields(queryset.model):
+                term_condition |= Q(**{f'{name}__icontains': term})
+            condition &= term_condition
+        return queryset.filter(condition)
+
+
+class SQLiteSearchBackend(FallbackSearchBackend):
+    """FTS5 external-content tables with trigger maintenance"""
+
+    @staticmethod
+    def fts_table(model):
+        return f'{model._meta.db_table}_fts'
+
+    def install(self, model):
+        """Create the FTS table and triggers; populate it if it is new"""
+        qn = self.connection.ops.quote_name
+        table = model._meta.db_table
+        fts = self.fts_table(model)
+        pk = model._meta.pk.column
+        columns = [model._meta.get_field(name).column for name, _ in _fields(model)]
+        column_list = ', '.join(qn(column) for column in columns)
+        new_values = ', '.join(f'new.{qn(column)}' for column in columns)
+        old_values = ', '.join(f'old.{qn(column)}' for column in columns)
+
+        with self.connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [fts])
+            exists = cursor.fetchone() is not None
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {qn(fts)} USING fts5("
+                f"{column_list}, content={qn(table)}, content_rowid={qn(pk)}, "
+                f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+            )
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {qn(fts + '_ai')} AFTER INSERT ON {qn(table)} BEGIN "
+                f"INSERT INTO {qn(fts)}(rowid, {column_list}) VALUES (new.{qn(pk)}, {new_values}); END"
+            )
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {qn(fts + '_ad')} AFTER DELETE ON {qn(table)} BEGIN "
+                f"INSERT INTO {qn(fts)}({qn(fts)}, rowid, {column_list}) "
+                f"VALUES ('delete', old.{qn(pk)}, {old_values}); END"
+            )
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {qn(fts + '_au')} AFTER UPDATE OF {column_list} "
+                f"ON {qn(table)} BEGIN "
+                f"INSERT INTO {qn(fts)}({qn(fts)}, rowid, {column_list}) "
+                f"VALUES ('delete', old.{qn(pk)}, {old_values}); "
+                f"INSERT INTO {qn(fts)}(rowid, {column_list}) VALUES (new.{qn(pk)}, {new_values}); END"
+            )
+        if not exists:
+            self.rebuild(model)
+
+    def rebuild(self, model):
+        qn = self.connection.ops.quote_name
+        fts = self.fts_table(model)
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {qn(fts)}({qn(fts)}) VALUES ('rebuild')")
+
+    def search(self, queryset, terms):
+        qn = self.connection.ops.quote_name
+        model = queryset.model
+        fts = qn(self.fts_table(model))
+        table = qn(model._meta.db_table)
+        pk = qn(model._meta.pk.column)
+        weights = ', '.join(str(weight) for _, weight in _fields(model))
+        match = ' '.join('"%s"*' % term.replace('"', '') for term in terms)
+        # FTS5 can only rank rows it matched itself, so the index is joined
+        # in rather than used through a correlated subquery.
+        return queryset.extra(
+            tables=[self.fts_table(model)],
+            where=[f'{fts}.rowid = {table}.{pk}', f'{fts} MATCH %s'],
+            params=[match],
+            select={'search_rank': f'bm25({fts}, {weights})'},
+            order_by=['search_rank'],
+        )
+
+
+class PostgresSearchBackend(FallbackSearchBackend):
+    """``tsvector`` expression index with GIN"""
+
+    @staticmethod
+    def _vector(model):
+        from django.contrib.postgres.search import SearchVector
+        return SearchVector(*(name for name, _ in _fields(model)), config='simple')
+
+    def install(self, model):
+        from django.contrib.postgres.indexes import GinIndex
+
+        name = GIN_INDEX_NAMES[model._meta.label]
+        with self.connection.cursor() as cursor:
+            constraints = self.connection.introspection.get_constraints(cursor, model._meta.db_table)
+        if name in constraints:
+            return
+        with self.connection.schema_editor() as schema_editor:
+            schema_editor.add_index(model, GinIndex(self._vector(model), name=name))
+
+    def search(self, queryset, terms):
+        from django.contrib.postgres.search import SearchQuery, SearchRank
+
+        query = SearchQuery(
+            ' & '.join(f'{term}:*' for term in terms), config='simple', search_type='raw'
+        )
+        return (
+            queryset.annotate(search_vector=self._vector(queryset.model))
+            .filter(search_vector=query)
+            .annotate(search_rank=SearchRank(self._vector(queryset.model), query))
+            .order_by('-search_rank')
+        )
+
+
+BACKENDS = {
+    'sqlite': SQLiteSearchBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+
+def get_backend(using='default'):
+    connection = connections[using]
+    return BACKENDS.get(connection.vendor, FallbackSearchBackend)(connection)
+
+
+def search(queryset, query):
+    """Filter ``queryset`` to rows matching ``query``, best matches first"""
+    terms = tokenize(query)
+    if not terms:
+        return queryset.none()
+    return get_backend(queryset.db).search(queryset, terms)
+
+
+def indexed_models():
+    return [apps.get_model(label) for label in SEARCH_FIELDS]
+
+
+def install_search_indexes(using='default', **kwargs):
+    """Create any missing search indexes (connected to ``post_migrate``)"""
+    backend = get_backend(using)
+    for model in indexed_models():
+        backend.install(model)
+
+
+def rebuild_search_indexes(using='default'):
+    backend = get_backend(using)
+    for model in indexed_models():
+        backend.install(model)
+        backend.rebuild(model)
@@ -0,0 +1,92 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import currency, pagecache, pricehistory, stats, typeahead
+from .models import (
+    CustomerQuotationRequest, ExchangeRate, Hardware, PersonnelCostCategory, Quotation,
+    QuotationHardware, QuotationPersonnelCost
+)
+from .pricing import apply_line_item_deleted, apply_line_item_saved
+
+# Set on the object or queryset a delete started from, so it lives as long as that delete
+DELETED_QUOTATIONS_ATTR = '_deleted_quotation_ids'
+
+
+@receiver(post_save, sender=QuotationHardware)
+@receiver(post_save, sender=QuotationPersonnelCost)
+def line_item_saved(sender, instance, created, raw=False, **kwargs):
+    """Apply a saved line item's cost change to its quotation's totals"""
+    if raw:
+        return
+    apply_line_item_saved(instance, created)
+
+
+@receiver(pre_delete, sender=Quotation)
+def quotation_deleting(sender, instance, origin=None, **kwargs):
+    """Record that the delete removes this quotation; pre_delete is sent for every row before any goes"""
+    if origin is not None:
+        if getattr(origin, DELETED_QUOTATIONS_ATTR, None) is None:
+            setattr(origin, DELETED_QUOTATIONS_ATTR, set())
+        getattr(origin, DELETED_QUOTATIONS_ATTR).add(instance.pk)
+
+
+@receiver(post_delete, sender=QuotationHardware)
+@receiver(post_delete, sender=QuotationPersonnelCost)
+def line_item_deleted(sender, instance, origin=None, **kwargs):
+    """Subtract a removed line item from its quotation's totals, unless the quotation goes too"""
+    if instance.quotation_id in getattr(origin, DELETED_QUOTATIONS_ATTR, ()):
+        return
+    apply_line_item_deleted(instance)
+
+
+@receiver(post_save, sender=Hardware)
+@receiver(post_delete, sender=Hardware)
+def hardware_changed(sender, **kwargs):
+    """Drop the cached type-ahead index and catalog pages when the catalog changes"""
+    # After commit, or another worker could rebuild from the old rows under the new token
+    transaction.on_commit(typeahead.invalidate)
+    transaction.on_commit(pagecache.bump_catalog_version)
+
+
+@receiver(post_save, sender=Hardware)
+@receiver(post_save, sender=PersonnelCostCategory)
+def catalog_price_saved(sender, instance, created, raw=False, **kwargs):
+    """Append to the price history when a new item is saved or its price changes"""
+    if raw:
+        return
+    pricehistory.record_saved(instance, created)
+
+
+@receiver(post_save, sender=ExchangeRate)
+@receiver(post_delete, sender=ExchangeRate)
+def exchange_rate_changed(sender, **kwargs):
+    """Drop cached exchange rates in every process"""
+    currency.invalidate()
+
+
+@receiver(post_save, sender=Quotation)
+def quotation_currency_changed(sender, instance, created, raw=False, **kwargs):
+    """Convert the line items again when a quote switches currency"""
+    if raw or created or instance.saved_value('currency') in (None, instance.currency):
+        return
+    result = currency.convert_quotations([instance.pk])
+    if result.missing:
+        # Roll back the currency change rather than leave lines unconverted
+        from_currency, to_currency, date = sorted(result.missing)[0]
+        raise currency.MissingExchangeRate(from_currency, to_currency, date)
+
+
+@receiver(post_save, sender=CustomerQuotationRequest)
+@receiver(post_save, sender=Quotation)
+def counted_model_saved(sender, instance, created, raw=False, **kwargs):
+    """Keep dashboard counters in step with request status and quote approval"""
+    if raw:
+        return
+    stats.record_saved(instance, created)
+
+
+@receiver(post_delete, sender=CustomerQuotationRequest)
+@receiver(post_delete, sender=Quotation)
+def counted_model_deleted(sender, instance, **kwargs):
+    stats.record_deleted(instance)
@@ -0,0 +1,122 @@
+"""
+Denormalized dashboard counters.
+
+Each counter is a row in ``DashboardCounter`` adjusted by signal receivers in
+the same transaction as the change that moved it, so the dashboard reads all
+of them with one query on a tiny table instead of counting the fact tables.
+Writes that bypass signals (``QuerySet.update``, ``bulk_create``) can make
+the counters drift; ``reconcile_counters`` (the ``reconcile_dashboard_counters``
+command) recounts them.
+"""
+import threading
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+# Counter name -> (model label, filter that a row must match to be counted)
+COUNTERS = {
+    'total_requests': ('quotations.CustomerQuotationRequest', {}),
+    'pending_requests': ('quotations.CustomerQuotationRequest', {'status': 'pending'}),
+    'total_quotations': ('quotations.Quotation', {}),
+    'approved_quotations': ('quotations.Quotation', {'final_approval': True}),
+}
+
+_cache = {'values': None, 'expires': 0.0}
+_cache_lock = threading.Lock()
+
+
+def _counter_model():
+    return apps.get_model('quotations', 'DashboardCounter')
+
+
+def _matches(values, conditions):
+    return all(values.get(field) == expected for field, expected in conditions.items())
+
+
+def _count(name):
+    label, conditions = COUNTERS[name]
+    return apps.get_model(label)._default_manager.filter(**conditions).count()
+
+
+def _adjust(name, delta):
+    DashboardCounter = _counter_model()
+    updated = DashboardCounter.objects.filter(name=name).update(value=F('value') + delta)
+    if not updated:
+        # First use: seed from a real count, which already includes this change
+        DashboardCounter.objects.update_or_create(name=name, defaults={'value': _count(name)})
+
+
+def adjust(name, delta):
+    """Move a counter for a bulk write that sent no signals"""
+    if delta:
+        _adjust(name, delta)
+
+
+def _counters_for(instance):
+    label = instance._meta.label
+    return [(name, conditions) for name, (model, conditions) in COUNTERS.items() if model == label]
+
+
+def record_saved(instance, created):
+    """Adjust the counters affected by saving ``instance``"""
+    for name, conditions in _counters_for(instance):
+        current = {field: getattr(instance, field) for field in conditions}
+        if created:
+            before = False
+        else:
+            saved = {field: instance.saved_value(field) for field in conditions}
+            before = _matches(saved, conditions)
+        delta = int(_matches(current, conditions)) - int(before)
+        if delta:
+            _adjust(name, delta)
+
+
+def record_deleted(instance):
+    """Adjust the counters affected by deleting ``instance``"""
+    for name, conditions in _counters_for(instance):
+        current = {field: getattr(instance, field) for field in conditions}
+        if _matches(current, conditions):
+            _adjust(name, -1)
+
+
+def reconcile_counters():
+    """Recount every counter from the fact tables; returns {name: (old, new)}"""
+    DashboardCounter = _counter_model()
+    changes = {}
+    with transaction.atomic():
+        stored = dict(DashboardCounter.objects.select_for_update().values_list('name', 'value'))
+        for name in COUNTERS:
+            value = _count(name)
+            if stored.get(name) != value:
+                DashboardCounter.objects.update_or_create(name=name, defaults={'value': value})
+                changes[name] = (stored.get(name), value)
+    invalidate_cache()
+    return changes
+
+
+def invalidate_cache():
+    _cache['values'] = None
+
+
+def get_counters():
+    """
+    Return every dashboard counter. Reads are served from a per-worker cache
+    for ``DASHBOARD_COUNTER_CACHE_TTL`` seconds (0, the default, disables it).
+    """
+    ttl = getattr(settings, 'DASHBOARD_COUNTER_CACHE_TTL', 0)
+    if ttl and _cache['values'] is not None and time.monotonic() < _cache['expires']:
+        return dict(_cache['values'])
+
+    values = dict(_counter_model().objects.order_by().values_list('name', 'value'))
+    if set(COUNTERS) - set(values):
+        reconcile_counters()
+        values = dict(_counter_model().objects.order_by().values_list('name', 'value'))
+
+    if ttl:
+        with _cache_lock:
+            _cache['values'] = values
+            _cache['expires'] = time.monotonic() + ttl
+    return {name: values.get(name, 0) for name in COUNTERS}
@@ -0,0 +1,93 @@
+"""
+Background tasks run by ``manage.py run_workers`` (see ``jobs.py``).
+"""
+import io
+import json
+
+from .jobs import JobFailed, task
+
+
+@task('recalculate_quotations', lease_seconds=600)
+def recalculate_quotations_task(job, quotation_ids=None, batch_size=500):
+    """Rebuild quotation totals from line items (all quotations when no ids)"""
+    from .models import Quotation
+    from .pricing import _iter_id_chunks, recalculate_quotations
+
+    quotations = Quotation.objects.all()
+    if quotation_ids is not None:
+        quotations = quotations.filter(pk__in=quotation_ids)
+    total = quotations.count()
+    done = 0
+    job.progress(0, total, force=True)
+    for chunk in _iter_id_chunks(quotations, batch_size):
+        done += recalculate_quotations(chunk, batch_size=batch_size)
+        job.progress(done, total, f'{done} of {total} quotations')
+    job.progress(done, total, force=True)
+    return {'recalculated': done}
+
+
+@task('reprice_quotations', lease_seconds=900)
+def reprice_quotations_task(job, as_of=None, hardware_ids=(), category_ids=(), open_only=False, batch_size=500):
+    """Report each quotation's change in total at the catalog prices in force at ``as_of``"""
+    from django.core.serializers.json import DjangoJSONEncoder
+
+    from .models import Quotation
+    from .pricehistory import parse_as_of, quotations_using, reprice_quotations
+
+    quotations = quotations_using(Quotation.objects.all(), hardware_ids, category_ids, open_only)
+    total = quotations.count()
+    job.progress(0, total, 'Repricing', force=True)
+    # Each batch reports progress, which also renews the lease
+    result = reprice_quotations(
+        quotations, as_of=parse_as_of(as_of) if as_of else None, batch_size=batch_size,
+        progress=lambda done: job.progress(done, total, f'{done} of {total} quotations'),
+    )
+    # Decimal totals, as the inline API response renders them
+    return json.loads(json.dumps(result.as_dict(), cls=DjangoJSONEncoder))
+
+
+@task('import_bom')
+def import_bom_task(job, quotation_id, content, fmt='csv', replace_existing=False):
+    """Import a bill of materials; invalid files fail the job without retries"""
+    from .importers import import_bom
+    from .models import Quotation
+
+    try:
+        quotation = Quotation.objects.get(pk=quotation_id)
+    except Quotation.DoesNotExist:
+        raise JobFailed(f'Quotation {quotation_id} no longer exists')
+    job.progress(0, message='Importing', force=True)
+    result = import_bom(quotation, io.StringIO(content), fmt=fmt, replace_existing=replace_existing)
+    if not result.ok:
+        raise JobFailed(f'Import failed with {len(result.errors)} error(s)', result=result.as_dict())
+    return result.as_dict()
+
+
+@task('render_documents', lease_seconds=900)
+def render_documents_task(job, quotation_ids, formats=('pdf',)):
+    """Render quotation documents into the document cache"""
+    from .documents import render_documents
+
+    total = len(quotation_ids) * len(formats)
+    rendered, failed = 0, []
+    for done, (quotation_id, fmt, path, cached, error) in enumerate(
+        render_documents(quotation_ids, tuple(formats), processes=1), start=1
+    ):
+        if error:
+            failed.append({'quotation_id': quotation_id, 'format': fmt, 'error': error})
+        else:
+            rendered += 1
+        job.progress(done, total, f'{done} of {total} documents')
+    if failed and not rendered:
+        raise RuntimeError(f'No document rendered: {failed[:5]}')
+    return {'rendered': rendered, 'failed': failed}
+
+
+@task('refresh_report_rollups', lease_seconds=1800)
+def refresh_report_rollups_task(job, rebuild=False):
+    """Refresh (or rebuild) the daily reporting rollups"""
+    from .rollups import rebuild_rollups, refresh_rollups
+
+    job.progress(0, message='Rebuilding' if rebuild else 'Refreshing', force=True)
+    result = (rebuild_rollups if rebuild else refresh_rollups)(log=lambda message: job.progress(0, message=message))
+    return {'days': result.days, 'rows': result.rows, 'watermark': result.watermark.isoformat()}
@@ -0,0 +1,76 @@
+from django.conf import settings
+from django.shortcuts import resolve_url
+from django.test import TestCase
+
+from .utils import make_hardware, make_quotation, make_user
+
+
+class EditorApiTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.async_client.force_login(self.user)
+        self.sensor = make_hardware(name='Sensor', unit_cost='10.00')
+        self.quotation = make_quotation(self.user)
+        self.other = make_quotation(self.user)
+        self.url = f'/api/editor/quotations/{self.quotation.pk}/'
+
+    async def _send(self, method, path, data):
+        return await getattr(self.async_client, method)(path, data, content_type='application/json')
+
+    async def test_create_patch_and_delete_a_line(self):
+        response = await self._send('post', f'{self.url}hardware/', {
+            'hardware': self.sensor.pk, 'quantity': 2, 'unit_cost': '10.00', 'notes': 'Outdoor',
+        })
+        self.assertEqual(response.status_code, 201, response.content)
+        item = response.json()['item']
+        self.assertEqual(item['total_cost'], '20.00')
+        self.assertEqual(response.json()['quotation']['hardware_total'], '20.00')
+
+        # Fields missing from the body keep their value
+        response = await self._send('patch', f'{self.url}hardware/{item["id"]}/', {'quantity': 3})
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(
+            {name: response.json()['item'][name] for name in ['quantity', 'unit_cost', 'notes', 'total_cost']},
+            {'quantity': 3, 'unit_cost': '10.00', 'notes': 'Outdoor', 'total_cost': '30.00'}
+        )
+
+        response = await self.async_client.delete(f'{self.url}hardware/{item["id"]}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['deleted'], item['id'])
+        self.assertEqual(response.json()['quotation']['hardware_total'], '0.00')
+        response = await self.async_client.get(f'{self.url}hardware/{item["id"]}/')
+        self.assertEqual(response.status_code, 404)
+
+    async def test_duplicate_line_is_a_validation_error(self):
+        line = {'hardware': self.sensor.pk, 'quantity': 1, 'unit_cost': '10'}
+        self.assertEqual((await self._send('post', f'{self.url}hardware/', line)).status_code, 201)
+        response = await self._send('post', f'{self.url}hardware/', line)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('__all__', response.json()['errors'])
+
+    async def test_invalid_bodies(self):
+        response = await self._send('post', f'{self.url}personnel/', {'hours': 'many'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.json()['errors']), {'category', 'hours', 'hourly_rate'})
+        response = await self._send('post', f'{self.url}hardware/', [1, 2])
+        self.assertEqual(response.json(), {'error': 'Expected a JSON object'})
+
+    async def test_login_and_method_are_required(self):
+        response = await self.async_client.put(self.url)
+        self.assertEqual(response.status_code, 405)
+        self.assertEqual(response['Allow'], 'GET')
+        self.assertEqual((await self.async_client.get(f'{self.url}hardware/')).status_code, 405)
+
+        self.async_client.cookies.clear()
+        response = await self.async_client.get(self.url)
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(response['Location'].startswith(resolve_url(settings.LOGIN_URL)))
+
+    async def test_batch_lists_missing_ids(self):
+        ids = f'{self.quotation.pk},0,{self.other.pk},{self.quotation.pk}'
+        response = await self.async_client.get(f'/api/editor/quotations/batch/?ids={ids}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['id'] for row in response.json()['results']], [self.quotation.pk, self.other.pk])
+        self.assertEqual(response.json()['missing'], [0])
+        response = await self.async_client.get('/api/editor/quotations/batch/?ids=1,x')
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,63 @@
+import io
+from decimal import Decimal
+
+from django.test import TestCase
+
+from ..catalog import sync_catalog
+from ..importers import iter_rows
+from ..models import Hardware
+from .utils import make_hardware
+
+
+class SyncCatalogTests(TestCase):
+    def _sync(self, text, fmt='csv', **kwargs):
+        errors = []
+        stats = sync_catalog(iter_rows(io.StringIO(text), fmt=fmt), stderr=errors.append, **kwargs)
+        return stats, errors
+
+    def test_creates_updates_and_deactivates(self):
+        make_hardware(name='Old', manufacturer='Acme', model_number='OLD-1')
+        make_hardware(name='Sensor', manufacturer='Acme', model_number='S-1', unit_cost='10.00')
+        stats, errors = self._sync(
+            'manufacturer,model_number,name,unit_cost\n'
+            'Acme,S-1,Sensor,12.50\n'
+            'Acme,G-1,Gateway,99.00\n'
+        )
+        self.assertEqual((stats.created, stats.updated, stats.deactivated, stats.errors), (1, 1, 1, 0))
+        self.assertEqual(Hardware.objects.get(model_number='S-1').unit_cost, Decimal('12.50'))
+        self.assertFalse(Hardware.objects.get(model_number='OLD-1').is_active)
+
+    def test_json_rows_with_different_keys(self):
+        make_hardware(name='Sensor', manufacturer='Acme', model_number='S-1', unit_cost='10.00')
+        make_hardware(name='Gateway', manufacturer='Acme', model_number='G-1', unit_cost='90.00')
+        stats, errors = self._sync(
+            '[{"manufacturer": "Acme", "model_number": "S-1", "unit_cost": "12.00"},'
+            ' {"manufacturer": "Acme", "model_number": "G-1", "description": "LoRa gateway", "lead_time_days": 5}]',
+            fmt='json', batch_size=2,
+        )
+        self.assertEqual((stats.updated, stats.errors), (2, 0), errors)
+        sensor, gateway = Hardware.objects.filter(manufacturer='Acme').order_by('-model_number')
+        self.assertEqual((sensor.unit_cost, sensor.description), (Decimal('12.00'), ''))
+        self.assertEqual(
+            (gateway.unit_cost, gateway.description, gateway.lead_time_days), (Decimal('90.00'), 'LoRa gateway', 5)
+        )
+
+    def test_invalid_rows_are_skipped_and_counted(self):
+        make_hardware(name='Sensor', manufacturer='Acme', model_number='S-1', unit_cost='10.00')
+        stats, errors = self._sync(
+            'manufacturer,model_number,unit_cost,lead_time_days,minimum_order_quantity\n'
+            'Acme,N-1,-5.00,1,1\n'
+            'Acme,N-2,NaN,1,1\n'
+            'Acme,N-3,1e20,1,1\n'
+            'Acme,N-4,5.00,-3,1\n'
+            'Acme,N-5,5.00,1.5,1\n'
+            'Acme,N-6,5.00,1,-1\n'
+            'Acme,N-7,5.00,2,1\n'
+        )
+        self.assertEqual((stats.rows, stats.created, stats.errors), (7, 1, 6))
+        self.assertEqual(len(errors), 6)
+        self.assertEqual(list(Hardware.objects.filter(model_number__startswith='N-').values_list(
+            'model_number', flat=True
+        )), ['N-7'])
+        # A file with bad rows never deactivates SKUs it did not mention
+        self.assertTrue(Hardware.objects.get(model_number='S-1').is_active)
@@ -0,0 +1,82 @@
+from decimal import Decimal
+from unittest import mock
+
+from django.db import IntegrityError, connection
+from django.test import TestCase
+
+from .. import cloning
+from ..cloning import apply_template, clone_to_requests
+from ..models import Quotation
+from ..stats import get_counters, reconcile_counters
+from .utils import (
+    add_hardware, add_personnel, make_category, make_hardware, make_quotation, make_request, make_user
+)
+
+
+class CloneTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.sensor = make_hardware(name='Sensor', unit_cost='10.00')
+        self.engineer = make_category(hourly_rate='50.00')
+        self.template = make_quotation(self.user, markup_percentage=Decimal('10'))
+        add_hardware(self.template, self.sensor, quantity=2)
+        add_personnel(self.template, self.engineer, hours='1')
+        reconcile_counters()
+
+    def _clone_to_two_requests(self):
+        before = get_counters()['total_quotations']
+        result = clone_to_requests(self.template, [make_request(), make_request()], self.user)
+        self.assertEqual(get_counters()['total_quotations'], before + 2)
+        self.assertEqual(reconcile_counters(), {})
+        for quotation in Quotation.objects.filter(pk__in=[quotation.pk for quotation in result.quotations]):
+            self.assertEqual(quotation.hardware_total, Decimal('20.00'))
+            self.assertEqual(quotation.total_amount, Decimal('77.00'))
+        return result
+
+    def test_counter_on_the_bulk_insert_path(self):
+        self.assertEqual(self._clone_to_two_requests().lines, 4)
+
+    def test_counter_on_the_save_path(self):
+        # Backends that cannot return the new keys from a bulk insert save one by one
+        with mock.patch.object(
+            type(connection.features), 'can_return_rows_from_bulk_insert', new_callable=mock.PropertyMock,
+            return_value=False,
+        ):
+            self.assertEqual(self._clone_to_two_requests().lines, 4)
+
+
+class ApplyTemplateTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.sensor = make_hardware(name='Sensor', unit_cost='10.00')
+        self.gateway = make_hardware(name='Gateway', unit_cost='30.00')
+        self.template = make_quotation(self.user)
+        add_hardware(self.template, self.sensor)
+        add_hardware(self.template, self.gateway)
+        self.quotation = make_quotation(self.user)
+
+    def test_lines_already_on_the_quotation_are_skipped(self):
+        add_hardware(self.quotation, self.sensor, quantity=5)
+        result = apply_template(self.template, self.quotation)
+        self.assertEqual(result.lines, 1)
+        self.assertEqual(result.skipped, [{'type': 'hardware', 'id': self.sensor.pk}])
+        self.assertEqual(self.quotation.hardware_total, Decimal('80.00'))
+
+    def test_line_added_by_a_concurrent_apply_is_skipped(self):
+        apply_lines = cloning._apply_lines
+
+        def conflict_first(*args):
+            if not self.quotation.hardware_items.exists():
+                # Another request added the gateway between this one's read and insert
+                add_hardware(self.quotation, self.gateway, quantity=3)
+                raise IntegrityError('UNIQUE constraint failed')
+            return apply_lines(*args)
+
+        with mock.patch.object(cloning, '_apply_lines', side_effect=conflict_first):
+            result = apply_template(self.template, self.quotation)
+        self.assertEqual(result.skipped, [{'type': 'hardware', 'id': self.gateway.pk}])
+        self.assertEqual(
+            sorted(self.quotation.hardware_items.values_list('hardware__name', 'quantity')),
+            [('Gateway', 3), ('Sensor', 1)]
+        )
+        self.assertEqual(self.quotation.hardware_total, Decimal('100.00'))
@@ -0,0 +1,53 @@
+from datetime import date
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.test import TestCase
+
+from .. import currency
+from ..forms import QuotationForm
+from ..models import ExchangeRate
+from .utils import add_hardware, make_hardware, make_quotation, make_user
+
+
+class QuotationCurrencyTests(TestCase):
+    def setUp(self):
+        currency.invalidate()
+        self.addCleanup(currency.invalidate)
+        self.quotation = make_quotation(make_user())
+        add_hardware(self.quotation, make_hardware(unit_cost='10.00', currency='USD'))
+
+    def _form(self, code):
+        return QuotationForm({
+            'currency': code, 'markup_percentage': '0', 'tax_percentage': '0',
+        }, instance=self.quotation)
+
+    def test_currency_code_is_a_field_error(self):
+        form = self._form('dollars')
+        self.assertFalse(form.is_valid())
+        self.assertIn('currency', form.errors)
+        self.assertTrue(self._form(' usd ').is_valid())
+
+    def test_switching_without_a_rate_is_a_field_error(self):
+        form = self._form('GBP')
+        self.assertFalse(form.is_valid())
+        self.assertIn('No USD->GBP exchange rate', form.errors['currency'][0])
+        self.quotation.refresh_from_db()
+        self.assertEqual(self.quotation.currency, 'USD')
+
+    def test_switching_with_a_rate_converts_the_lines(self):
+        ExchangeRate.objects.create(
+            from_currency='USD', to_currency='GBP', rate=Decimal('0.5'), effective_date=date(2000, 1, 1)
+        )
+        form = self._form('gbp')
+        self.assertTrue(form.is_valid(), form.errors)
+        form.save()
+        self.quotation.refresh_from_db()
+        self.assertEqual(self.quotation.currency, 'GBP')
+        self.assertEqual(self.quotation.hardware_total, Decimal('5.00'))
+
+    def test_model_clean(self):
+        self.quotation.currency = 'EUR'
+        with self.assertRaises(ValidationError) as raised:
+            self.quotation.full_clean()
+        self.assertIn('currency', raised.exception.message_dict)
@@ -0,0 +1,89 @@
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from .. import documents
+from ..documents import DocumentError, _write_atomic, get_document, prune_documents
+from .utils import add_hardware, make_hardware, make_quotation, make_user
+
+
+class DocumentTests(TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+        settings = override_settings(QUOTATION_DOCUMENT_CACHE_DIR=self.cache_dir)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.user = make_user()
+        self.quotation = make_quotation(self.user)
+        add_hardware(self.quotation, make_hardware(name='Sensor'))
+
+    def test_unchanged_quotations_are_served_from_the_cache(self):
+        rendered = get_document(self.quotation, 'html')
+        self.assertFalse(rendered.cached)
+        self.assertIn(b'Sensor', rendered.path.read_bytes())
+
+        with mock.patch.object(documents, 'render_html') as render:
+            cached = get_document(self.quotation, 'html')
+        render.assert_not_called()
+        self.assertTrue(cached.cached)
+        self.assertEqual(cached.path, rendered.path)
+
+        self.quotation.notes = 'Delivery in March'
+        self.quotation.save()
+        changed = get_document(self.quotation, 'html')
+        self.assertFalse(changed.cached)
+        self.assertNotEqual(changed.digest, rendered.digest)
+
+    def test_writes_are_atomic(self):
+        path = Path(self.cache_dir) / 'html' / 'ab' / 'document.html'
+        _write_atomic(path, b'first')
+        with mock.patch.object(os, 'replace', side_effect=OSError('disk full')):
+            with self.assertRaises(OSError):
+                _write_atomic(path, b'second')
+        self.assertEqual(path.read_bytes(), b'first')
+        # The half-written temporary file is removed
+        self.assertEqual(os.listdir(path.parent), ['document.html'])
+
+    def test_prune_removes_documents_not_used_recently(self):
+        old = get_document(self.quotation, 'html').path
+        past = time.time() - 31 * 86400
+        os.utime(old, (past, past))
+        add_hardware(self.quotation, make_hardware(name='Gateway'))
+        recent = get_document(self.quotation, 'html').path
+
+        self.assertEqual(prune_documents(max_age_days=30), 1)
+        self.assertFalse(old.exists())
+        self.assertTrue(recent.exists())
+
+    def test_conditional_download(self):
+        self.client.force_login(self.user)
+        url = f'/quotations/{self.quotation.pk}/document.html'
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        response.close()
+        etag = response['ETag']
+
+        for if_none_match in [etag, f'W/{etag}', f'"other", {etag}', '*']:
+            with self.subTest(if_none_match=if_none_match):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=if_none_match)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response['ETag'], etag)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=f'"x{etag[1:]}')
+        self.assertEqual(response.status_code, 200)
+        response.close()
+
+    def test_render_errors_are_not_implemented_responses(self):
+        self.client.force_login(self.user)
+        error = DocumentError('PDF export requires WeasyPrint (pip install weasyprint)')
+        with mock.patch.object(documents, 'render_pdf', side_effect=error):
+            response = self.client.get(f'/quotations/{self.quotation.pk}/document.pdf')
+        self.assertEqual(response.status_code, 501)
+        self.assertEqual(response.content.decode(), str(error))
+        self.assertFalse(list(Path(self.cache_dir).rglob('*.pdf')))
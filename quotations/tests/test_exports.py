@@ -0,0 +1,91 @@
+import csv
+import io
+import zipfile
+from datetime import date, datetime
+from unittest import mock
+from xml.etree import ElementTree
+
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+
+from ..exports import LINE_HEADER, _csv_text, export_chunks, filter_quotations, line_rows, quotation_rows
+from ..instrumentation import QueryRecorder
+from ..models import Quotation
+from .utils import add_hardware, add_personnel, make_category, make_hardware, make_quotation, make_request, make_user
+
+SHEET_NS = {'s': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'}
+
+
+def _created(quotation, moment):
+    Quotation.objects.filter(pk=quotation.pk).update(created_date=timezone.make_aware(moment))
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.quotation = make_quotation(self.user, make_request(customer_name='=HYPERLINK("http://x")'))
+        add_hardware(self.quotation, make_hardware(name='Sensor', model_number='S-1'), quantity=2)
+        add_personnel(self.quotation, make_category(name='Engineer'), hours='3')
+
+    def _csv(self, dataset, quotations=None):
+        content = b''.join(export_chunks(dataset, 'csv', quotations or Quotation.objects.all())).decode()
+        return list(csv.reader(io.StringIO(content.lstrip('\ufeff'))))
+
+    def test_csv_text_that_spreadsheets_would_evaluate_is_escaped(self):
+        for value in ['=1+1', '+1', '-1', '@SUM(A1)', '\tx', '\rx']:
+            self.assertEqual(_csv_text(value), "'" + value)
+        self.assertEqual(_csv_text('Sensor-1'), 'Sensor-1')
+        self.assertEqual(_csv_text(-1), -1)
+        header, row = self._csv('quotations')
+        self.assertEqual(row[header.index('customer_name')], '\'=HYPERLINK("http://x")')
+
+    def test_xlsx_is_a_valid_workbook(self):
+        add_hardware(make_quotation(self.user), make_hardware(name='Gateway <Hub> & Co'))
+        content = b''.join(export_chunks('lines', 'xlsx', Quotation.objects.all(), chunk_size=1))
+        with zipfile.ZipFile(io.BytesIO(content)) as workbook:
+            self.assertIsNone(workbook.testzip())
+            self.assertIn('[Content_Types].xml', workbook.namelist())
+            sheet = ElementTree.fromstring(workbook.read('xl/worksheets/sheet1.xml'))
+        rows = [
+            [''.join(cell.itertext()) for cell in row.findall('s:c', SHEET_NS)]
+            for row in sheet.iterfind('s:sheetData/s:row', SHEET_NS)
+        ]
+        self.assertEqual(rows[0], LINE_HEADER)
+        self.assertEqual(len(rows), 4)
+        self.assertIn('Gateway <Hub> & Co', [row[LINE_HEADER.index('item')] for row in rows])
+
+    def test_rows_are_paged_by_primary_key_without_server_side_cursors(self):
+        for _ in range(4):
+            make_quotation(self.user)
+        quotations = Quotation.objects.all()
+        expected = list(quotation_rows(quotations, chunk_size=2))
+        with mock.patch.dict(connection.settings_dict, {'DISABLE_SERVER_SIDE_CURSORS': True}):
+            with QueryRecorder() as recorder:
+                rows = list(quotation_rows(quotations, chunk_size=2))
+        self.assertEqual(rows, expected)
+        self.assertEqual(len(rows), 6)
+        # Three pages of at most two rows, then an empty one
+        self.assertEqual(recorder.count, 4)
+
+    def test_created_to_includes_the_whole_day(self):
+        _created(self.quotation, datetime(2024, 3, 10, 23, 59, 59))
+        _created(make_quotation(self.user), datetime(2024, 3, 11))
+        _created(make_quotation(self.user), datetime(2024, 3, 9, 23, 59, 59))
+        quotations = filter_quotations(
+            Quotation.objects.all(), created_from=date(2024, 3, 10), created_to=date(2024, 3, 10)
+        )
+        self.assertEqual(list(quotations.values_list('pk', flat=True)), [self.quotation.pk])
+
+        self.client.force_login(self.user)
+        response = self.client.get('/quotations/export/quotations.csv?from=2024-03-10&to=2024-03-10')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))), 2)
+
+    def test_personnel_lines_have_a_blank_model_number(self):
+        header, *rows = list(line_rows(Quotation.objects.all()))
+        by_type = {row[header.index('type')]: row for row in rows}
+        self.assertEqual(by_type['hardware'][header.index('model_number')], 'S-1')
+        self.assertEqual(by_type['personnel'][header.index('model_number')], '')
+        self.assertEqual(by_type['personnel'][header.index('item')], 'Engineer')
+        self.assertEqual(len(by_type['personnel']), len(LINE_HEADER))
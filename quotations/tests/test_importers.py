@@ -0,0 +1,92 @@
+import io
+import json
+from decimal import Decimal
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+
+from .. import importers
+from ..importers import BomImportError, import_bom, iter_rows
+from .utils import make_category, make_hardware, make_quotation, make_user
+
+
+class ImportBomTests(TestCase):
+    def setUp(self):
+        self.quotation = make_quotation(make_user())
+        make_hardware(name='Sensor', model_number='S-1', unit_cost='10.00')
+        make_category(name='Engineer', hourly_rate='50.00')
+
+    def _import(self, text, fmt='csv'):
+        return import_bom(self.quotation, io.StringIO(text), fmt)
+
+    def test_imports_hardware_and_personnel(self):
+        result = self._import(
+            'type,model_number,name,quantity,hours\n'
+            'hardware,S-1,,3,\n'
+            'personnel,,Engineer,,2.5\n'
+        )
+        self.assertEqual(result.as_dict(), {'created': 2, 'updated': 0, 'errors': []})
+        self.quotation.refresh_from_db()
+        self.assertEqual(self.quotation.hardware_total, Decimal('30.00'))
+        self.assertEqual(self.quotation.personnel_total, Decimal('125.00'))
+
+    def test_invalid_numbers_are_reported_per_row(self):
+        make_hardware(name='Gateway', model_number='G-1')
+        make_category(name='Tester')
+        result = self._import(
+            'type,model_number,name,quantity,unit_cost,hours,hourly_rate\n'
+            'hardware,S-1,,1,Infinity,,\n'
+            'hardware,G-1,,1,1e30,,\n'
+            'personnel,,Engineer,,,NaN,\n'
+            'personnel,,Tester,,,1,-5\n'
+        )
+        self.assertEqual(
+            [(error['line'], error['error'].split(':')[0].split()[0]) for error in result.errors],
+            [(2, 'unit_cost'), (3, 'unit_cost'), (4, 'hours'), (5, 'hourly_rate')]
+        )
+        self.assertEqual(result.created, 0)
+        self.assertFalse(self.quotation.hardware_items.exists())
+
+    def test_rejects_negative_cost_and_fractional_quantity(self):
+        for row, message in [
+            ('S-1,1,-1.00', 'unit_cost must not be negative'),
+            ('S-1,1.5,', 'quantity'),
+            ('S-1,-2,', 'quantity'),
+            ('S-1,1,1.234', 'unit_cost'),
+            ('S-1,99999999,99999999.99', 'total_cost'),
+        ]:
+            with self.subTest(row=row):
+                result = self._import(f'model_number,quantity,unit_cost\n{row}\n')
+                self.assertEqual(len(result.errors), 1)
+                self.assertIn(message, result.errors[0]['error'])
+
+    def test_rejects_hours_below_minimum(self):
+        result = self._import('[{"type": "personnel", "name": "Engineer", "hours": 0}]', fmt='json')
+        self.assertEqual(len(result.errors), 1)
+        self.assertIn('hours', result.errors[0]['error'])
+
+
+class IterRowsTests(SimpleTestCase):
+    def _rows(self, text, fmt='json'):
+        return list(iter_rows(io.StringIO(text), fmt))
+
+    def test_json_array_items_are_decoded_one_at_a_time(self):
+        items = [{'model_number': f'S-{number}', 'quantity': 10 ** number, 'notes': 'a, b] {c}'} for number in range(8)]
+        text = ' [ ' + ' ,\n'.join(json.dumps(item) for item in items) + ' ] \n'
+        stream = io.StringIO(text)
+        with mock.patch.object(importers, 'JSON_CHUNK_SIZE', 7):
+            rows = iter_rows(stream, 'json')
+            self.assertEqual(next(rows), (1, {'model_number': 'S-0', 'quantity': '1', 'notes': 'a, b] {c}'}))
+            self.assertLess(stream.tell(), len(text) // 4)
+            self.assertEqual([row['quantity'] for _, row in rows], [str(10 ** number) for number in range(1, 8)])
+        self.assertEqual(self._rows('[ ]'), [])
+
+    def test_invalid_json_arrays(self):
+        for text in ['[{"a": 1},]', '[{"a": 1}', '[{"a": 1} {"a": 2}]', '[{"a": 1}] []', '[1]', '[{"a": tru}]']:
+            with self.subTest(text=text):
+                with self.assertRaises(BomImportError):
+                    self._rows(text)
+
+    def test_csv_errors_are_import_errors(self):
+        with self.assertRaisesMessage(BomImportError, 'Invalid CSV on line'):
+            self._rows('model_number,notes\nS-1,' + 'x' * 200000 + '\n', fmt='csv')
@@ -0,0 +1,100 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .. import jobs
+from ..jobs import IdempotencyKeyReused, JobContext, Worker, enqueue, prune_jobs, scoped_idempotency_key
+from ..models import Job
+from .utils import make_quotation, make_user
+
+BOM = 'model_number,quantity\nS-1,1\n'
+
+
+class EnqueueTests(TestCase):
+    def test_same_key_and_arguments_return_the_same_job(self):
+        first = enqueue('recalculate_quotations', idempotency_key='k', quotation_ids=[1])
+        self.assertEqual(enqueue('recalculate_quotations', idempotency_key='k', quotation_ids=[1]), first)
+        self.assertEqual(Job.objects.count(), 1)
+
+    def test_key_reused_for_other_arguments(self):
+        enqueue('recalculate_quotations', idempotency_key='k', quotation_ids=[1])
+        with self.assertRaises(IdempotencyKeyReused):
+            enqueue('recalculate_quotations', idempotency_key='k', quotation_ids=[2])
+
+    def test_scoped_keys(self):
+        user, other = make_user(), make_user('other')
+        key = scoped_idempotency_key('k', user, 'import_bom', 1)
+        self.assertNotEqual(key, scoped_idempotency_key('k', other, 'import_bom', 1))
+        self.assertNotEqual(key, scoped_idempotency_key('k', user, 'import_bom', 2))
+        self.assertNotEqual(key, scoped_idempotency_key('k', user, 'reprice', 1))
+        self.assertLessEqual(len(scoped_idempotency_key('k' * 500, user, 'import_bom', 1)), 200)
+        self.assertIsNone(scoped_idempotency_key('', user, 'import_bom', 1))
+
+
+class WorkerTests(TestCase):
+    def _finished(self, status, days_ago):
+        job = enqueue('recalculate_quotations')
+        Job.objects.filter(pk=job.pk).update(status=status, finished_date=timezone.now() - timedelta(days=days_ago))
+        return job
+
+    def test_reprice_renews_the_lease_after_each_batch(self):
+        user = make_user()
+        for _ in range(3):
+            make_quotation(user)
+        job = enqueue('reprice_quotations', batch_size=1)
+        with mock.patch.object(jobs, 'PROGRESS_INTERVAL', 0):
+            with mock.patch.object(JobContext, 'progress', autospec=True, side_effect=JobContext.progress) as progress:
+                self.assertEqual(Worker().run(burst=True), 1)
+        self.assertEqual([call.args[1:3] for call in progress.call_args_list], [(0, 3), (1, 3), (2, 3), (3, 3)])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.progress_current, job.progress_total), ('succeeded', 3, 3))
+
+    @override_settings(JOB_RETENTION_DAYS=14)
+    def test_finished_jobs_are_pruned_after_the_retention(self):
+        kept = [self._finished('succeeded', 13), enqueue('recalculate_quotations')]
+        Job.objects.filter(pk=kept[1].pk).update(created_date=timezone.now() - timedelta(days=30))
+        self._finished('succeeded', 15)
+        self._finished('failed', 15)
+        with override_settings(JOB_RETENTION_DAYS=None):
+            self.assertEqual(prune_jobs(), 0)
+        self.assertEqual(prune_jobs(), 2)
+        self.assertEqual(set(Job.objects.values_list('pk', flat=True)), {job.pk for job in kept})
+        self.assertEqual(prune_jobs(max_age_days=10), 1)
+
+    def test_workers_prune_finished_jobs(self):
+        self._finished('succeeded', 30)
+        self.assertEqual(Worker().run(burst=True), 0)
+        self.assertFalse(Job.objects.exists())
+
+
+class BackgroundImportTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.client.force_login(self.user)
+
+    def _import(self, quotation, content=BOM, key='retry-1'):
+        return self.client.post(
+            f'/quotations/{quotation.pk}/import/?background=1&format=csv', content,
+            content_type='text/csv', HTTP_IDEMPOTENCY_KEY=key,
+        )
+
+    def test_key_is_scoped_to_the_quotation_and_user(self):
+        first, second = make_quotation(self.user), make_quotation(self.user)
+        job_id = self._import(first).json()['id']
+        self.assertEqual(self._import(first).json()['id'], job_id)
+        self.assertNotEqual(self._import(second).json()['id'], job_id)
+
+        self.client.force_login(make_user('other'))
+        response = self._import(first)
+        self.assertEqual(response.status_code, 202)
+        self.assertNotEqual(response.json()['id'], job_id)
+        self.assertEqual(Job.objects.count(), 3)
+
+    def test_key_reused_for_another_upload_is_a_conflict(self):
+        quotation = make_quotation(self.user)
+        self.assertEqual(self._import(quotation).status_code, 202)
+        response = self._import(quotation, content='model_number,quantity\nS-1,5\n')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(Job.objects.count(), 1)
@@ -0,0 +1,105 @@
+import threading
+
+from django.db import OperationalError, connection, connections, transaction
+from django.test import TransactionTestCase, override_settings
+from django.utils import timezone
+
+from .. import numbering
+from ..models import NumberSequence
+from ..numbering import QUOTATION_SEQUENCE, next_number
+from .utils import make_quotation, make_user
+
+
+def _value(number):
+    return int(number.rsplit('-', 1)[1])
+
+
+@override_settings(NUMBER_BLOCK_SIZE=5)
+class NumberAllocationTests(TransactionTestCase):
+    def setUp(self):
+        numbering._blocks.clear()
+        self.addCleanup(numbering._blocks.clear)
+
+    def _stored_next_value(self):
+        return NumberSequence.objects.get(prefix='Q', year=timezone.localdate().year).next_value
+
+    def test_a_block_is_reserved_with_one_update(self):
+        first = next_number(QUOTATION_SEQUENCE)
+        self.assertEqual(first, f'Q-{timezone.localdate().year}-000001')
+        self.assertEqual(self._stored_next_value(), 6)
+        with self.assertNumQueries(0):
+            rest = [next_number(QUOTATION_SEQUENCE) for _ in range(4)]
+        self.assertEqual([_value(number) for number in rest], [2, 3, 4, 5])
+        self.assertEqual(_value(next_number(QUOTATION_SEQUENCE)), 6)
+        self.assertEqual(self._stored_next_value(), 11)
+
+    def test_starts_after_numbers_issued_by_hand(self):
+        user = make_user()
+        make_quotation(user, quotation_number=f'Q-{timezone.localdate().year}-000041')
+        numbering._blocks.clear()
+        NumberSequence.objects.all().delete()
+        self.assertEqual(_value(make_quotation(user).quotation_number), 42)
+
+    def test_a_rolled_back_reservation_is_not_handed_out(self):
+        try:
+            with transaction.atomic():
+                taken = next_number(QUOTATION_SEQUENCE)
+                raise ValueError
+        except ValueError:
+            pass
+        # The UPDATE rolled back with the block, so the values are reserved again
+        self.assertEqual(numbering._blocks, {})
+        self.assertEqual(next_number(QUOTATION_SEQUENCE), taken)
+
+    def test_the_rest_of_a_block_is_released_on_commit(self):
+        with transaction.atomic():
+            next_number(QUOTATION_SEQUENCE)
+            self.assertEqual(numbering._blocks, {})
+        self.assertEqual(len(numbering._blocks[(connection.alias, 'Q', timezone.localdate().year)]), 4)
+
+    def test_numbers_are_unique_across_threads(self):
+        threads, per_thread = 4, 25
+        numbers, errors = [], []
+        lock = threading.Lock()
+
+        def allocate():
+            try:
+                for _ in range(per_thread):
+                    # SQLite reports a busy shared-cache table at once; try again
+                    while True:
+                        try:
+                            with transaction.atomic():
+                                number = next_number(QUOTATION_SEQUENCE)
+                            break
+                        except OperationalError:
+                            continue
+                    with lock:
+                        numbers.append(number)
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connections.close_all()
+
+        workers = [threading.Thread(target=allocate) for _ in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(numbers), threads * per_thread)
+        self.assertEqual(len(set(numbers)), len(numbers))
+
+    def test_admin_does_not_accept_numbers_by_hand(self):
+        user = make_user()
+        quotation = make_quotation(user)
+        self.client.force_login(user)
+        for url in [
+            f'/admin/quotations/quotation/{quotation.pk}/change/',
+            f'/admin/quotations/customerquotationrequest/{quotation.customer_request_id}/change/',
+        ]:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotIn('quotation_number', response.context['adminform'].form.fields)
+                self.assertNotIn('request_number', response.context['adminform'].form.fields)
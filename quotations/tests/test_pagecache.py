@@ -0,0 +1,61 @@
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase
+
+from .. import routers
+from ..pagecache import cache_catalog_page, catalog_version
+from ..routers import use_replica
+from .utils import make_hardware, make_user, with_page_templates
+
+
+@cache_catalog_page(lambda request: None)
+@use_replica
+def replica_probe(request):
+    return HttpResponse(str(routers._reads_from_replica()))
+
+
+@with_page_templates
+class CatalogPageCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        make_hardware(name='Temperature Sensor', model_number='T-1')
+
+    def test_version_is_bumped_after_commit(self):
+        before = catalog_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                make_hardware(name='Gateway Hub')
+                self.assertEqual(catalog_version(), before)
+        self.assertNotEqual(catalog_version(), before)
+
+    def test_rolled_back_change_keeps_the_version(self):
+        before = catalog_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    make_hardware(name='Gateway Hub')
+                    raise ValueError
+            except ValueError:
+                pass
+        self.assertEqual(catalog_version(), before)
+
+    def test_key_ignores_unknown_and_reordered_parameters(self):
+        self.assertEqual(self.client.get('/hardware/?category=Sensors&utm_source=mail&search=').status_code, 200)
+        with self.assertNumQueries(0):
+            self.client.get('/hardware/?search=&category=Sensors&utm_source=feed')
+        with self.assertNumQueries(0):
+            self.client.get('/hardware/?category=Sensors&search=&_=1')
+        response = self.client.get('/hardware/?category=Gateways')
+        self.assertNotContains(response, 'Temperature Sensor')
+
+    def test_misses_are_rendered_from_the_primary(self):
+        request = RequestFactory().get('/probe/')
+        request.user = AnonymousUser()
+        self.assertEqual(replica_probe(request).content, b'False')
+
+        # Signed-in users are never cached and keep reading from the replica
+        request = RequestFactory().get('/probe/')
+        request.user = make_user()
+        self.assertEqual(replica_probe(request).content, b'True')
@@ -0,0 +1,70 @@
+from decimal import Decimal
+
+from django.test import TestCase
+
+from ..instrumentation import QueryRecorder
+from ..models import CustomerQuotationRequest, Quotation
+from .utils import add_hardware, add_personnel, make_category, make_hardware, make_quotation, make_user
+
+
+class QuotationTotalsTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.quotation = make_quotation(self.user, markup_percentage=Decimal('10'), tax_percentage=Decimal('20'))
+
+    def test_line_items_update_totals(self):
+        add_hardware(self.quotation, make_hardware(unit_cost='5.50'), quantity=2)
+        add_personnel(self.quotation, make_category(hourly_rate='40.00'), hours='2')
+        self.quotation.refresh_from_db()
+        self.assertEqual(self.quotation.hardware_total, Decimal('11.00'))
+        self.assertEqual(self.quotation.personnel_total, Decimal('80.00'))
+        self.assertEqual(self.quotation.subtotal, Decimal('100.10'))
+        self.assertEqual(self.quotation.total_amount, Decimal('120.12'))
+
+    def test_deleting_a_line_item_subtracts_it(self):
+        line = add_hardware(self.quotation, make_hardware(unit_cost='5.50'), quantity=2)
+        line.delete()
+        self.quotation.refresh_from_db()
+        self.assertEqual(self.quotation.hardware_total, Decimal('0.00'))
+        self.assertEqual(self.quotation.total_amount, Decimal('0.00'))
+
+    def test_deleting_the_catalog_item_subtracts_its_lines(self):
+        hardware = make_hardware(unit_cost='5.50')
+        add_hardware(self.quotation, hardware, quantity=2)
+        add_hardware(self.quotation, make_hardware(name='Gateway', unit_cost='1.00'))
+        hardware.delete()
+        self.quotation.refresh_from_db()
+        self.assertEqual(self.quotation.hardware_total, Decimal('1.00'))
+
+    def test_lines_deleted_with_their_quotation_skip_the_totals_update(self):
+        origins = {
+            'quotation': lambda quotation: quotation,
+            'quotations': lambda quotation: Quotation.objects.filter(pk=quotation.pk),
+            'request': lambda quotation: quotation.customer_request,
+            'requests': lambda quotation: CustomerQuotationRequest.objects.filter(pk=quotation.customer_request_id),
+            'creator': lambda quotation: quotation.created_by,
+        }
+        for name, origin in origins.items():
+            with self.subTest(origin=name):
+                quotation = make_quotation(make_user(f'author-{name}'))
+                for number in range(3):
+                    add_hardware(quotation, make_hardware(name=f'{name} {number}'))
+                with QueryRecorder() as recorder:
+                    origin(quotation).delete()
+                self.assertFalse(Quotation.objects.filter(pk=quotation.pk).exists())
+                self.assertEqual([sql for sql in recorder.statements if '"hardware_total" =' in sql], [])
+
+    def test_saving_a_stale_instance_keeps_line_totals(self):
+        stale = Quotation.objects.get(pk=self.quotation.pk)
+        add_hardware(self.quotation, make_hardware(unit_cost='5.50'), quantity=2)
+
+        stale.notes = 'Edited elsewhere'
+        stale.markup_percentage = Decimal('0')
+        stale.save()
+
+        self.quotation.refresh_from_db()
+        self.assertEqual(self.quotation.notes, 'Edited elsewhere')
+        self.assertEqual(self.quotation.hardware_total, Decimal('11.00'))
+        self.assertEqual(self.quotation.subtotal, Decimal('11.00'))
+        self.assertEqual(self.quotation.total_amount, Decimal('13.20'))
+        self.assertEqual(stale.hardware_total, Decimal('11.00'))
@@ -0,0 +1,153 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+from ..instrumentation import QueryRecorder, assert_max_queries, assert_within_query_budget
+from ..stats import reconcile_counters
+from .utils import (
+    add_hardware, add_personnel, make_category, make_hardware, make_quotation, make_request, make_user,
+    with_page_templates
+)
+
+ROWS = 12
+
+
+@with_page_templates
+class QueryBudgetTests(TestCase):
+    """Every page and API view stays within its declared ``@query_budget``"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user()
+        cls.hardware = make_hardware(name='Temperature Sensor', model_number='T-1')
+        cls.category = make_category()
+        for number in range(ROWS):
+            cls.quotation = make_quotation(cls.user, make_request(status='pending'))
+            add_hardware(cls.quotation, cls.hardware)
+            add_personnel(cls.quotation, cls.category)
+        cls.customer_request = cls.quotation.customer_request
+        reconcile_counters()
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def assertWithinBudget(self, *paths):
+        for path in paths:
+            with self.subTest(path=path):
+                response = assert_within_query_budget(self.client, path, max_duplicates=0)
+                self.assertEqual(response.status_code, 200)
+
+    def _count(self, path):
+        with QueryRecorder() as recorder:
+            self.assertEqual(self.client.get(path).status_code, 200)
+        return recorder.count
+
+    def test_pages(self):
+        self.assertWithinBudget(
+            '/',
+            '/requests/',
+            '/requests/?status=pending',
+            '/requests/?search=warehouse',
+            '/requests/?search=warehouse&page=2',
+            f'/requests/{self.customer_request.pk}/',
+            f'/requests/{self.customer_request.pk}/description/',
+            '/quotations/',
+            '/quotations/?approval=pending',
+            '/quotations/?search=warehouse',
+            '/quotations/?page=2',
+            f'/quotations/{self.quotation.pk}/',
+            f'/quotations/{self.quotation.pk}/items/',
+            '/hardware/',
+            '/hardware/?category=Sensors',
+            '/hardware/?search=temp',
+            '/hardware/?search=temp&page=2',
+            f'/hardware/{self.hardware.pk}/',
+            f'/hardware/{self.hardware.pk}/specs/',
+        )
+
+    def test_anonymous_catalog_pages_on_miss_and_hit(self):
+        self.client.logout()
+        for path in [
+            '/hardware/', '/hardware/?search=temp', f'/hardware/{self.hardware.pk}/',
+            f'/hardware/{self.hardware.pk}/specs/',
+        ]:
+            self.assertWithinBudget(path, path)
+
+    def test_api(self):
+        self.assertWithinBudget(
+            '/api/requests/',
+            '/api/requests/?search=warehouse',
+            '/api/quotations/',
+            '/api/quotations/?search=warehouse',
+            '/api/hardware/',
+            '/api/hardware/?search=temp',
+            '/api/hardware/search/?q=sensor',
+            '/api/hardware/typeahead/?q=sen',
+            '/api/personnel/categories/',
+            '/api/approvals/technical/',
+            *[
+                f'/api/reports/{name}/?from={timezone.localdate():%Y-%m}&to={timezone.localdate():%Y-%m}'
+                for name in ['quotations', 'win-rate', 'hardware-spend', 'personnel-hours']
+            ],
+            '/api/jobs/',
+        )
+
+    def test_editor_api(self):
+        self.assertWithinBudget(
+            '/api/editor/quotations/',
+            f'/api/editor/quotations/{self.quotation.pk}/',
+            '/api/editor/hardware/search/?q=sensor',
+        )
+
+    def test_quotation_detail_renders_the_line_items(self):
+        add_hardware(self.quotation, make_hardware(name='Gateway Hub', model_number='G-1'))
+        response = self.client.get(f'/quotations/{self.quotation.pk}/')
+        self.assertContains(response, 'Temperature Sensor')
+        self.assertContains(response, 'Gateway Hub')
+        self.assertContains(response, self.category.name)
+
+    def test_search_results_are_numbered_pages_without_a_count(self):
+        first = self.client.get('/requests/?search=warehouse').context['page_obj']
+        self.assertEqual((len(first), first.number, first.has_next(), first.has_previous()), (10, 1, True, False))
+        second = self.client.get('/requests/?search=warehouse&page=2').context['page_obj']
+        self.assertEqual((len(second), second.number, second.has_next(), second.has_previous()), (2, 2, False, True))
+        self.assertEqual({row.pk for row in first} & {row.pk for row in second}, set())
+
+    def test_list_counts_do_not_grow_with_rows(self):
+        paths = ['/quotations/', '/requests/', '/hardware/']
+        before = [self._count(path) for path in paths]
+        for number in range(ROWS):
+            make_quotation(self.user, make_request(status='pending'))
+            make_hardware(name=f'Gateway {number}', model_number=f'G-{number}')
+        cache.clear()
+        self.assertEqual([self._count(path) for path in paths], before)
+
+    def test_counts_do_not_grow_with_line_items(self):
+        paths = [
+            f'/quotations/{self.quotation.pk}/',
+            f'/quotations/{self.quotation.pk}/items/',
+            f'/api/editor/quotations/{self.quotation.pk}/',
+        ]
+        before = [self._count(path) for path in paths]
+        for number in range(ROWS):
+            add_hardware(self.quotation, make_hardware(name=f'Gateway {number}', model_number=f'G-{number}'))
+            add_personnel(self.quotation, make_category(name=f'Role {number}'))
+        self.assertEqual([self._count(path) for path in paths], before)
+
+
+class AssertMaxQueriesTests(TestCase):
+    def test_fails_over_budget_and_on_duplicates(self):
+        with assert_max_queries(1) as recorder:
+            User.objects.exists()
+        self.assertEqual(recorder.count, 1)
+
+        with self.assertRaisesMessage(AssertionError, '2 queries executed, budget is 1'):
+            with assert_max_queries(1):
+                User.objects.exists()
+                User.objects.exists()
+        with self.assertRaisesMessage(AssertionError, '1 duplicate queries, budget is 0'):
+            with assert_max_queries(2, max_duplicates=0):
+                User.objects.exists()
+                User.objects.exists()
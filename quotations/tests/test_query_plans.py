@@ -0,0 +1,172 @@
+"""
+Query-plan regression tests for the hot list filters.
+
+Each test runs the real view, admin changelist or helper, captures the SQL
+it issues and runs ``EXPLAIN QUERY PLAN`` on the statements that read the
+tables under test (SQLite). A statement fails when its plan reads one of
+those tables without an index, or, for lists that rely on an index for
+their order, sorts in a temporary B-tree.
+"""
+import re
+import unittest
+from datetime import timedelta
+from urllib.parse import quote
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from ..jobs import Worker, enqueue
+from ..models import Quotation
+from ..pagination import encode_cursor
+from ..pricehistory import reprice_quotations
+from ..rollups import changed_days, recompute_days
+from .utils import (
+    add_hardware, make_category, make_hardware, make_quotation, make_request, make_user, with_page_templates
+)
+
+# 'SCAN t' since SQLite 3.36, 'SCAN TABLE t' before; index scans carry 'USING ...'
+FULL_SCAN_RE = re.compile(r'^SCAN (?:TABLE )?(\w+)$')
+# Also matches 'USE TEMP B-TREE FOR RIGHT PART OF ORDER BY'
+TEMP_SORT_RE = re.compile(r'^USE TEMP B-TREE FOR .*ORDER BY$')
+
+
+def explain(sql):
+    """The detail column of EXPLAIN QUERY PLAN for a captured statement"""
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def plan_problems(plan, tables, ordered=True):
+    problems = []
+    for step in plan:
+        match = FULL_SCAN_RE.match(step)
+        if match and match.group(1) in tables:
+            problems.append(f'full table scan of {match.group(1)}')
+        if ordered and TEMP_SORT_RE.match(step):
+            problems.append('ORDER BY is not served by an index')
+    return problems
+
+
+def _reads(sql, table):
+    return re.search(rf'\b(?:FROM|JOIN) "{table}"', sql) is not None
+
+
+class PlanProblemTests(unittest.TestCase):
+    def test_full_scans_in_both_plan_formats(self):
+        tables = ['quotations_job']
+        for step in ['SCAN quotations_job', 'SCAN TABLE quotations_job']:
+            with self.subTest(step=step):
+                self.assertEqual(plan_problems([step], tables), ['full table scan of quotations_job'])
+        for step in [
+            'SCAN quotations_job USING INDEX job_claim_idx',
+            'SCAN TABLE quotations_job USING COVERING INDEX job_claim_idx',
+            'SEARCH TABLE quotations_job USING INDEX job_claim_idx (status=? AND run_after<?)',
+            'SCAN quotations_quotation',
+        ]:
+            with self.subTest(step=step):
+                self.assertEqual(plan_problems([step], tables), [])
+
+    def test_temporary_sorts(self):
+        self.assertEqual(plan_problems(['USE TEMP B-TREE FOR ORDER BY'], []), ['ORDER BY is not served by an index'])
+        self.assertEqual(plan_problems(['USE TEMP B-TREE FOR RIGHT PART OF ORDER BY'], [], ordered=False), [])
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'The plans are checked against SQLite output')
+@with_page_templates
+class QueryPlanTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user()
+        hardware = make_hardware(name='Temperature Sensor', model_number='T-1')
+        make_category()
+        for number in range(3):
+            quotation = make_quotation(cls.user, make_request(status='pending'))
+            add_hardware(quotation, hardware)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def assertPlansUseIndexes(self, run, *tables, ordered=True):
+        """Run ``run()`` and check the plan of every SELECT it issues against ``tables``"""
+        with CaptureQueriesContext(connection) as captured:
+            run()
+        checked = 0
+        for query in captured.captured_queries:
+            sql = query['sql']
+            if not sql.startswith('SELECT') or not any(_reads(sql, table) for table in tables):
+                continue
+            plan = explain(sql)
+            problems = plan_problems(plan, tables, ordered)
+            self.assertFalse(problems, '\n'.join([sql, *plan, *problems]))
+            checked += 1
+        self.assertTrue(checked, f'No query read {", ".join(tables)}')
+
+    def _get(self, url):
+        return lambda: self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_customer_request_list(self):
+        cursor = encode_cursor([timezone.now(), 1_000_000])
+        for query in ['', f'?cursor={cursor}', f'?status=pending&cursor={cursor}']:
+            with self.subTest(query=query):
+                self.assertPlansUseIndexes(
+                    self._get(f'/requests/{query}'), 'quotations_customerquotationrequest'
+                )
+
+    def test_quotation_list(self):
+        cursor = encode_cursor([timezone.now(), 1_000_000])
+        for query in [f'?cursor={cursor}', f'?approval=approved&cursor={cursor}']:
+            with self.subTest(query=query):
+                self.assertPlansUseIndexes(self._get(f'/quotations/{query}'), 'quotations_quotation')
+
+    def test_approval_queue(self):
+        cursor = encode_cursor([timezone.now(), 1_000_000])
+        self.assertPlansUseIndexes(self._get(f'/api/approvals/sales/?cursor={cursor}'), 'quotations_quotation')
+
+    def test_hardware_list(self):
+        cursor = encode_cursor(['Sensors', 'M', 1_000_000])
+        for query in [f'?cursor={cursor}', '?category=Sensors']:
+            with self.subTest(query=query):
+                self.assertPlansUseIndexes(self._get(f'/hardware/{query}'), 'quotations_hardware')
+
+    def test_searches_use_the_search_index(self):
+        # Ranked by relevance, so only table scans are checked
+        for url, table in [
+            ('/hardware/?search=temp', 'quotations_hardware'),
+            ('/requests/?search=warehouse', 'quotations_customerquotationrequest'),
+        ]:
+            with self.subTest(url=url):
+                self.assertPlansUseIndexes(self._get(url), table, ordered=False)
+
+    def test_admin_quotation_hardware_filters(self):
+        today = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+        for query in ['?hardware__category=Sensors', f'?quotation__created_date__gte={quote(str(today))}']:
+            with self.subTest(query=query):
+                self.assertPlansUseIndexes(
+                    self._get(f'/admin/quotations/quotationhardware/{query}'),
+                    'quotations_quotationhardware', ordered=False,
+                )
+
+    def test_job_claim(self):
+        enqueue('recalculate_quotations', quotation_ids=[])
+        self.assertPlansUseIndexes(Worker(batch=10).claim, 'quotations_job')
+
+    def test_rollup_refresh(self):
+        today = timezone.localdate()
+        self.assertPlansUseIndexes(
+            lambda: changed_days(timezone.now() - timedelta(days=1)),
+            'quotations_customerquotationrequest', 'quotations_quotation', ordered=False,
+        )
+        self.assertPlansUseIndexes(
+            lambda: recompute_days(today, today),
+            'quotations_customerquotationrequest', 'quotations_quotation', 'quotations_quotationhardware',
+            'quotations_quotationpersonnelcost', ordered=False,
+        )
+
+    def test_reprice_as_of_lookup(self):
+        self.assertPlansUseIndexes(
+            lambda: reprice_quotations(Quotation.objects.all(), as_of=timezone.now()),
+            'quotations_quotationhardware', 'quotations_hardwarepricehistory',
+        )
@@ -0,0 +1,66 @@
+from decimal import Decimal
+from unittest import mock
+
+from django.test import TestCase
+
+from .. import views
+from ..jobs import Worker
+from ..models import Job, QuotationHardware
+from ..pricehistory import reprice_quotations
+from .utils import add_hardware, make_hardware, make_quotation, make_user
+
+
+class RepriceApiTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.client.force_login(self.user)
+        hardware = make_hardware(unit_cost='10.00')
+        self.quotation = make_quotation(self.user)
+        add_hardware(self.quotation, hardware, quantity=2)
+        hardware.unit_cost = Decimal('12.00')
+        hardware.save()
+
+    def test_small_previews_run_inline(self):
+        response = self.client.get('/api/quotations/reprice/')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['changed'], 1)
+        self.assertEqual(data['results'][0]['delta'], '4.00')
+        self.assertFalse(Job.objects.exists())
+
+    def test_lines_without_a_currency_are_in_their_items_currency(self):
+        legacy = make_quotation(self.user)
+        add_hardware(legacy, make_hardware(name='Gateway', unit_cost='30.00'))
+        QuotationHardware.objects.filter(quotation=legacy).update(currency='')
+        [delta] = [delta for delta in reprice_quotations().deltas if delta.quotation_id == legacy.pk]
+        self.assertEqual((delta.lines_changed, delta.delta), (0, Decimal('0.00')))
+
+    def test_large_previews_are_refused_on_get(self):
+        with mock.patch.object(views, 'INLINE_REPRICE_LIMIT', 0):
+            for _ in range(2):
+                response = self.client.get('/api/quotations/reprice/?open=1')
+                self.assertEqual(response.status_code, 413)
+        self.assertEqual(response.json()['count'], 1)
+        self.assertFalse(Job.objects.exists())
+
+    def test_post_queues_the_preview(self):
+        for _ in range(2):
+            response = self.client.post('/api/quotations/reprice/?open=1', HTTP_IDEMPOTENCY_KEY='preview-1')
+            self.assertEqual(response.status_code, 202)
+        job = Job.objects.get()
+        self.assertEqual(response.json()['id'], job.pk)
+        self.assertEqual(job.task, 'reprice_quotations')
+        self.assertTrue(job.kwargs['open_only'])
+
+        self.assertEqual(Worker().run(burst=True), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'succeeded', job.error)
+        self.assertEqual(job.result['changed'], 1)
+        self.assertEqual(job.result['results'][0]['delta'], '4.00')
+
+    def test_idempotency_key_is_scoped_to_the_query(self):
+        url = '/api/quotations/reprice/'
+        first = self.client.post(f'{url}?as_of=2024-01-31', HTTP_IDEMPOTENCY_KEY='preview-1').json()['id']
+        second = self.client.post(f'{url}?as_of=2024-02-29', HTTP_IDEMPOTENCY_KEY='preview-1').json()['id']
+        self.assertNotEqual(first, second)
+        self.assertEqual(Job.objects.count(), 2)
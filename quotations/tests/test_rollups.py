@@ -0,0 +1,133 @@
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.db.models import Count, Sum
+from django.test import TestCase
+from django.utils import timezone
+
+from ..models import (
+    CustomerQuotationRequest, DailyHardwareSpendRollup, DailyPersonnelRollup, DailyQuotationRollup,
+    DailyRequestRollup, Quotation, QuotationHardware, QuotationPersonnelCost
+)
+from ..rollups import get_watermark, rebuild_rollups, refresh_rollups
+from .utils import add_hardware, add_personnel, make_category, make_hardware, make_quotation, make_request, make_user
+
+JANUARY, FEBRUARY = date(2024, 1, 10), date(2024, 2, 5)
+
+
+def _backdate(quotation, day):
+    """Move a quotation and its request to ``day``, last changed then too"""
+    moment = timezone.make_aware(datetime(day.year, day.month, day.day, 12))
+    CustomerQuotationRequest.objects.filter(pk=quotation.customer_request_id).update(
+        created_date=moment, updated_date=moment
+    )
+    Quotation.objects.filter(pk=quotation.pk).update(created_date=moment, updated_date=moment)
+
+
+class RollupTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.sensor = make_hardware(name='Sensor', unit_cost='10.00')
+        self.engineer = make_category(hourly_rate='50.00')
+
+        self.won = make_quotation(
+            self.user, make_request(status='approved'),
+            technical_approval=True, sales_approval=True, final_approval=True,
+        )
+        add_hardware(self.won, self.sensor, quantity=2)
+        add_personnel(self.won, self.engineer, hours='2')
+        _backdate(self.won, JANUARY)
+
+        self.lost = make_quotation(self.user, make_request(status='rejected'))
+        add_hardware(self.lost, self.sensor)
+        _backdate(self.lost, FEBRUARY)
+        _backdate(make_quotation(self.user, make_request(status='pending')), FEBRUARY)
+
+    def _report(self, name, query='from=2024-01&to=2024-02'):
+        self.client.force_login(self.user)
+        response = self.client.get(f'/api/reports/{name}/?{query}')
+        self.assertEqual(response.status_code, 200)
+        return response.json()['results']
+
+    def test_reports(self):
+        rebuild_rollups()
+        won_total = str(Quotation.objects.get(pk=self.won.pk).total_amount)
+
+        january, february = self._report('quotations')
+        self.assertEqual(
+            (january['month'], january['quotations'], january['approved'], january['total_amount']),
+            ('2024-01', 1, 1, won_total)
+        )
+        self.assertEqual((february['month'], february['quotations'], february['approved']), ('2024-02', 2, 0))
+
+        january, february = self._report('win-rate')
+        self.assertEqual((january['requests'], january['decided'], january['win_rate']), (1, 1, 1.0))
+        self.assertEqual(february['by_status'], {'pending': 1, 'rejected': 1})
+        self.assertEqual((february['decided'], february['win_rate']), (1, 0.0))
+
+        spend = [
+            (row['month'], row['category'], row['quantity'], row['spend']) for row in self._report('hardware-spend')
+        ]
+        self.assertEqual(spend, [('2024-01', 'Sensors', 2, '20.00'), ('2024-02', 'Sensors', 1, '10.00')])
+
+        [hours] = self._report('personnel-hours')
+        self.assertEqual(
+            (hours['month'], hours['category'], hours['hours'], hours['cost']),
+            ('2024-01', 'Engineer', '2.00', '100.00')
+        )
+
+        # The months are inclusive bounds
+        self.assertEqual([row['month'] for row in self._report('quotations', 'from=2024-02')], ['2024-02'])
+        self.assertEqual([row['month'] for row in self._report('quotations', 'to=2024-01')], ['2024-01'])
+
+    def test_rollups_match_the_live_aggregates(self):
+        rebuild_rollups()
+        self.assertEqual(
+            dict(DailyRequestRollup.objects.values_list('status').annotate(Sum('requests'))),
+            dict(CustomerQuotationRequest.objects.values_list('status').annotate(Count('id'))),
+        )
+        self.assertEqual(
+            DailyQuotationRollup.objects.aggregate(Sum('quotations'), Sum('approved'), Sum('total_amount')),
+            {
+                'quotations__sum': Quotation.objects.count(),
+                'approved__sum': Quotation.objects.filter(final_approval=True).count(),
+                'total_amount__sum': Quotation.objects.aggregate(Sum('total_amount'))['total_amount__sum'],
+            }
+        )
+        self.assertEqual(
+            DailyHardwareSpendRollup.objects.aggregate(total=Sum('spend'))['total'],
+            QuotationHardware.objects.aggregate(total=Sum('converted_total'))['total'],
+        )
+        self.assertEqual(
+            DailyPersonnelRollup.objects.aggregate(total=Sum('cost'))['total'],
+            QuotationPersonnelCost.objects.aggregate(total=Sum('converted_total'))['total'],
+        )
+
+    def test_refresh_recomputes_only_changed_days(self):
+        # Without a watermark the first refresh is a rebuild
+        self.assertTrue(refresh_rollups().rebuilt)
+        watermark = get_watermark()
+
+        add_hardware(self.lost, make_hardware(name='Gateway', unit_cost='30.00', category='Gateways'))
+        result = refresh_rollups()
+        self.assertFalse(result.rebuilt)
+        self.assertEqual(result.ranges, [(FEBRUARY, FEBRUARY)])
+        self.assertGreater(get_watermark(), watermark)
+        self.assertEqual(
+            DailyHardwareSpendRollup.objects.get(day=FEBRUARY, category='Gateways').spend, Decimal('30.00')
+        )
+
+        # Once the change is older than the watermark's overlap, it is not read again
+        Quotation.objects.filter(pk=self.lost.pk).update(updated_date=get_watermark().replace(year=2024))
+        self.assertEqual(refresh_rollups().ranges, [])
+
+    def test_rebuild_drops_days_without_facts(self):
+        rebuild_rollups()
+        self.won.customer_request.delete()
+        # Deletes leave no updated_date behind, so only a rebuild sees them
+        refresh_rollups()
+        self.assertTrue(DailyQuotationRollup.objects.filter(day=JANUARY).exists())
+        result = rebuild_rollups()
+        self.assertEqual(result.ranges, [(FEBRUARY, FEBRUARY)])
+        for model in (DailyRequestRollup, DailyQuotationRollup, DailyHardwareSpendRollup, DailyPersonnelRollup):
+            self.assertFalse(model.objects.filter(day=JANUARY).exists(), model.__name__)
@@ -0,0 +1,86 @@
+import os
+from pathlib import Path
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.db import router
+from django.test import RequestFactory, SimpleTestCase
+
+from quotation_system.databases import database_settings
+
+from .. import routers
+from ..models import Quotation
+from ..routers import PIN_COOKIE, use_replica
+
+
+def _aliases():
+    return {
+        'read': Quotation.objects.all().db,
+        'locked_read': Quotation.objects.select_for_update().db,
+        'write': router.db_for_write(Quotation),
+    }
+
+
+@use_replica
+def probe(request):
+    return _aliases()
+
+
+@use_replica
+async def async_probe(request):
+    return _aliases()
+
+
+@use_replica
+def failing_probe(request):
+    raise ValueError
+
+
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        # The test settings have no replica alias; the routing decisions do not need one
+        patcher = mock.patch.object(routers, 'replica_available', return_value=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.factory = RequestFactory()
+
+    def test_reads_of_safe_requests_go_to_the_replica(self):
+        for view in (probe, async_to_sync(async_probe)):
+            with self.subTest(view=view):
+                data = view(self.factory.get('/'))
+                self.assertEqual(data, {'read': 'replica', 'locked_read': 'default', 'write': 'default'})
+        self.assertFalse(routers._reads_from_replica())
+
+    def test_unsafe_and_pinned_requests_stay_on_the_primary(self):
+        pinned = self.factory.get('/')
+        pinned.COOKIES[PIN_COOKIE] = '1'
+        for request in (self.factory.post('/'), pinned):
+            with self.subTest(method=request.method):
+                self.assertEqual(probe(request)['read'], 'default')
+
+    def test_reads_outside_the_views_stay_on_the_primary(self):
+        self.assertEqual(_aliases()['read'], 'default')
+        with self.assertRaises(ValueError):
+            failing_probe(self.factory.get('/'))
+        self.assertFalse(routers._reads_from_replica())
+        self.assertEqual(_aliases()['read'], 'default')
+
+    def test_primary_reads_override_the_replica(self):
+        with routers.replica_reads():
+            with routers.primary_reads():
+                self.assertEqual(_aliases()['read'], 'default')
+            self.assertEqual(_aliases()['read'], 'replica')
+
+    def test_without_a_replica_everything_reads_from_the_primary(self):
+        with mock.patch.object(routers, 'replica_available', return_value=False):
+            self.assertEqual(probe(self.factory.get('/'))['read'], 'default')
+
+
+class DatabaseSettingsTests(SimpleTestCase):
+    def test_replica_is_a_test_mirror_of_the_primary(self):
+        with mock.patch.dict(os.environ, {'DB_ENGINE': 'sqlite', 'DB_REPLICA_NAME': '/tmp/replica.sqlite3'}):
+            databases = database_settings(Path('/tmp'))
+        self.assertEqual(databases['replica']['NAME'], '/tmp/replica.sqlite3')
+        self.assertEqual(databases['replica']['TEST'], {'MIRROR': 'default'})
+        self.assertNotIn('TEST', databases['default'])
+        self.assertFalse(router.allow_migrate('replica', 'quotations'))
@@ -0,0 +1,31 @@
+from django.db import transaction
+from django.test import TestCase
+
+from .. import typeahead
+from .utils import make_hardware
+
+
+class TypeaheadInvalidationTests(TestCase):
+    def test_index_is_invalidated_after_commit(self):
+        make_hardware(name='Sensor Probe')
+        typeahead.invalidate()
+        before = typeahead.current_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                make_hardware(name='Gateway Hub')
+                # A rebuild here would read rows other workers cannot see yet
+                self.assertEqual(typeahead.current_version(), before)
+        self.assertNotEqual(typeahead.current_version(), before)
+        self.assertEqual([item['name'] for item in typeahead.lookup('gate')], ['Gateway Hub'])
+
+    def test_rolled_back_change_keeps_the_index(self):
+        typeahead.invalidate()
+        before = typeahead.current_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    make_hardware(name='Gateway Hub')
+                    raise ValueError
+            except ValueError:
+                pass
+        self.assertEqual(typeahead.current_version(), before)
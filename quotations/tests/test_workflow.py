@@ -0,0 +1,68 @@
+from unittest import mock
+
+from django.contrib.auth.models import Permission
+from django.db.models.query import QuerySet
+from django.test import TestCase
+
+from ..stats import get_counters, reconcile_counters
+from ..workflow import ApprovalPermissionDenied, TransitionNotAllowed, approve, bulk_approve
+from .utils import make_quotation, make_user
+
+
+class ApproveTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.quotation = make_quotation(self.user)
+
+    def test_stages_are_approved_in_order(self):
+        with self.assertRaisesMessage(TransitionNotAllowed, 'not awaiting sales approval'):
+            approve(self.quotation.pk, 'sales', self.user)
+        for stage, after in [('technical', 'sales'), ('sales', 'final'), ('final', 'approved')]:
+            quotation = approve(self.quotation.pk, stage, self.user)
+            self.assertEqual(quotation.approval_stage, after)
+            self.assertEqual(getattr(quotation, f'{stage}_approved_by'), self.user)
+
+    def test_needs_the_stage_permission(self):
+        approver = make_user('technical', is_staff=False, is_superuser=False)
+        approver.user_permissions.add(Permission.objects.get(codename='approve_technical'))
+        with self.assertRaises(ApprovalPermissionDenied):
+            approve(self.quotation.pk, 'technical', make_user('viewer', is_staff=False, is_superuser=False))
+        approve(self.quotation.pk, 'technical', approver)
+        with self.assertRaises(ApprovalPermissionDenied):
+            approve(self.quotation.pk, 'sales', approver)
+
+    def test_second_approval_of_a_stage_is_refused(self):
+        select_for_update = QuerySet.select_for_update
+        with mock.patch.object(QuerySet, 'select_for_update', autospec=True, side_effect=select_for_update) as lock:
+            approve(self.quotation.pk, 'technical', self.user)
+        lock.assert_called()
+        # A second approver who loaded the page earlier re-reads the locked row
+        with self.assertRaisesMessage(TransitionNotAllowed, 'current stage: sales'):
+            approve(self.quotation.pk, 'technical', make_user('other'))
+        self.quotation.refresh_from_db()
+        self.assertEqual(self.quotation.technical_approved_by, self.user)
+
+
+class BulkApproveTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.technical = make_quotation(self.user)
+        self.sales = make_quotation(self.user, technical_approval=True)
+        self.final = make_quotation(self.user, technical_approval=True, sales_approval=True)
+        reconcile_counters()
+
+    def test_rows_in_other_stages_are_skipped(self):
+        ids = [self.technical.pk, self.sales.pk, self.final.pk, self.sales.pk, 0]
+        result = bulk_approve(ids, ['sales', 'technical'], self.user)
+        self.assertEqual(result.approved, {'technical': 1, 'sales': 2})
+        self.assertEqual(result.skipped, [self.final.pk, 0])
+        self.technical.refresh_from_db()
+        self.assertEqual(self.technical.approval_stage, 'final')
+
+    def test_final_approvals_move_the_dashboard_counter(self):
+        before = get_counters()['approved_quotations']
+        result = bulk_approve([self.technical.pk, self.sales.pk, self.final.pk], ['final'], self.user)
+        self.assertEqual(result.approved, {'final': 1})
+        self.assertEqual(get_counters()['approved_quotations'], before + 1)
+        # The adjusted counter matches a full recount
+        self.assertEqual(reconcile_counters(), {})
@@ -0,0 +1,57 @@
+from decimal import Decimal
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.test import override_settings
+
+from ..models import (
+    CustomerQuotationRequest, Hardware, PersonnelCostCategory, Quotation, QuotationHardware,
+    QuotationPersonnelCost
+)
+
+# Stand-ins for the list and detail pages, used when the project templates
+# do not provide them
+with_page_templates = override_settings(TEMPLATES=[
+    {**settings.TEMPLATES[0], 'DIRS': [*settings.TEMPLATES[0]['DIRS'], Path(__file__).parent / 'templates']},
+])
+
+
+def make_user(username='staff', **kwargs):
+    kwargs.setdefault('is_staff', True)
+    kwargs.setdefault('is_superuser', True)
+    return User.objects.create_user(username, f'{username}@example.com', 'password', **kwargs)
+
+
+def make_request(**kwargs):
+    kwargs.setdefault('customer_name', 'Alex Customer')
+    kwargs.setdefault('customer_email', 'alex@example.com')
+    kwargs.setdefault('project_description', 'Sensor network for a warehouse')
+    return CustomerQuotationRequest.objects.create(**kwargs)
+
+
+def make_hardware(name='Sensor', unit_cost='10.00', **kwargs):
+    kwargs.setdefault('category', 'Sensors')
+    return Hardware.objects.create(name=name, unit_cost=Decimal(unit_cost), **kwargs)
+
+
+def make_category(name='Engineer', hourly_rate='50.00', **kwargs):
+    return PersonnelCostCategory.objects.create(name=name, hourly_rate=Decimal(hourly_rate), **kwargs)
+
+
+def make_quotation(user, customer_request=None, **kwargs):
+    return Quotation.objects.create(
+        customer_request=customer_request or make_request(), created_by=user, **kwargs
+    )
+
+
+def add_hardware(quotation, hardware, quantity=1):
+    return QuotationHardware.objects.create(
+        quotation=quotation, hardware=hardware, quantity=quantity, unit_cost=hardware.unit_cost
+    )
+
+
+def add_personnel(quotation, category, hours='1'):
+    return QuotationPersonnelCost.objects.create(
+        quotation=quotation, category=category, hours=Decimal(hours), hourly_rate=category.hourly_rate
+    )
@@ -0,0 +1,123 @@
+"""
+In-process prefix index for the hardware type-ahead endpoint.
+
+Each worker process builds a sorted array of lower-cased keys (full name,
+each word of the name and the model number) over the active catalog on first
+use and answers prefix lookups with a binary search, so a keystroke never
+reaches the database.
+
+The index is dropped locally once a ``Hardware`` save or delete commits. A
+version token kept in the default cache lets other workers notice the change
+on their next lookup when that cache is shared (memcached, Redis, database);
+``TYPEAHEAD_INDEX_TTL`` seconds bound the staleness otherwise.
+"""
+import threading
+import time
+import uuid
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.cache import cache
+
+VERSION_CACHE_KEY = 'quotations:typeahead:version'
+DEFAULT_TTL = 300
+MAX_RESULTS = 50
+
+
+class PrefixIndex:
+    """Sorted (key, hardware id) arrays answering prefix queries"""
+
+    def __init__(self, rows, version):
+        self.version = version
+        self.built_at = time.monotonic()
+        # Identifies this particular build; used for HTTP ETags
+        self.token = uuid.uuid4().hex
+        self.records = {}
+        entries = []
+        for pk, name, model_number, category, unit_cost, currency in rows:
+            self.records[pk] = {
+                'id': pk,
+                'name': name,
+                'model_number': model_number,
+                'category': category,
+                'unit_cost': str(unit_cost),
+                'currency': currency,
+            }
+            keys = {name.lower(), *name.lower().split()}
+            if model_number:
+                keys.add(model_number.lower())
+            entries.extend((key, pk) for key in keys if key)
+        entries.sort()
+        self.keys = [key for key, _ in entries]
+        self.ids = [pk for _, pk in entries]
+
+    def __len__(self):
+        return len(self.records)
+
+    def lookup(self, prefix, limit=10):
+        prefix = prefix.strip().lower()
+        if not prefix:
+            return []
+        results, seen = [], set()
+        position = bisect_left(self.keys, prefix)
+        while position < len(self.keys) and len(results) < limit:
+            if not self.keys[position].startswith(prefix):
+                break
+            pk = self.ids[position]
+            if pk not in seen:
+                seen.add(pk)
+                results.append(self.records[pk])
+            position += 1
+        return results
+
+
+_index = None
+_lock = threading.Lock()
+
+
+def _ttl():
+    return getattr(settings, 'TYPEAHEAD_INDEX_TTL', DEFAULT_TTL)
+
+
+def current_version():
+    """Shared version token; created on first use"""
+    version = cache.get(VERSION_CACHE_KEY)
+    if version is None:
+        version = uuid.uuid4().hex
+        cache.add(VERSION_CACHE_KEY, version, timeout=None)
+        version = cache.get(VERSION_CACHE_KEY, version)
+    return version
+
+
+def _build(version):
+    from .models import Hardware
+
+    rows = Hardware.objects.filter(is_active=True).order_by().values_list(
+        'pk', 'name', 'model_number', 'category', 'unit_cost', 'currency'
+    )
+    return PrefixIndex(rows.iterator(chunk_size=5000), version)
+
+
+def get_index():
+    """Return this worker's index, (re)building it when stale"""
+    global _index
+    version = current_version()
+    index = _index
+    if index is not None and index.version == version and time.monotonic() - index.built_at < _ttl():
+        return index
+    with _lock:
+        index = _index
+        if index is None or index.version != version or time.monotonic() - index.built_at >= _ttl():
+            index = _index = _build(version)
+    return index
+
+
+def invalidate(**kwargs):
+    """Drop the local index and bump the shared version (signal receiver)"""
+    global _index
+    _index = None
+    cache.set(VERSION_CACHE_KEY, uuid.uuid4().hex, timeout=None)
+
+
+def lookup(prefix, limit=10):
+    return get_index().lookup(prefix, limit=max(1, min(limit, MAX_RESULTS)))
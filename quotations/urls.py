@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import api, views
 
 urlpatterns = [
     # Home
@@ -8,18 +8,57 @@ urlpatterns = [
     # Customer Requests
     path('requests/', views.customer_request_list, name='customer_request_list'),
     path('requests/<int:pk>/', views.customer_request_detail, name='customer_request_detail'),
+    path('requests/<int:pk>/description/', views.customer_request_fragment, name='customer_request_fragment'),
     path('requests/create/', views.customer_request_create, name='customer_request_create'),
     
     # Quotations
     path('quotations/', views.quotation_list, name='quotation_list'),
     path('quotations/<int:pk>/', views.quotation_detail, name='quotation_detail'),
+    path('quotations/<int:pk>/items/', views.quotation_items, name='quotation_items'),
+    path('quotations/export/<str:dataset>.<str:fmt>', views.quotation_export, name='quotation_export'),
     path('quotations/create/<int:customer_request_id>/', views.quotation_create, name='quotation_create'),
+    path('quotations/<int:pk>/import/', views.quotation_import_items, name='quotation_import_items'),
+    path('quotations/<int:pk>/document.<str:fmt>', views.quotation_document, name='quotation_document'),
+    path('quotations/<int:pk>/approve/<str:stage>/', views.quotation_approve, name='quotation_approve'),
     
     # Hardware
     path('hardware/', views.hardware_list, name='hardware_list'),
     path('hardware/<int:pk>/', views.hardware_detail, name='hardware_detail'),
+    path('hardware/<int:pk>/specs/', views.hardware_specs, name='hardware_specs'),
     
     # API endpoints
+    path('api/requests/', views.api_customer_request_list, name='api_customer_request_list'),
+    path('api/quotations/', views.api_quotation_list, name='api_quotation_list'),
+    path('api/hardware/', views.api_hardware_list, name='api_hardware_list'),
     path('api/hardware/search/', views.api_hardware_search, name='api_hardware_search'),
+    path('api/hardware/typeahead/', views.api_hardware_typeahead, name='api_hardware_typeahead'),
     path('api/personnel/categories/', views.api_personnel_categories, name='api_personnel_categories'),
+    path('api/approvals/approve/', views.api_bulk_approve, name='api_bulk_approve'),
+    path('api/approvals/<str:stage>/', views.api_approval_queue, name='api_approval_queue'),
+    path('api/quotations/reprice/', views.api_reprice, name='api_reprice'),
+    path('api/quotations/<int:pk>/clone/', views.api_quotation_clone, name='api_quotation_clone'),
+    path(
+        'api/quotations/<int:pk>/apply-template/', views.api_quotation_apply_template,
+        name='api_quotation_apply_template'
+    ),
+    path('api/reports/<str:name>/', views.api_report, name='api_report'),
+    path('api/jobs/', views.api_job_list, name='api_job_list'),
+    path('api/jobs/<int:pk>/', views.api_job_detail, name='api_job_detail'),
+    
+    # Async editor API
+    path('api/editor/quotations/', api.quotation_list, name='api_editor_quotation_list'),
+    path('api/editor/quotations/batch/', api.quotation_batch, name='api_editor_quotation_batch'),
+    path('api/editor/quotations/<int:pk>/', api.quotation_detail, name='api_editor_quotation_detail'),
+    path(
+        'api/editor/quotations/<int:pk>/<str:kind>/', api.line_item_create,
+        name='api_editor_line_item_create'
+    ),
+    path(
+        'api/editor/quotations/<int:pk>/<str:kind>/<int:item_pk>/', api.line_item_detail,
+        name='api_editor_line_item_detail'
+    ),
+    path('api/editor/hardware/search/', api.hardware_search, name='api_editor_hardware_search'),
+    
+    # Monitoring
+    path('metrics', views.metrics, name='metrics'),
 ]
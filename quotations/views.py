@@ -1,52 +1,141 @@
+import codecs
+import hashlib
+import io
+import json
+from decimal import Decimal, InvalidOperation
+
 from django.shortcuts import render, get_object_or_404, redirect
+from django.urls import reverse
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse
-from django.core.paginator import Paginator
-from django.db.models import Q, Sum
+from django.conf import settings
+from django.http import (
+    FileResponse, Http404, HttpResponse, HttpResponseForbidden, JsonResponse,
+    StreamingHttpResponse
+)
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import etag, require_http_methods, require_POST
+from django.db import router
+from django.db.models import Sum
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, quote_etag
 from .models import (
-    CustomerQuotationRequest, Hardware, PersonnelCostCategory,
+    CustomerQuotationRequest, Hardware, Job, PersonnelCostCategory,
     Quotation, QuotationHardware, QuotationPersonnelCost
 )
 from .forms import (
     CustomerQuotationRequestForm, QuotationForm,
     QuotationHardwareForm, QuotationPersonnelCostForm
 )
+from .cloning import apply_template, clone_to_requests
+from .currency import MissingExchangeRate
+from .documents import FORMATS as DOCUMENT_FORMATS, DocumentError, get_document
+from .exports import (
+    DATASETS as EXPORT_DATASETS, FORMATS as EXPORT_FORMATS, ExportError, export_chunks, filter_quotations, parse_date
+)
+from .importers import detect_format, import_bom
+from .instrumentation import METRICS, query_budget
+from .jobs import IdempotencyKeyReused, enqueue, scoped_idempotency_key
+from .pagecache import cache_catalog_page, catalog_categories, catalog_last_modified, catalog_version
+from .pagination import (
+    APPROVAL_QUEUE_ORDERING, HARDWARE_ORDERING, QUOTATION_ORDERING, REQUEST_ORDERING, KeysetPaginator,
+    OffsetPaginator
+)
+from .pricehistory import parse_as_of, quotations_using, reprice_quotations
+from .reports import REPORTS, parse_month, run_report
+from .routers import use_replica
+from .search import search
+from .stats import get_counters
+from .workflow import (
+    STAGES as APPROVAL_STAGES, ApprovalPermissionDenied, WorkflowError,
+    approval_queue, approve, bulk_approve, can_approve
+)
+from . import typeahead
 
+BULK_APPROVAL_LIMIT = 1000
+CLONE_BATCH_LIMIT = 1000
+# Larger repricing previews must be queued as a background job
+INLINE_REPRICE_LIMIT = 500
 
+# Unbounded text columns that no list page shows; detail pages load them
+# from their fragment endpoints once the page is up. A quotation list keeps
+# its request's description, which CustomerQuotationRequest.__str__ shows.
+REQUEST_LIST_DEFER = ['project_description']
+QUOTATION_LIST_DEFER = ['notes']
+HARDWARE_LIST_DEFER = ['description', 'connectivity_options']
+
+
+def _filter_customer_requests(request, requests):
+    search_query = request.GET.get('search')
+    if search_query:
+        requests = search(requests, search_query)
+    status_filter = request.GET.get('status')
+    if status_filter:
+        requests = requests.filter(status=status_filter)
+    return requests
+
+
+def _filter_quotations(request, quotations):
+    return filter_quotations(quotations, request.GET.get('search'), request.GET.get('approval'))
+
+
+def _filter_hardware(request, hardware):
+    search_query = request.GET.get('search')
+    if search_query:
+        hardware = search(hardware, search_query)
+    category_filter = request.GET.get('category')
+    if category_filter:
+        hardware = hardware.filter(category=category_filter)
+    return hardware
+
+
+def _paginate(request, queryset, per_page, ordering, ranked=False):
+    """
+    Keyset-paginate by ``ordering`` using the ``cursor`` parameter. An explicit
+    ``page`` number, or a relevance-ranked search (which has no stable key),
+    falls back to numbered pages, still without a ``COUNT(*)``.
+    """
+    if ranked or 'page' in request.GET:
+        return OffsetPaginator(queryset, per_page).get_page(request.GET.get('page'))
+    return KeysetPaginator(queryset, per_page, ordering).get_page(request.GET.get('cursor'))
+
+
+def _api_limit(request, default=25, maximum=100):
+    try:
+        return max(1, min(int(request.GET.get('limit', default)), maximum))
+    except ValueError:
+        return default
+
+
+def _keyset_json(request, rows, ordering):
+    """JSON response with one keyset page of ``rows`` (a values() queryset)"""
+    page = KeysetPaginator(rows, _api_limit(request), ordering).get_page(request.GET.get('cursor'))
+    return JsonResponse({
+        'results': list(page),
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    })
+
+
+@query_budget(3)
 def home(request):
     """Home page view"""
-    context = {
-        'total_requests': CustomerQuotationRequest.objects.count(),
-        'pending_requests': CustomerQuotationRequest.objects.filter(status='pending').count(),
-        'total_quotations': Quotation.objects.count(),
-        'approved_quotations': Quotation.objects.filter(final_approval=True).count(),
-    }
+    context = get_counters()
     return render(request, 'quotations/home.html', context)
 
 
+@query_budget(3)
+@use_replica
 def customer_request_list(request):
     """List all customer quotation requests"""
-    requests = CustomerQuotationRequest.objects.all()
-    
-    # Search functionality
+    requests = _filter_customer_requests(
+        request, CustomerQuotationRequest.objects.defer(*REQUEST_LIST_DEFER)
+    )
     search_query = request.GET.get('search')
-    if search_query:
-        requests = requests.filter(
-            Q(customer_name__icontains=search_query) |
-            Q(company_name__icontains=search_query) |
-            Q(project_description__icontains=search_query)
-        )
-    
-    # Status filter
     status_filter = request.GET.get('status')
-    if status_filter:
-        requests = requests.filter(status=status_filter)
     
     # Pagination
-    paginator = Paginator(requests, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = _paginate(request, requests, 10, REQUEST_ORDERING, ranked=bool(search_query))
     
     context = {
         'page_obj': page_obj,
@@ -57,18 +146,29 @@ def customer_request_list(request):
     return render(request, 'quotations/customer_request_list.html', context)
 
 
+@query_budget(4)
 def customer_request_detail(request, pk):
     """Detail view for customer quotation request"""
-    customer_request = get_object_or_404(CustomerQuotationRequest, pk=pk)
-    quotations = Quotation.objects.filter(customer_request=customer_request)
+    customer_request = get_object_or_404(CustomerQuotationRequest.objects.defer(*REQUEST_LIST_DEFER), pk=pk)
+    quotations = Quotation.objects.filter(customer_request=customer_request).defer('notes')
     
     context = {
         'customer_request': customer_request,
         'quotations': quotations,
+        'fragment_url': reverse('customer_request_fragment', args=[pk]),
     }
     return render(request, 'quotations/customer_request_detail.html', context)
 
 
+@query_budget(1)
+def customer_request_fragment(request, pk):
+    """Project description of a request, loaded by its detail page"""
+    customer_request = get_object_or_404(CustomerQuotationRequest.objects.only('pk', 'project_description'), pk=pk)
+    return render(request, 'quotations/fragments/customer_request_description.html', {
+        'customer_request': customer_request,
+    })
+
+
 def customer_request_create(request):
     """Create new customer quotation request"""
     if request.method == 'POST':
@@ -83,31 +183,18 @@ def customer_request_create(request):
     return render(request, 'quotations/customer_request_form.html', {'form': form})
 
 
+@query_budget(3)
 @login_required
 def quotation_list(request):
     """List all quotations"""
-    quotations = Quotation.objects.select_related('customer_request', 'created_by')
-    
-    # Search functionality
+    quotations = _filter_quotations(
+        request, Quotation.objects.select_related('customer_request', 'created_by').defer(*QUOTATION_LIST_DEFER)
+    )
     search_query = request.GET.get('search')
-    if search_query:
-        quotations = quotations.filter(
-            Q(quotation_number__icontains=search_query) |
-            Q(customer_request__customer_name__icontains=search_query) |
-            Q(customer_request__company_name__icontains=search_query)
-        )
-    
-    # Filter by approval status
     approval_filter = request.GET.get('approval')
-    if approval_filter == 'pending':
-        quotations = quotations.filter(final_approval=False)
-    elif approval_filter == 'approved':
-        quotations = quotations.filter(final_approval=True)
     
     # Pagination
-    paginator = Paginator(quotations, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = _paginate(request, quotations, 10, QUOTATION_ORDERING)
     
     context = {
         'page_obj': page_obj,
@@ -117,21 +204,97 @@ def quotation_list(request):
     return render(request, 'quotations/quotation_list.html', context)
 
 
+@query_budget(5)
 @login_required
 def quotation_detail(request, pk):
-    """Detail view for quotation"""
-    quotation = get_object_or_404(Quotation, pk=pk)
-    hardware_items = quotation.hardware_items.select_related('hardware')
-    personnel_costs = quotation.personnel_costs.select_related('category')
+    """
+    Detail view for quotation. The line items are in the context for pages
+    that include ``fragments/quotation_items.html``; ``fragment_url`` serves
+    the same fragment to pages that load it once they are up.
+    """
+    quotation = get_object_or_404(Quotation.objects.select_related('customer_request'), pk=pk)
     
     context = {
         'quotation': quotation,
-        'hardware_items': hardware_items,
-        'personnel_costs': personnel_costs,
+        'fragment_url': reverse('quotation_items', args=[pk]),
+        **_quotation_line_items(quotation),
     }
     return render(request, 'quotations/quotation_detail.html', context)
 
 
+def _quotation_line_items(quotation):
+    hardware_items = quotation.hardware_items.select_related('hardware').defer(
+        *(f'hardware__{name}' for name in HARDWARE_LIST_DEFER)
+    ).order_by('id')
+    personnel_costs = quotation.personnel_costs.select_related('category').defer('category__description').order_by('id')
+    return {'hardware_items': hardware_items, 'personnel_costs': personnel_costs}
+
+
+@query_budget(5)
+@login_required
+def quotation_items(request, pk):
+    """Notes and line items of a quotation, loaded by its detail page"""
+    quotation = get_object_or_404(Quotation.objects.only('pk', 'currency', 'notes'), pk=pk)
+    
+    context = {
+        'quotation': quotation,
+        **_quotation_line_items(quotation),
+    }
+    return render(request, 'quotations/fragments/quotation_items.html', context)
+
+
+@login_required
+def quotation_document(request, pk, fmt):
+    """Download a quotation as a PDF or standalone HTML document"""
+    if fmt not in DOCUMENT_FORMATS:
+        raise Http404
+    quotation = get_object_or_404(Quotation.objects.select_related('customer_request'), pk=pk)
+    try:
+        document = get_document(quotation, fmt)
+    except DocumentError as exc:
+        return HttpResponse(str(exc), status=501, content_type='text/plain')
+    
+    etag_value = quote_etag(document.digest)
+    # Weak comparison for If-None-Match (W/ tags and * match); a 304 or 412 when it applies
+    response = get_conditional_response(request, etag=etag_value)
+    if response is None:
+        response = FileResponse(
+            open(document.path, 'rb'),
+            content_type=document.content_type,
+            as_attachment=fmt == 'pdf',
+            filename=f'{quotation.quotation_number}.{fmt}',
+        )
+    response['ETag'] = etag_value
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+@login_required
+@use_replica
+def quotation_export(request, dataset, fmt):
+    """
+    Stream every quotation (``dataset`` ``quotations``) or line item
+    (``lines``) matching the quotation list filters and an optional
+    ``from``/``to`` created date range, as CSV or XLSX
+    """
+    if dataset not in EXPORT_DATASETS or fmt not in EXPORT_FORMATS:
+        raise Http404
+    try:
+        created_from = parse_date(request.GET['from']) if request.GET.get('from') else None
+        created_to = parse_date(request.GET['to']) if request.GET.get('to') else None
+    except ExportError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    # The rows are read after the view returns, outside use_replica
+    quotations = filter_quotations(
+        Quotation.objects.using(router.db_for_read(Quotation)),
+        request.GET.get('search'), request.GET.get('approval'), created_from, created_to,
+    )
+    response = StreamingHttpResponse(export_chunks(dataset, fmt, quotations), content_type=EXPORT_FORMATS[fmt])
+    response['Content-Disposition'] = f'attachment; filename="{dataset}-{timezone.localdate():%Y%m%d}.{fmt}"'
+    response['Cache-Control'] = 'private, no-store'
+    return response
+
+
 @login_required
 def quotation_create(request, customer_request_id):
     """Create new quotation for a customer request"""
@@ -156,57 +319,129 @@ def quotation_create(request, customer_request_id):
     return render(request, 'quotations/quotation_form.html', context)
 
 
+@login_required
+@require_POST
+def quotation_approve(request, pk, stage):
+    """Give one approval stage to a quotation"""
+    quotation = get_object_or_404(Quotation, pk=pk)
+    try:
+        approve(quotation.pk, stage, request.user)
+    except ApprovalPermissionDenied as exc:
+        return HttpResponseForbidden(str(exc))
+    except WorkflowError as exc:
+        messages.error(request, str(exc))
+    else:
+        messages.success(request, f'{stage.title()} approval recorded for {quotation.quotation_number}.')
+    return redirect('quotation_detail', pk=quotation.pk)
+
+
+@login_required
+@require_POST
+def quotation_import_items(request, pk):
+    """
+    Bulk import line items from an uploaded CSV or JSON bill of materials.
+    With ``background=1`` the import is queued as a job and the response is
+    202 with the job's status URL. Repeating the upload with the same
+    ``Idempotency-Key`` header returns the same job; reusing the key for a
+    different upload is a 409.
+    """
+    quotation = get_object_or_404(Quotation, pk=pk)
+    replace_existing = request.POST.get('replace', request.GET.get('replace')) in ('1', 'true', 'on')
+    background = request.POST.get('background', request.GET.get('background')) in ('1', 'true', 'on')
+    
+    upload = request.FILES.get('file')
+    if upload is not None:
+        fmt = request.POST.get('format') or detect_format(upload.name, upload.content_type)
+        stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+    else:
+        fmt = request.GET.get('format') or detect_format(content_type=request.content_type)
+        stream = codecs.getreader('utf-8-sig')(request)
+    
+    if background:
+        try:
+            job = enqueue(
+                'import_bom',
+                idempotency_key=scoped_idempotency_key(
+                    request.headers.get('Idempotency-Key'), request.user, 'import_bom', quotation.pk
+                ),
+                user=request.user,
+                quotation_id=quotation.pk,
+                content=stream.read(),
+                fmt=fmt,
+                replace_existing=replace_existing,
+            )
+        except IdempotencyKeyReused as exc:
+            return JsonResponse({'error': str(exc)}, status=409)
+        return _job_response(job, status=202)
+    
+    result = import_bom(quotation, stream, fmt=fmt, replace_existing=replace_existing)
+    return JsonResponse(result.as_dict(), status=200 if result.ok else 400)
+
+
+def _hardware_last_modified(request, pk):
+    return Hardware.objects.filter(pk=pk).values_list('updated_date', flat=True).first()
+
+
+@query_budget(4)
+@cache_catalog_page(lambda request: catalog_last_modified(), params=['search', 'category', 'page', 'cursor'])
+@use_replica
 def hardware_list(request):
     """List all hardware components"""
-    hardware = Hardware.objects.filter(is_active=True)
-    
-    # Search functionality
+    hardware = _filter_hardware(request, Hardware.objects.filter(is_active=True).defer(*HARDWARE_LIST_DEFER))
     search_query = request.GET.get('search')
-    if search_query:
-        hardware = hardware.filter(
-            Q(name__icontains=search_query) |
-            Q(description__icontains=search_query) |
-            Q(category__icontains=search_query) |
-            Q(manufacturer__icontains=search_query)
-        )
-    
-    # Category filter
     category_filter = request.GET.get('category')
-    if category_filter:
-        hardware = hardware.filter(category=category_filter)
     
-    # Get all categories for filter
-    categories = Hardware.objects.values_list('category', flat=True).distinct()
+    # Get all categories for filter (cached until the catalog changes)
+    categories = catalog_categories()
     
     # Pagination
-    paginator = Paginator(hardware, 12)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = _paginate(request, hardware, 12, HARDWARE_ORDERING, ranked=bool(search_query))
     
     context = {
         'page_obj': page_obj,
         'search_query': search_query,
         'category_filter': category_filter,
         'categories': categories,
+        # For {% cache %} fragments keyed by the catalog version
+        'catalog_version': catalog_version(),
     }
     return render(request, 'quotations/hardware_list.html', context)
 
 
+@query_budget(3)
+@cache_catalog_page(_hardware_last_modified)
+@use_replica
 def hardware_detail(request, pk):
-    """Detail view for hardware component"""
-    hardware = get_object_or_404(Hardware, pk=pk)
-    return render(request, 'quotations/hardware_detail.html', {'hardware': hardware})
+    """Detail view for hardware component; the long texts come from ``hardware_specs``"""
+    hardware = get_object_or_404(Hardware.objects.defer(*HARDWARE_LIST_DEFER), pk=pk)
+    context = {
+        'hardware': hardware,
+        'catalog_version': catalog_version(),
+        'fragment_url': reverse('hardware_specs', args=[pk]),
+    }
+    return render(request, 'quotations/hardware_detail.html', context)
+
+
+@query_budget(3)
+@cache_catalog_page(_hardware_last_modified)
+@use_replica
+def hardware_specs(request, pk):
+    """Description and connectivity options of a hardware component, loaded by its detail page"""
+    hardware = get_object_or_404(Hardware.objects.only('pk', *HARDWARE_LIST_DEFER), pk=pk)
+    return render(request, 'quotations/fragments/hardware_specs.html', {'hardware': hardware})
 
 
 # API Views for AJAX requests
+@query_budget(3)
 @login_required
+@use_replica
 def api_hardware_search(request):
     """API endpoint for hardware search"""
     query = request.GET.get('q', '')
-    hardware_items = Hardware.objects.filter(
-        Q(name__icontains=query) | Q(description__icontains=query),
-        is_active=True
-    )[:10]
+    hardware_items = Hardware.objects.filter(is_active=True)
+    if query:
+        hardware_items = search(hardware_items, query)
+    hardware_items = hardware_items[:10]
     
     results = []
     for item in hardware_items:
@@ -221,7 +456,66 @@ def api_hardware_search(request):
     return JsonResponse({'results': results})
 
 
+def _typeahead_limit(request):
+    try:
+        return int(request.GET.get('limit', 10))
+    except ValueError:
+        return 10
+
+
+def _typeahead_etag(request):
+    key = f"{typeahead.get_index().token}:{request.GET.get('q', '')}:{_typeahead_limit(request)}"
+    return hashlib.md5(key.encode()).hexdigest()
+
+
+@query_budget(3)
 @login_required
+@cache_control(private=True, max_age=60)
+@etag(_typeahead_etag)
+@use_replica
+def api_hardware_typeahead(request):
+    """Prefix search over active hardware served from the in-process index"""
+    results = typeahead.lookup(request.GET.get('q', ''), limit=_typeahead_limit(request))
+    return JsonResponse({'results': results})
+
+
+@query_budget(3)
+@login_required
+@use_replica
+def api_customer_request_list(request):
+    """Keyset-paginated JSON list of customer requests (filters as the HTML list)"""
+    requests = _filter_customer_requests(request, CustomerQuotationRequest.objects.all())
+    return _keyset_json(request, requests.values(
+        'id', 'request_number', 'customer_name', 'company_name', 'status', 'created_date'
+    ), REQUEST_ORDERING)
+
+
+@query_budget(3)
+@login_required
+@use_replica
+def api_quotation_list(request):
+    """Keyset-paginated JSON list of quotations (filters as the HTML list)"""
+    quotations = _filter_quotations(request, Quotation.objects.all())
+    return _keyset_json(request, quotations.values(
+        'id', 'quotation_number', 'customer_request_id', 'customer_request__customer_name',
+        'final_approval', 'total_amount', 'currency', 'created_date'
+    ), QUOTATION_ORDERING)
+
+
+@query_budget(3)
+@login_required
+@use_replica
+def api_hardware_list(request):
+    """Keyset-paginated JSON list of active hardware (filters as the HTML list)"""
+    hardware = _filter_hardware(request, Hardware.objects.filter(is_active=True))
+    return _keyset_json(request, hardware.values(
+        'id', 'name', 'category', 'manufacturer', 'model_number', 'unit_cost', 'currency'
+    ), HARDWARE_ORDERING)
+
+
+@query_budget(3)
+@login_required
+@use_replica
 def api_personnel_categories(request):
     """API endpoint for personnel cost categories"""
     categories = PersonnelCostCategory.objects.filter(is_active=True)
@@ -236,3 +530,236 @@ def api_personnel_categories(request):
         })
     
     return JsonResponse({'results': results})
+
+
+# Session, user, one page, and the user's and groups' permissions for can_approve
+@query_budget(5)
+@login_required
+@use_replica
+def api_approval_queue(request, stage):
+    """Keyset-paginated quotations awaiting ``stage`` approval, oldest first"""
+    if stage not in APPROVAL_STAGES:
+        raise Http404
+    rows = approval_queue(stage).values(
+        'id', 'quotation_number', 'customer_request_id', 'customer_request__customer_name',
+        'total_amount', 'currency', 'created_date'
+    )
+    page = KeysetPaginator(rows, _api_limit(request), APPROVAL_QUEUE_ORDERING).get_page(request.GET.get('cursor'))
+    return JsonResponse({
+        'stage': stage,
+        'can_approve': can_approve(request.user, stage),
+        'results': list(page),
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    })
+
+
+@login_required
+@require_POST
+def api_bulk_approve(request):
+    """
+    Approve many quotations at once. The JSON body gives ``ids`` and
+    ``stages`` (e.g. ``["sales", "final"]``); quotations not awaiting a
+    listed stage are returned in ``skipped``.
+    """
+    try:
+        data = json.loads(request.body or b'{}')
+        ids = [int(pk) for pk in data.get('ids', [])]
+        stages = [str(stage) for stage in data.get('stages', [])]
+    except (AttributeError, TypeError, ValueError):
+        return JsonResponse({'error': 'Expected {"ids": [...], "stages": [...]}'}, status=400)
+    if len(ids) > BULK_APPROVAL_LIMIT:
+        return JsonResponse({'error': f'At most {BULK_APPROVAL_LIMIT} ids per request'}, status=400)
+    try:
+        result = bulk_approve(ids, stages, request.user)
+    except ApprovalPermissionDenied as exc:
+        return JsonResponse({'error': str(exc)}, status=403)
+    except WorkflowError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    return JsonResponse({'approved': result.approved, 'skipped': result.skipped})
+
+
+def _clone_options(data):
+    """``reprice``, ``quantities`` and ``hours`` of a clone request body"""
+    quantities = {int(pk): int(value) for pk, value in (data.get('quantities') or {}).items()}
+    hours = {int(pk): Decimal(str(value)) for pk, value in (data.get('hours') or {}).items()}
+    if any(value < 1 for value in quantities.values()):
+        raise ValueError('quantities must be at least 1')
+    if any(value < Decimal('0.01') for value in hours.values()):
+        raise ValueError('hours must be at least 0.01')
+    return {'reprice': bool(data.get('reprice')), 'quantities': quantities, 'hours': hours}
+
+
+@login_required
+@require_POST
+def api_quotation_clone(request, pk):
+    """
+    Copy a quotation and its line items into new quotations. The JSON body
+    may give ``customer_requests`` (ids, default the quotation's own
+    request; one clone each), ``reprice`` to use current catalog prices,
+    and ``quantities`` / ``hours`` keyed by hardware and category id.
+    """
+    template = get_object_or_404(Quotation, pk=pk)
+    try:
+        data = json.loads(request.body or b'{}')
+        request_ids = [int(value) for value in data.get('customer_requests') or [template.customer_request_id]]
+        options = _clone_options(data)
+    except (AttributeError, TypeError, ValueError, InvalidOperation) as exc:
+        return JsonResponse({'error': f'Invalid clone request: {exc}'}, status=400)
+    if len(request_ids) > CLONE_BATCH_LIMIT:
+        return JsonResponse({'error': f'At most {CLONE_BATCH_LIMIT} customer requests per clone'}, status=400)
+    customer_requests = CustomerQuotationRequest.objects.in_bulk(request_ids)
+    unknown = sorted(set(request_ids) - set(customer_requests))
+    if unknown:
+        return JsonResponse({'error': 'Unknown customer requests', 'ids': unknown}, status=400)
+    try:
+        result = clone_to_requests(
+            template, [customer_requests[request_id] for request_id in request_ids], request.user, **options
+        )
+    except MissingExchangeRate as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    return JsonResponse(result.as_dict(), status=201)
+
+
+@login_required
+@require_POST
+def api_quotation_apply_template(request, pk):
+    """
+    Copy the line items of the ``template`` quotation (JSON body) into this
+    one; hardware and categories it already has are returned in ``skipped``.
+    Takes the same ``reprice``, ``quantities`` and ``hours`` as the clone.
+    """
+    quotation = get_object_or_404(Quotation, pk=pk)
+    try:
+        data = json.loads(request.body or b'{}')
+        template_id = int(data['template'])
+        options = _clone_options(data)
+    except (AttributeError, KeyError, TypeError, ValueError, InvalidOperation) as exc:
+        return JsonResponse({'error': f'Invalid template request: {exc}'}, status=400)
+    template = get_object_or_404(Quotation, pk=template_id)
+    try:
+        result = apply_template(template, quotation, **options)
+    except MissingExchangeRate as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    return JsonResponse(result.as_dict())
+
+
+def _id_list(request, name):
+    return [int(value) for value in request.GET.getlist(name) if value.strip()]
+
+
+@login_required
+@require_http_methods(['GET', 'POST'])
+@use_replica
+def api_reprice(request):
+    """
+    Change in each quotation's total at the catalog prices in force at
+    ``as_of`` (default now). Filters: ``open=1``, ``hardware`` and
+    ``category`` ids (repeatable). A GET previews up to
+    ``INLINE_REPRICE_LIMIT`` quotations and is a 413 above it; a POST with the
+    same query queues the preview as a job and is a 202 with its status URL.
+    Repeating the POST with the same ``Idempotency-Key`` header returns the
+    same job. Prices are never written; ``manage.py reprice_quotations
+    --apply`` does that.
+    """
+    try:
+        as_of = parse_as_of(request.GET['as_of']) if request.GET.get('as_of') else None
+        hardware_ids = _id_list(request, 'hardware')
+        category_ids = _id_list(request, 'category')
+    except ValueError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    open_only = request.GET.get('open') in ('1', 'true')
+    
+    if request.method == 'POST':
+        # The job resolves a missing as_of when it runs, so a retried POST matches the queued one
+        as_of = as_of.isoformat() if as_of else None
+        try:
+            job = enqueue(
+                'reprice_quotations',
+                idempotency_key=scoped_idempotency_key(
+                    request.headers.get('Idempotency-Key'), request.user, 'reprice_quotations',
+                    as_of, open_only, hardware_ids, category_ids,
+                ),
+                user=request.user,
+                as_of=as_of,
+                hardware_ids=hardware_ids,
+                category_ids=category_ids,
+                open_only=open_only,
+            )
+        except IdempotencyKeyReused as exc:
+            return JsonResponse({'error': str(exc)}, status=409)
+        return _job_response(job, status=202)
+    
+    quotations = quotations_using(Quotation.objects.all(), hardware_ids, category_ids, open_only)
+    count = quotations.count()
+    if count > INLINE_REPRICE_LIMIT:
+        return JsonResponse({
+            'error': f'{count} quotations match; previews of more than {INLINE_REPRICE_LIMIT} '
+                     'run as a job. POST the same query to queue one.',
+            'count': count,
+            'limit': INLINE_REPRICE_LIMIT,
+        }, status=413)
+    result = reprice_quotations(quotations, as_of=as_of)
+    return JsonResponse(result.as_dict())
+
+
+@query_budget(4)
+@login_required
+@use_replica
+def api_report(request, name):
+    """
+    A monthly sales report from the daily rollups: ``quotations``,
+    ``win-rate``, ``hardware-spend`` or ``personnel-hours``. Optional
+    ``from``/``to`` months (YYYY-MM, inclusive) and ``currency``.
+    """
+    if name not in REPORTS:
+        raise Http404('Unknown report')
+    try:
+        start = parse_month(request.GET['from']) if request.GET.get('from') else None
+        end = parse_month(request.GET['to'], end=True) if request.GET.get('to') else None
+    except ValueError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    return JsonResponse(run_report(name, start, end, request.GET.get('currency') or None))
+
+
+def _job_response(job, status=200):
+    data = job.as_dict()
+    data['status_url'] = reverse('api_job_detail', args=[job.pk])
+    return JsonResponse(data, status=status)
+
+
+def _visible_jobs(request):
+    jobs = Job.objects.all()
+    if not request.user.is_staff:
+        jobs = jobs.filter(created_by=request.user)
+    return jobs
+
+
+@query_budget(3)
+@login_required
+def api_job_list(request):
+    """The current user's recent jobs (all jobs for staff), newest first"""
+    jobs = _visible_jobs(request).defer('kwargs', 'result', 'error')
+    status_filter = request.GET.get('status')
+    if status_filter:
+        jobs = jobs.filter(status=status_filter)
+    results = [
+        job.as_dict(include_result=False)
+        for job in jobs.order_by('-created_date', '-id')[:_api_limit(request)]
+    ]
+    return JsonResponse({'results': results})
+
+
+@query_budget(3)
+@login_required
+def api_job_detail(request, pk):
+    """Status, progress and result of one job"""
+    job = get_object_or_404(_visible_jobs(request), pk=pk)
+    return _job_response(job)
+
+
+def metrics(request):
+    """Per-worker request and query metrics in the Prometheus text format"""
+    if not (request.user.is_staff or request.META.get('REMOTE_ADDR') in settings.INTERNAL_IPS):
+        return HttpResponseForbidden()
+    return HttpResponse(METRICS.render_prometheus(), content_type='text/plain; version=0.0.4')
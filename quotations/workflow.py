@@ -0,0 +1,134 @@
+"""
+Quotation approval workflow.
+
+A quotation is approved in a fixed order: technical, then sales, then final.
+``Quotation.approval_stage`` names the stage it is waiting for (``approved``
+once all three are done) and is indexed with ``created_date`` so each
+stage's queue is an index range, oldest first.
+
+Approving a stage needs the matching ``quotations.approve_<stage>``
+permission. ``approve`` locks the quotation row (``select_for_update``)
+before checking its stage, so two approvers acting at once cannot both
+approve it. ``bulk_approve`` moves many quotations with one UPDATE per
+stage, conditional on the stage they are waiting for, inside a single
+transaction.
+"""
+from dataclasses import dataclass, field
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import stats
+from .models import APPROVAL_STAGE_CHOICES, Quotation
+
+STAGES = [stage for stage, _ in APPROVAL_STAGE_CHOICES[:-1]]
+APPROVED = 'approved'
+
+
+class WorkflowError(Exception):
+    pass
+
+
+class ApprovalPermissionDenied(WorkflowError):
+    pass
+
+
+class TransitionNotAllowed(WorkflowError):
+    pass
+
+
+def next_stage(stage):
+    position = STAGES.index(stage)
+    return STAGES[position + 1] if position + 1 < len(STAGES) else APPROVED
+
+
+def can_approve(user, stage):
+    return user.is_active and user.has_perm(f'quotations.approve_{stage}')
+
+
+def _check(user, stage):
+    if stage not in STAGES:
+        raise TransitionNotAllowed(f'Unknown approval stage {stage!r}')
+    if not can_approve(user, stage):
+        raise ApprovalPermissionDenied(f'{user} may not give {stage} approval')
+
+
+def _approval_values(stage, user, now):
+    return {
+        f'{stage}_approval': True,
+        f'{stage}_approved_by': user,
+        f'{stage}_approval_date': now,
+        'approval_stage': next_stage(stage),
+        'updated_date': now,
+    }
+
+
+def approve(quotation_id, stage, user):
+    """Give ``stage`` approval to one quotation; returns the updated quotation"""
+    _check(user, stage)
+    with transaction.atomic():
+        quotation = Quotation.objects.select_for_update().get(pk=quotation_id)
+        if quotation.approval_stage != stage:
+            raise TransitionNotAllowed(
+                f'{quotation.quotation_number} is not awaiting {stage} approval '
+                f'(current stage: {quotation.approval_stage})'
+            )
+        values = _approval_values(stage, user, timezone.now())
+        for name, value in values.items():
+            setattr(quotation, name, value)
+        # save() keeps the signal receivers (dashboard counters) in step
+        quotation.save(update_fields=list(values))
+    return quotation
+
+
+@dataclass
+class BulkApprovalResult:
+    # stage -> number of quotations approved at that stage
+    approved: dict = field(default_factory=dict)
+    # Requested ids that did not reach the last requested stage
+    skipped: list = field(default_factory=list)
+
+
+def bulk_approve(quotation_ids, stages, user):
+    """
+    Give each of ``stages`` (in workflow order) to the listed quotations in
+    one transaction. Each stage is one UPDATE of the rows awaiting it, so a
+    quotation approved at one stage is picked up by the next; rows in any
+    other stage are left alone and reported in ``skipped``.
+    """
+    for stage in stages:
+        _check(user, stage)
+    stages = sorted(set(stages), key=STAGES.index)
+    quotation_ids = list(dict.fromkeys(quotation_ids))
+    result = BulkApprovalResult()
+    if not stages:
+        result.skipped = quotation_ids
+        return result
+
+    now = timezone.now()
+    with transaction.atomic():
+        # Lock in primary key order so concurrent bulk approvals cannot deadlock
+        list(
+            Quotation.objects.select_for_update()
+            .filter(pk__in=quotation_ids).order_by('pk').values_list('pk', flat=True)
+        )
+        for stage in stages:
+            result.approved[stage] = Quotation.objects.filter(
+                pk__in=quotation_ids, approval_stage=stage
+            ).update(**_approval_values(stage, user, now))
+        # update() sends no signals
+        stats.adjust('approved_quotations', result.approved.get('final', 0))
+        done = set(
+            Quotation.objects.filter(
+                pk__in=quotation_ids, **{f'{stages[-1]}_approved_by': user, f'{stages[-1]}_approval_date': now}
+            ).values_list('pk', flat=True)
+        )
+    result.skipped = [pk for pk in quotation_ids if pk not in done]
+    return result
+
+
+def approval_queue(stage):
+    """Quotations awaiting ``stage`` approval (page with APPROVAL_QUEUE_ORDERING)"""
+    if stage not in STAGES:
+        raise TransitionNotAllowed(f'Unknown approval stage {stage!r}')
+    return Quotation.objects.filter(approval_stage=stage)